@@ -1,33 +1,288 @@
-
 # Import required libraries
-import joblib
-import numpy as np
-import pandas as pd
+import logging
+import math
 import os
-import dash
-from dash import html, dcc, callback
-from dash.dependencies import Input, Output, State
-
-# Load the trained model from multiple possible paths
-MODEL_PATHS = [
-    "./car_price.model",  # For Docker deployment
-    "./model/car_price.model",  # For root directory local development
-    "../model/car_price.model",  # For app directory local development
+import threading
+import time
+
+# Startup is timed from here; /api/ready reports it
+STARTED = time.perf_counter()
+
+import numpy as np  # noqa: E402
+
+from import_hooks import hidden_module  # noqa: E402
+
+# dash imports IPython for notebook display whenever it is installed (the
+# full image has it for the notebooks), which is about half of the import
+# time. A server never displays in a notebook, so it is hidden from dash
+# while dash is imported, and only then.
+with hidden_module("IPython"):
+    import dash
+    from dash import html, dcc, callback
+    from dash.dependencies import ClientsideFunction, Input, Output, State
+    from flask import Response, jsonify, request, stream_with_context
+
+from batch_api import (  # noqa: E402
+    MIMETYPES, BatchError, missing_fields, normalize_listing, parse_listings,
+    predict_log_prices, price_bounds, score_rows, stream_predictions,
+)
+from coalescer import MicroBatcher  # noqa: E402
+from drift import DriftMonitor  # noqa: E402
+from metrics import Metrics, SampledLogger  # noqa: E402
+from model_artifact import uses_xgboost  # noqa: E402
+from model_registry import MODEL_PATHS, ModelRegistry  # noqa: E402
+from model_router import PRIMARY, ModelRouter, parse_models  # noqa: E402
+from prediction_cache import PredictionCache, SqliteBackend, cache_key  # noqa: E402
+from whatif import CURVE_GRIDS, MAX_CURVE_POINTS, QuoteIndex, price_curves  # noqa: E402
+
+# Score through the pandas-free compiled path unless FAST_INFERENCE=False
+FAST_INFERENCE = os.environ.get("FAST_INFERENCE", "True").lower() == "true"
+
+# Seconds between checks of the model paths for a new version (0 disables)
+MODEL_POLL_INTERVAL = float(os.environ.get("MODEL_POLL_INTERVAL", 10))
+
+# Token for the /admin/model endpoints; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Logging: LOG_LEVEL for the app loggers; PREDICT_LOG_SAMPLE_RATE is the
+# fraction of predictions logged with their inputs (0 = off, 1 = every one)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+PREDICT_LOG_SAMPLE_RATE = float(os.environ.get("PREDICT_LOG_SAMPLE_RATE", 0))
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
+request_log = SampledLogger("car_price.requests", PREDICT_LOG_SAMPLE_RATE)
+
+# Stage latency histograms and counters, exported on /metrics
+metrics = Metrics()
+
+if not any(os.path.exists(path) for path in MODEL_PATHS):
+    raise RuntimeError("No valid model found in any of the expected paths")
+
+# Cache repeat quotes on the normalized feature tuple. PREDICT_CACHE_SIZE=0
+# disables it; PREDICT_CACHE_DB points workers at a shared SQLite file.
+PREDICT_CACHE_SIZE = int(os.environ.get("PREDICT_CACHE_SIZE", 10000))
+PREDICT_CACHE_TTL = float(os.environ.get("PREDICT_CACHE_TTL", 3600))
+PREDICT_CACHE_DB = os.environ.get("PREDICT_CACHE_DB")
+
+prediction_cache = None
+if PREDICT_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(
+        maxsize=PREDICT_CACHE_SIZE,
+        ttl=PREDICT_CACHE_TTL,
+        backend=SqliteBackend(PREDICT_CACHE_DB) if PREDICT_CACHE_DB else None,
+    )
+
+# The result card's what-if curves of recent quotes, so a repeat quote skips
+# scoring the curve grids too (local to the worker; same size and TTL)
+curve_cache = None
+if PREDICT_CACHE_SIZE > 0:
+    curve_cache = PredictionCache(maxsize=PREDICT_CACHE_SIZE, ttl=PREDICT_CACHE_TTL)
+
+# Form choices; the what-if index precomputes curves for every combination
+FUEL_OPTIONS = ["Petrol", "Diesel"]
+TRANSMISSION_OPTIONS = ["Manual", "Automatic"]
+BRAND_OPTIONS = [
+    "Maruti","Hyundai","Honda","Toyota","Skoda","BMW","Audi","Mercedes-Benz","Ford",
+    "Volkswagen","Mahindra","Tata","Renault","Chevrolet","Nissan","Kia","Jeep",
+    "Land Rover","Ashok Leyland","Datsun","Fiat","Jaguar","Mini","Mitsubishi","Porsche","Volvo","Others"
 ]
 
-model = None
-for MODEL_PATH in MODEL_PATHS:
-    if os.path.exists(MODEL_PATH):
+# Input drift: served rows are counted against the training profile stored
+# with the model and scored every DRIFT_CHECK_INTERVAL seconds (0 disables
+# the checks) once DRIFT_MIN_ROWS rows have come in
+DRIFT_CHECK_INTERVAL = float(os.environ.get("DRIFT_CHECK_INTERVAL", 300))
+DRIFT_MIN_ROWS = int(os.environ.get("DRIFT_MIN_ROWS", 200))
+drift = DriftMonitor(interval=DRIFT_CHECK_INTERVAL, min_rows=DRIFT_MIN_ROWS)
+
+# Rebuild the what-if quote index whenever a model is swapped in
+# (WHATIF_INDEX=False disables it; curves are then always scored)
+WHATIF_INDEX = os.environ.get("WHATIF_INDEX", "True").lower() == "true"
+quote_index = None
+
+def on_model_swap(model_version):
+    global quote_index
+    if prediction_cache is not None:
+        prediction_cache.set_version(model_version.version)
+    if curve_cache is not None:
+        curve_cache.set_version(model_version.version)
+    drift.load_reference(model_version.path)
+    if WHATIF_INDEX:
         try:
-            model = joblib.load(MODEL_PATH)
-            print(f"Model loaded successfully from {MODEL_PATH}")
-            break
+            quote_index = QuoteIndex.build(model_version.model, BRAND_OPTIONS, FUEL_OPTIONS,
+                                           TRANSMISSION_OPTIONS, model_version.version)
         except Exception as e:
-            print(f"Failed to load model from {MODEL_PATH}. Error: {e}")
-            continue
+            quote_index = None
+            logging.getLogger(__name__).warning("What-if index not built: %s", e)
 
-if model is None:
-    raise RuntimeError("No valid model found in any of the expected paths")
+# The model loads on first use (gunicorn loads it in the master before
+# forking) and is hot-swapped when a new version appears at MODEL_PATHS
+registry = ModelRegistry(MODEL_PATHS, fast_inference=FAST_INFERENCE,
+                         poll_interval=MODEL_POLL_INTERVAL, on_swap=on_model_swap)
+
+def get_model():
+    return registry.get().model
+
+# A/B arms and shadow models next to the primary, e.g.
+# MODEL_VARIANTS="rf=../model/car_price_rf.model:0.1" sends 10% of listings to
+# rf, MODEL_SHADOWS="linear=../model/car_price_linear.model" scores every
+# request with linear off the response path (see model_router.py)
+router = ModelRouter(registry, parse_models(os.environ.get("MODEL_VARIANTS")),
+                     parse_models(os.environ.get("MODEL_SHADOWS"), weighted=False),
+                     fast_inference=FAST_INFERENCE, poll_interval=MODEL_POLL_INTERVAL,
+                     shadow_queue=int(os.environ.get("SHADOW_QUEUE", 1000)),
+                     shadow_max_rows=int(os.environ.get("SHADOW_MAX_ROWS", 1000)),
+                     shadow_sample_rate=float(os.environ.get("SHADOW_SAMPLE_RATE", 1.0)))
+
+# Startup: with MODEL_WARMUP=background pages are served as soon as the app
+# is imported. The models load on a warm-up thread (start_warmup: gunicorn
+# starts one per worker after the fork) and /api/ready answers 503 until the
+# primary can score; predictions that arrive earlier wait for it.
+# MODEL_WARMUP=preload loads them in the gunicorn master before forking, so
+# workers share the model's memory, but nothing is served until it is loaded.
+# The default, auto, preloads when the primary model imports xgboost (and
+# with it sklearn and scipy, which each worker would otherwise import and
+# hold on its own) and warms up in the background on the numpy runtime.
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "auto").lower()
+if MODEL_WARMUP == "auto":
+    _primary = next(path for path in MODEL_PATHS if os.path.exists(path))
+    MODEL_WARMUP = "preload" if uses_xgboost(_primary) else "background"
+startup = {"import_seconds": None, "warmup_seconds": None, "ready_seconds": None, "error": None}
+_warmup_pid = None
+_warmup_lock = threading.Lock()
+
+def start_warmup():
+    """Load the models on a background thread, once per process."""
+    global _warmup_pid
+    with _warmup_lock:
+        if _warmup_pid == os.getpid():
+            return
+        _warmup_pid = os.getpid()
+    threading.Thread(target=_warm_up, name="model-warmup", daemon=True).start()
+
+def _warm_up():
+    start = time.perf_counter()
+    router.preload()  # the primary plus any A/B and shadow models
+    if registry.loaded:
+        registry.get()  # starts the model watcher
+        startup["error"] = None
+    else:
+        startup["error"] = "primary model not loaded, see the log"
+    startup["warmup_seconds"] = time.perf_counter() - start
+    startup["ready_seconds"] = time.perf_counter() - STARTED
+
+# Coalesce concurrent single-row predictions into one model.predict call.
+# PREDICT_BATCH_WINDOW_MS=0 scores every request on its own.
+PREDICT_BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", 2))
+PREDICT_MAX_BATCH = int(os.environ.get("PREDICT_MAX_BATCH", 64))
+
+# Every row in a batch is scored by one model version; each caller gets
+# (log price, version) back
+def score_versioned(rows):
+    if router.active:
+        log_prices, version = router.score(PRIMARY, rows, metrics)
+    else:
+        current = registry.get()
+        log_prices, version = score_rows(current.model, rows, metrics), current.version
+    return [(float(p), version) for p in log_prices]
+
+coalescer = MicroBatcher(
+    score_versioned,
+    window_ms=PREDICT_BATCH_WINDOW_MS,
+    max_batch_size=PREDICT_MAX_BATCH,
+)
+
+metrics.add_histogram("coalescer_batch_size", "Rows per coalesced predict call",
+                      coalescer.batch_sizes)
+metrics.add_histogram("coalescer_added_latency_seconds", "Queueing delay added by coalescing",
+                      coalescer.added_latency)
+metrics.add_gauge("coalescer_queue_depth", "Rows waiting for the coalescer",
+                  lambda: coalescer.queue_depth)
+if prediction_cache is not None:
+    metrics.add_counter("cache_lookups_total", "Prediction cache lookups by result", lambda: {
+        (("result", "hit"),): prediction_cache.hits,
+        (("result", "shared_hit"),): prediction_cache.shared_hits,
+        (("result", "miss"),): prediction_cache.misses,
+    })
+    metrics.add_gauge("cache_entries", "Predictions held in the local cache",
+                      lambda: len(prediction_cache._entries))
+    metrics.add_counter("curve_cache_lookups_total", "What-if curve cache lookups by result", lambda: {
+        (("result", "hit"),): curve_cache.hits,
+        (("result", "miss"),): curve_cache.misses,
+    })
+
+# Scores of the last drift check, per feature
+def drift_gauge(key):
+    def read():
+        report = drift.last_report
+        if report is None:
+            return {}
+        return {(("feature", f),): e[key] for f, e in report["features"].items() if key in e}
+    return read
+
+metrics.add_gauge("drift_psi", "Population stability index against the training data",
+                  drift_gauge("psi"))
+metrics.add_gauge("drift_ks", "KS distance against the training data (numeric features)",
+                  drift_gauge("ks"))
+metrics.add_gauge("input_missing_rate", "Share of inputs left to the imputers",
+                  drift_gauge("missing_rate"))
+metrics.add_gauge("input_unseen_rate", "Share of categories unseen in training",
+                  drift_gauge("unseen_rate"))
+if router.active:
+    router.gauges(metrics)
+
+def predict_log_price(listing):
+    """Log price and the model version that produced it.
+
+    With A/B arms configured, the listing picks its arm; only the primary's
+    prices go through the cache and the coalescer.
+    """
+    key = cache_key(listing) if prediction_cache is not None or router.active else None
+    arm = router.choose(key) if router.active else PRIMARY
+    if arm != PRIMARY:
+        log_prices, version = router.score(arm, [listing], metrics)
+        return float(log_prices[0]), version
+    if prediction_cache is not None:
+        version = prediction_cache.version
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            return cached, version
+
+    if PREDICT_BATCH_WINDOW_MS > 0:
+        pred_log, version = coalescer.predict(listing)
+    else:
+        pred_log, version = score_versioned([listing])[0]
+
+    if prediction_cache is not None:
+        prediction_cache.put(key, pred_log, version)
+    return pred_log, version
+
+def what_if_curves(listing, grids=None, current=None):
+    """({field: (values, log_prices)}, model version) for a normalized listing.
+
+    ``grids`` maps each field to its x values; None (the default for every
+    field of CURVE_GRIDS) means the standard grid, which is answered from the
+    quote index when the listing matches an entry. The remaining fields are
+    scored together in one batch. ``current`` is the ModelVersion to use
+    (default: the primary).
+    """
+    current = current or registry.get()
+    index = quote_index
+    curves, to_score = {}, {}
+    for field, values in (grids or dict.fromkeys(CURVE_GRIDS)).items():
+        hit = None
+        if values is None:
+            values = CURVE_GRIDS[field]
+            if index is not None:
+                hit = index.lookup(listing, field, current.version)
+        if hit is not None:
+            curves[field] = hit
+            metrics.inc("whatif_curves_total", help="What-if curves served", source="index")
+        else:
+            to_score[field] = values
+    if to_score:
+        with metrics.time("whatif"):
+            curves.update(price_curves(current.model, listing, to_score, metrics))
+        metrics.inc("whatif_curves_total", len(to_score), help="What-if curves served", source="model")
+    return curves, current.version
 
 # Initialize Dash application
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
@@ -43,7 +298,6 @@ app.index_string = '''
         {%favicon%}
         {%css%}
         <style>
-            @import url('https://fonts.googleapis.com/css2?family=Georgia:wght@400;700&display=swap');
             body {
                 font-family: 'Georgia', serif !important;
                 margin: 0;
@@ -118,18 +372,15 @@ app.index_string = '''
 </html>
 '''
 
-# Create navigation bar component
-def create_navbar(current_page):
+# Create navigation bar component; the show_page clientside callback marks
+# the active link
+def create_navbar():
     return html.Div([
         html.Div([
-            html.A("Car Price Predictor", href="/", className="nav-logo"),
+            dcc.Link("Car Price Predictor", href="/", className="nav-logo"),
             html.Div([
-                html.A("Instructions", 
-                      href="/", 
-                      className=f"nav-link {'active' if current_page == 'home' else ''}"),
-                html.A("Predict Price", 
-                      href="/predict", 
-                      className=f"nav-link {'active' if current_page == 'predict' else ''}"),
+                dcc.Link("Instructions", href="/", id="nav-home", className="nav-link"),
+                dcc.Link("Predict Price", href="/predict", id="nav-predict", className="nav-link"),
             ], className="nav-links")
         ], className="nav-container")
     ], className="nav-bar")
@@ -137,7 +388,6 @@ def create_navbar(current_page):
 # Create instructions page layout
 def instructions_layout():
     return html.Div([
-        create_navbar('home'),
         html.Div([
             html.Div([
                 html.H1("Welcome to Car Price Prediction System", 
@@ -183,7 +433,7 @@ def instructions_layout():
                 ]),
                 
                 html.Div([
-                    html.A("Start Predicting Prices →", 
+                    dcc.Link("Start Predicting Prices →", 
                            href="/predict",
                            style={
                                'display': 'inline-block',
@@ -241,7 +491,6 @@ def labeled_dropdown(label, id_, options, value=None):
 # Create prediction page layout
 def prediction_layout():
     return html.Div([
-        create_navbar('predict'),
         html.Div([
             html.Div([
                 html.H1("Car Price Prediction", 
@@ -253,8 +502,8 @@ def prediction_layout():
                     html.Div([
                         labeled_input("Year of Manufacture", "year", placeholder="e.g., 2016 (leave blank for median from data)", min=1980, max=2030, step=1),
                         labeled_input("Kilometers Driven", "km", placeholder="e.g., 55000 (leave blank for median from data)", min=0, step=100),
-                        labeled_dropdown("Fuel Type", "fuel", ["Petrol", "Diesel"]),
-                        labeled_dropdown("Transmission", "transmission", ["Manual", "Automatic"]),
+                        labeled_dropdown("Fuel Type", "fuel", FUEL_OPTIONS),
+                        labeled_dropdown("Transmission", "transmission", TRANSMISSION_OPTIONS),
                         labeled_dropdown("Number of Previous Owners", "owner", ["First Owner", "Second Owner", "Third Owner", "Fourth & Above Owner"]),
                     ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top'}),
                     
@@ -262,11 +511,7 @@ def prediction_layout():
                         labeled_input("Mileage (kmpl)", "mileage", placeholder="e.g., 18.5 (leave blank for mean from data)", min=0, step=0.1),
                         labeled_input("Engine Displacement (CC)", "engine", placeholder="e.g., 1197 (leave blank for median from data)", min=200, step=1),
                         labeled_input("Max Power (bhp)", "power", placeholder="e.g., 82 (leave blank for median from data)", min=10, step=1),
-                        labeled_dropdown("Brand", "brand", [
-                            "Maruti","Hyundai","Honda","Toyota","Skoda","BMW","Audi","Mercedes-Benz","Ford",
-                            "Volkswagen","Mahindra","Tata","Renault","Chevrolet","Nissan","Kia","Jeep",
-                            "Land Rover","Ashok Leyland","Datsun","Fiat","Jaguar","Mini","Mitsubishi","Porsche","Volvo","Others"
-                        ]),
+                        labeled_dropdown("Brand", "brand", BRAND_OPTIONS),
                         html.Div(style={'marginBottom': '20px'})  # Spacing
                     ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top', 'marginLeft': '4%'})
                 ]),
@@ -287,30 +532,52 @@ def prediction_layout():
                                "fontFamily": "Georgia, serif"
                            }),
                 
+                # Filled by the render_result clientside callback from the store
+                dcc.Store(id="prediction"),
                 html.Div(id="result-section", style={'marginTop': '30px'})
                 
             ], className="form-container")
         ], className="container")
     ])
 
-# Set up main app layout with URL routing
+# Set up main app layout. Both pages are built once at import and sent with
+# the layout; switching between them is a clientside style change, so
+# navigation costs no server round trip and keeps the form filled in.
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
-    html.Div(id='page-content')
+    create_navbar(),
+    html.Div(instructions_layout(), id='home-page'),
+    html.Div(prediction_layout(), id='predict-page', style={'display': 'none'}),
 ])
 
-# Handle URL routing to display correct page
-@app.callback(Output('page-content', 'children'),
-              Input('url', 'pathname'))
-def display_page(pathname):
-    if pathname == '/predict':
-        return prediction_layout()
-    else:  # Default to instructions page
-        return instructions_layout()
+# Show the page for the URL and mark its nav link (assets/result_card.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="car_price", function_name="show_page"),
+    Output('home-page', 'style'),
+    Output('predict-page', 'style'),
+    Output('nav-home', 'className'),
+    Output('nav-predict', 'className'),
+    Input('url', 'pathname'),
+)
 
-# Handle price prediction when button is clicked
-@app.callback(
+# Render the result card from the prediction payload, including the
+# placeholder shown before the first click
+app.clientside_callback(
+    ClientsideFunction(namespace="car_price", function_name="render_result"),
     Output("result-section", "children"),
+    Input("prediction", "data"),
+)
+
+def curve_payload(values, log_prices, current):
+    """x values, rounded prices and the listing's own value of one what-if curve."""
+    x = values.astype(np.int64) if np.all(values == np.round(values)) else values
+    return {"x": x.tolist(), "y": np.round(np.exp(log_prices)).astype(np.int64).tolist(),
+            "current": None if current is None or np.isnan(current) else float(current)}
+
+# Handle price prediction when button is clicked. Only the numbers go back;
+# render_result turns them into the result card in the browser.
+@app.callback(
+    Output("prediction", "data"),
     Input("predict", "n_clicks"),
     State("year", "value"),
     State("km", "value"),
@@ -321,139 +588,199 @@ def display_page(pathname):
     State("engine", "value"),
     State("power", "value"),
     State("brand", "value"),
+    prevent_initial_call=True,
 )
 def predict_price(n_clicks, year, km, fuel, transmission, owner, mileage, engine, power, brand):
-    if not n_clicks:
-        return html.Div([
-            html.P("Fill in the form above and click 'Predict Price' to get your estimate.", 
-                  style={'textAlign': 'center', 'color': '#7f8c8d', 'fontSize': '16px'})
-        ])
-    
-    # Map owner text to numeric values for model input
-    owner_mapping = {
-        'First Owner': 1,
-        'Second Owner': 2,
-        'Third Owner': 3,
-        'Fourth & Above Owner': 4
-    }
-    
-    # Convert owner text to number if provided
-    owner_num = owner_mapping.get(owner) if owner is not None else None
-
-    # Map Brand for Land Rover and Ashok Leyland, otherwise keep original brand
-    brand_mapping = {
-        'Land Rover': 'Land',
-        'Ashok Leyland': 'Ashok'
-    }
-    if brand is not None:
-        if brand in brand_mapping:
-            brand = brand_mapping.get(brand, brand)
-    else:
-        brand = None
-
-    # Prepare input data for model prediction
-    # Leave missing values as NaN/None - the pipeline will handle imputation
-    row = pd.DataFrame([{
-        "year": float(year) if year is not None else np.nan,
-        "km_driven": float(km) if km is not None else np.nan,
-        "fuel": str(fuel) if fuel is not None else None,
-        "transmission": str(transmission) if transmission is not None else None,
-        "owner": float(owner_num) if owner_num is not None else np.nan,  # Model expects numeric owner
-        "engine": float(engine) if engine is not None else np.nan,  # Model expects numeric engine
-        "max_power": float(power) if power is not None else np.nan,  # Model expects numeric max_power
-        "brand": str(brand) if brand is not None else None,
-        "mileage": float(mileage) if mileage is not None else np.nan,  # Model expects numeric mileage
-    }])
+    # Map owner/brand text to model values and leave missing values as NaN
+    # - the pipeline will handle imputation
+    with metrics.time("normalize"):
+        listing = normalize_listing({
+            "year": year, "km_driven": km, "fuel": fuel, "transmission": transmission,
+            "owner": owner, "engine": engine, "max_power": power, "brand": brand,
+            "mileage": mileage,
+        })
+    drift.observe([listing])
 
     # Track which fields are missing for user feedback
-    imputed_fields = []
-    for col in row.columns:
-        if pd.isna(row.at[0, col]) or row.at[0, col] is None:
-            imputed_fields.append(col)
+    imputed_fields = missing_fields(listing)
 
     # Make prediction and convert from log scale to price
     try:
-        # Debug information for troubleshooting
-        print("Input row shape:", row.shape)
-        print("Input row columns:", list(row.columns))
-        print("Input row values:", row.iloc[0].to_dict())
-        print("Imputed fields:", imputed_fields)
-        
-        pred_log = float(model.predict(row)[0])
+        pred_log, model_version = predict_log_price(listing)
         price = float(np.exp(pred_log))
-        
-        print(f"Predicted log price: {pred_log:.4f}")
-        print(f"Predicted price: {price:.2f}")
-        
-        # Display prediction results with styling
-        result_content = [
-            html.H2(f"Estimated Price: {price:,.0f}", 
-                   style={'textAlign': 'center', 'color': '#27ae60', 'fontSize': '32px', 'marginBottom': '20px'}),
-        ]
-        
-        # Show imputation information if fields were auto-filled
-        if imputed_fields:
-            imputation_mapping = {
-                "year": "Year → Median from training data",
-                "km_driven": "Kilometers → Median from training data", 
-                "owner": "Owner → Median from training data",
-                "mileage": "Mileage → Mean from training data",
-                "engine": "Engine → Median from training data",
-                "max_power": "Max Power → Median from training data",
-                "fuel": "Fuel Type → Most frequent from training data",
-                "transmission": "Transmission → Most frequent from training data",
-                "brand": "Brand → Most frequent from training data"
+
+        # Likely price range from the interval table of the version that priced
+        # it; the what-if curves (price against km and year with everything
+        # else fixed) come from the same model
+        current = router.find(model_version) if router.active else registry.get()
+        if current is not None and current.version != model_version:
+            current = None
+        bounds = price_bounds(current.model, [pred_log]) if current is not None else None
+        # Curves are cached for the primary's version only
+        key = cache_key(listing) if curve_cache is not None and curve_cache.version == model_version else None
+        curve_payloads = curve_cache.get(key) if key is not None else None
+        if curve_payloads is None:
+            curves, _ = what_if_curves(listing, current=current)
+            with metrics.time("render"):
+                curve_payloads = {field: curve_payload(*curves[field], listing[field]) for field in curves}
+            if key is not None:
+                curve_cache.put(key, curve_payloads, model_version)
+        metrics.inc("predictions_total", help="Predictions served", endpoint="form")
+
+        if request_log.sampled():
+            request_log.info("quote %s imputed=%s log_price=%.4f price=%.2f model=%s",
+                             listing, imputed_fields, pred_log, price, model_version)
+
+        with metrics.time("render"):
+            result = {
+                "price": round(price),
+                "imputed": imputed_fields,
+                "version": model_version,
+                "curves": curve_payloads,
             }
-            
-            result_content.append(
-                html.Div([
-                    html.H4("Note: Missing Information Handled by Pipeline", 
-                           style={'color': '#f39c12', 'marginBottom': '15px'}),
-                    html.P("The following fields were automatically filled using the trained pipeline's imputation strategy:", 
-                          style={'color': '#7f8c8d', 'marginBottom': '10px'}),
-                    html.Ul([
-                        html.Li(imputation_mapping.get(field, f"{field} → pipeline default")) 
-                        for field in imputed_fields
-                    ], style={'color': '#7f8c8d', 'lineHeight': '1.5'})
-                ], style={
-                    'backgroundColor': '#fef9e7', 
-                    'padding': '20px', 
-                    'borderRadius': '5px',
-                    'border': '1px solid #f39c12',
-                    'marginTop': '20px'
-                })
-            )
-        
-        result_content.extend([
-            html.Hr(style={'margin': '30px 0'}),
-            html.Div([
-                html.P("Model trained on Petrol & Diesel vehicles only.", 
-                      style={'color': '#e74c3c', 'textAlign': 'center', 'fontSize': '14px', 'fontWeight': 'bold'})
-            ])
-        ])
-        
-        return html.Div(result_content, style={
-            'backgroundColor': 'white', 
-            'padding': '30px', 
-            'borderRadius': '10px',
-            'boxShadow': '0 2px 10px rgba(0,0,0,0.1)',
-            'border': '3px solid #27ae60'
-        })
-        
+            if bounds is not None:
+                result["range"] = [round(float(np.exp(bounds[0][0]))), round(float(np.exp(bounds[1][0]))),
+                                   current.model.intervals.coverage]
+        # Queued last so the shadow models do not compete with this response
+        router.shadow([listing], [pred_log])
+        return result
+
     except Exception as e:
-        print(f"Prediction error: {e}")
-        print(f"Model type: {type(model)}")
-        return html.Div([
-            html.H3("Prediction Failed", style={'color': '#e74c3c', 'textAlign': 'center'}),
-            html.P(f"Error: {str(e)}", style={'color': '#7f8c8d', 'textAlign': 'center'}),
-            html.P("Please check your input data and try again.", style={'color': '#7f8c8d', 'textAlign': 'center'})
-        ], style={
-            'backgroundColor': '#fdf2f2', 
-            'padding': '20px', 
-            'borderRadius': '5px',
-            'border': '2px solid #e74c3c',
-            'marginTop': '20px'
-        })
+        metrics.inc("prediction_errors_total", help="Failed predictions", endpoint="form")
+        request_log.error("Prediction failed for %s (model %s): %s",
+                          listing, registry.status()['current'], e)
+        return {"error": str(e)}
+
+# Batch scoring endpoint: JSON array, NDJSON or CSV in, same format streamed out
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", 100000))
+
+@server.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    try:
+        fmt, records = parse_listings(request.get_data(), request.mimetype)
+        if len(records) > BATCH_MAX_ROWS:
+            return jsonify(error=f"batch of {len(records)} rows exceeds the {BATCH_MAX_ROWS} row limit"), 413
+        current = registry.get()
+        log_prices = predict_log_prices(current.model, records, metrics, drift)
+    except BatchError as e:
+        metrics.inc("prediction_errors_total", help="Failed predictions", endpoint="batch")
+        return jsonify(error=str(e)), 400
+    metrics.inc("predictions_total", len(records), help="Predictions served", endpoint="batch")
+    router.shadow(records, log_prices, raw=True)
+
+    bounds = price_bounds(current.model, log_prices)
+    headers = {"X-Model-Version": current.version}
+    if bounds is not None:
+        headers["X-Interval-Coverage"] = f"{current.model.intervals.coverage:g}"
+    return Response(stream_with_context(stream_predictions(records, log_prices, fmt, bounds)),
+                    mimetype=MIMETYPES[fmt], headers=headers)
+
+# What-if endpoint: one listing plus the field to vary; optional "values"
+# (default: the standard grid, answered from the quote index when possible)
+@server.route("/api/predict/curve", methods=["POST"])
+def predict_curve():
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify(error="expected a JSON object"), 400
+    field, values = body.get("field"), body.get("values")
+    if not isinstance(field, str):
+        return jsonify(error="'field' must be a string"), 400
+    if field not in CURVE_GRIDS and values is None:
+        return jsonify(error=f"'field' must be one of {sorted(CURVE_GRIDS)} or come with 'values'"), 400
+    if not isinstance(body.get("listing") or {}, dict):
+        return jsonify(error="'listing' must be an object"), 400
+    try:
+        listing = normalize_listing(body.get("listing") or {})
+        if field not in listing:
+            return jsonify(error=f"unknown field {field!r}"), 400
+        if values is not None:
+            if not isinstance(values, list) or not 0 < len(values) <= MAX_CURVE_POINTS:
+                return jsonify(error=f"'values' must be a list of 1 to {MAX_CURVE_POINTS} numbers"), 400
+            # normalize_listing rejects infinities, as it does in the listing;
+            # null and NaN would be sent back as invalid JSON
+            values = [None if v is None else normalize_listing({field: v})[field] for v in values]
+            if any(v is None or (isinstance(v, float) and not math.isfinite(v)) for v in values):
+                return jsonify(error="'values' must not contain null or non-finite numbers"), 400
+        curves, version = what_if_curves(listing, {field: values})
+    except BatchError as e:
+        return jsonify(error=str(e)), 400
+    xs, log_prices = curves[field]
+    return jsonify(field=field, values=xs.tolist(), prices=np.round(np.exp(log_prices), 2).tolist(),
+                   model_version=version)
+
+# Prometheus scrape endpoint (per worker process)
+@server.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@server.route("/api/drift")
+def drift_status():
+    return jsonify(reference=drift.reference is not None, check_interval=drift.interval,
+                   rows_seen=drift.rows_seen,
+                   rows_in_window=drift.window.rows if drift.window is not None else 0,
+                   last_report=drift.last_report)
+
+# Readiness: 200 once the primary model can score, 503 while it loads. Also
+# starts the warm-up where no gunicorn hook did (any other WSGI server).
+@server.route("/api/ready")
+def readiness():
+    start_warmup()
+    current = registry.current
+    body = {"ready": current is not None, "model_version": current.version if current else None,
+            "warmup": MODEL_WARMUP, "startup": startup, "pid": os.getpid()}
+    return jsonify(body), 200 if current is not None else 503
+
+# Side-by-side accounting of the primary, A/B arms and shadow models
+@server.route("/api/models")
+def model_stats():
+    return jsonify(router.describe())
+
+@server.route("/api/coalescer/stats")
+def coalescer_stats():
+    return jsonify(coalescer.stats())
+
+@server.route("/api/cache/stats")
+def cache_stats():
+    if prediction_cache is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **prediction_cache.stats(), curves=curve_cache.stats())
+
+# Model admin: status, hot reload and rollback. Requires the X-Admin-Token
+# header to match ADMIN_TOKEN. Actions are recorded in a control file next to
+# the model so every gunicorn worker applies them.
+def admin_denied():
+    if not ADMIN_TOKEN:
+        return jsonify(error="admin endpoints are disabled; set ADMIN_TOKEN"), 403
+    if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify(error="invalid admin token"), 401
+    return None
+
+@server.route("/admin/model", methods=["GET"])
+def model_status():
+    return admin_denied() or jsonify(registry.status())
+
+@server.route("/admin/model/reload", methods=["POST"])
+def model_reload():
+    denied = admin_denied()
+    if denied:
+        return denied
+    path = (request.get_json(silent=True) or {}).get("path")
+    try:
+        return jsonify(loaded=registry.broadcast("reload", path), status=registry.status())
+    except Exception as e:
+        return jsonify(error=f"reload failed, current model kept: {e}"), 409
+
+@server.route("/admin/model/rollback", methods=["POST"])
+def model_rollback():
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        return jsonify(loaded=registry.broadcast("rollback"), status=registry.status())
+    except LookupError as e:
+        return jsonify(error=str(e)), 409
+
+startup["import_seconds"] = time.perf_counter() - STARTED
 
 # Start the application
 if __name__ == "__main__":
@@ -463,5 +790,8 @@ if __name__ == "__main__":
     
     print(f"Starting Car Price Prediction App on port {port}")
     print(f"Debug mode: {'ON' if debug else 'OFF'}")
-    
+
+    # With debug on, the reloader's parent process only watches files
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warmup()
     app.run(host="0.0.0.0", port=port, debug=debug)
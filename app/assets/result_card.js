@@ -0,0 +1,134 @@
+/*
+ * result_card.js
+ * Clientside callbacks for the Dash app: page switching between the two
+ * prebuilt pages, and the prediction result card rendered from the numeric
+ * payload that the predict_price callback stores in dcc.Store("prediction").
+ * Dash serves this file from assets/ and the browser caches it.
+ */
+(function () {
+    var IMPUTATION_NOTES = {
+        year: "Year → Median from training data",
+        km_driven: "Kilometers → Median from training data",
+        owner: "Owner → Median from training data",
+        mileage: "Mileage → Mean from training data",
+        engine: "Engine → Median from training data",
+        max_power: "Max Power → Median from training data",
+        fuel: "Fuel Type → Most frequent from training data",
+        transmission: "Transmission → Most frequent from training data",
+        brand: "Brand → Most frequent from training data"
+    };
+
+    var CURVE_TITLES = {
+        km_driven: "What if: price vs kilometers driven",
+        year: "What if: price vs year"
+    };
+
+    var NOTE = {textAlign: "center", color: "#7f8c8d", fontSize: "16px"};
+
+    function el(type, props, children) {
+        props = Object.assign({}, props);
+        if (children !== undefined) {
+            props.children = children;
+        }
+        return {type: type, namespace: "dash_html_components", props: props};
+    }
+
+    function money(value) {
+        return Math.round(value).toLocaleString("en-US");
+    }
+
+    function curveGraph(field, curve) {
+        var data = [{x: curve.x, y: curve.y, type: "scatter", mode: "lines",
+                     line: {color: "#27ae60"}, name: "price"}];
+        if (curve.current !== null && curve.current !== undefined) {
+            data.push({x: [curve.current, curve.current],
+                       y: [Math.min.apply(null, curve.y), Math.max.apply(null, curve.y)],
+                       type: "scatter", mode: "lines",
+                       line: {color: "#95a5a6", dash: "dot"}, name: "your car"});
+        }
+        return {
+            type: "Graph", namespace: "dash_core_components",
+            props: {
+                figure: {data: data, layout: {
+                    title: {text: CURVE_TITLES[field] || field, font: {size: 14}},
+                    height: 260, margin: {l: 60, r: 10, t: 40, b: 30}, showlegend: false
+                }},
+                config: {displayModeBar: false},
+                style: {width: "50%", display: "inline-block"}
+            }
+        };
+    }
+
+    function errorCard(message) {
+        return el("Div", {style: {backgroundColor: "#fdf2f2", padding: "20px", borderRadius: "5px",
+                                  border: "2px solid #e74c3c", marginTop: "20px"}}, [
+            el("H3", {style: {color: "#e74c3c", textAlign: "center"}}, "Prediction Failed"),
+            el("P", {style: {color: "#7f8c8d", textAlign: "center"}}, "Error: " + message),
+            el("P", {style: {color: "#7f8c8d", textAlign: "center"}},
+               "Please check your input data and try again.")
+        ]);
+    }
+
+    function resultCard(data) {
+        var content = [
+            el("H2", {style: {textAlign: "center", color: "#27ae60", fontSize: "32px", marginBottom: "20px"}},
+               "Estimated Price: " + money(data.price))
+        ];
+        if (data.range) {
+            content.push(el("P", {style: Object.assign({marginTop: "-10px"}, NOTE)},
+                "Likely range: " + money(data.range[0]) + " – " + money(data.range[1]) +
+                " (" + Math.round(data.range[2] * 100) + "% interval)"));
+        }
+        if (data.imputed.length) {
+            content.push(el("Div", {style: {backgroundColor: "#fef9e7", padding: "20px", borderRadius: "5px",
+                                            border: "1px solid #f39c12", marginTop: "20px"}}, [
+                el("H4", {style: {color: "#f39c12", marginBottom: "15px"}},
+                   "Note: Missing Information Handled by Pipeline"),
+                el("P", {style: {color: "#7f8c8d", marginBottom: "10px"}},
+                   "The following fields were automatically filled using the trained pipeline's imputation strategy:"),
+                el("Ul", {style: {color: "#7f8c8d", lineHeight: "1.5"}}, data.imputed.map(function (field) {
+                    return el("Li", {}, IMPUTATION_NOTES[field] || field + " → pipeline default");
+                }))
+            ]));
+        }
+        content.push(el("Div", {style: {marginTop: "20px"}}, Object.keys(data.curves).map(function (field) {
+            return curveGraph(field, data.curves[field]);
+        })));
+        content.push(el("Hr", {style: {margin: "30px 0"}}));
+        content.push(el("Div", {}, [
+            el("P", {style: {color: "#e74c3c", textAlign: "center", fontSize: "14px", fontWeight: "bold"}},
+               "Model trained on Petrol & Diesel vehicles only."),
+            el("P", {style: {color: "#95a5a6", textAlign: "center", fontSize: "12px"}},
+               "Model version: " + data.version)
+        ]));
+        return el("Div", {style: {backgroundColor: "white", padding: "30px", borderRadius: "10px",
+                                  boxShadow: "0 2px 10px rgba(0,0,0,0.1)", border: "3px solid #27ae60"}},
+                  content);
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        car_price: {
+            // url.pathname -> page visibility and the active nav link
+            show_page: function (pathname) {
+                var predict = pathname === "/predict";
+                return [
+                    {display: predict ? "none" : "block"},
+                    {display: predict ? "block" : "none"},
+                    "nav-link" + (predict ? "" : " active"),
+                    "nav-link" + (predict ? " active" : "")
+                ];
+            },
+            // prediction payload -> result card (placeholder before the first click)
+            render_result: function (data) {
+                if (!data) {
+                    return el("Div", {}, [el("P", {style: NOTE},
+                        "Fill in the form above and click 'Predict Price' to get your estimate.")]);
+                }
+                if (data.error) {
+                    return errorCard(data.error);
+                }
+                return resultCard(data);
+            }
+        }
+    });
+})();
@@ -0,0 +1,376 @@
+"""
+async_service.py
+Asyncio prediction front end for bursty API traffic, serving the same model
+as app.py. The event loop only parses requests and writes responses. Scoring
+runs in a small thread pool behind a bounded queue:
+- each client has a token-bucket rate limit (HTTP 429 with Retry-After)
+- once more than ASYNC_MAX_QUEUE rows are waiting, new work is refused
+  straight away (HTTP 503 with Retry-After). A burst is shed at the door
+  instead of piling up until every request times out.
+Queued single-row requests are scored together: each worker takes every job
+waiting when it becomes free, up to ASYNC_MAX_BATCH rows.
+
+Endpoints: POST /api/predict (one JSON listing), POST /api/predict/batch
+(same formats as the Dash app's batch endpoint), GET /metrics, GET /healthz.
+Needs the optional aiohttp dependency: pip install '.[async]'
+Run: python async_service.py [--port 8060]
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# One OpenMP thread per predict call; parallelism comes from the pool
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+import numpy as np  # noqa: E402
+
+from batch_api import (  # noqa: E402
+    MIMETYPES, BatchError, normalize_listing, parse_listings, price_bounds, score_rows,
+    stream_predictions,
+)
+from drift import DriftMonitor  # noqa: E402
+from metrics import LATENCY_BUCKETS, Histogram, Metrics  # noqa: E402
+from model_registry import MODEL_PATHS, ModelRegistry  # noqa: E402
+
+try:
+    from aiohttp import web
+except ImportError:  # optional dependency
+    web = None
+
+# Scoring threads, rows allowed to wait for them and rows per scoring call
+ASYNC_WORKERS = int(os.environ.get("ASYNC_WORKERS", os.cpu_count() or 1))
+ASYNC_MAX_QUEUE = int(os.environ.get("ASYNC_MAX_QUEUE", 256))
+ASYNC_MAX_BATCH = int(os.environ.get("ASYNC_MAX_BATCH", 256))
+
+# Per-client limit: sustained requests/sec and burst size (RATE_LIMIT_RPS=0
+# disables it). Clients are told apart by X-API-Key, else by address; with
+# TRUST_PROXY=True the first X-Forwarded-For hop is the address.
+RATE_LIMIT_RPS = float(os.environ.get("RATE_LIMIT_RPS", 20))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", 40))
+TRUST_PROXY = os.environ.get("TRUST_PROXY", "False").lower() == "true"
+
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", 100000))
+
+
+class Overloaded(Exception):
+    """Raised by PredictionScheduler.submit when the queue is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"prediction queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket per client: ``rate`` requests/sec sustained, ``burst`` at once.
+
+    Buckets are kept in least recently used order and the oldest are dropped
+    beyond ``max_clients``; a dropped client simply starts with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self.buckets = {}  # client -> (tokens, last refill time)
+
+    def acquire(self, client, now=None):
+        """0.0 if the request may go ahead, else seconds until it could."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        tokens, last = self.buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / self.rate
+        self.buckets[client] = (tokens, now)
+        if len(self.buckets) > self.max_clients:
+            del self.buckets[next(iter(self.buckets))]
+        return wait
+
+
+class PredictionScheduler:
+    """Bounded queue in front of ``workers`` threads running ``score_fn``.
+
+    ``score_fn(rows)`` returns (predictions, tag) for a list of normalized
+    rows; every submitted job is resolved with (its slice of predictions,
+    tag). Jobs wait in a queue of at most ``max_queue`` rows; a worker that
+    becomes free takes the next job plus whatever else is waiting, up to
+    ``max_batch`` rows, and scores them in one call. Must be started and used
+    on one event loop.
+    """
+
+    def __init__(self, score_fn, workers=1, max_queue=256, max_batch=256):
+        self.score_fn = score_fn
+        self.workers = max(1, int(workers))
+        self.max_queue = max_queue
+        self.max_batch = max(1, int(max_batch))
+        self.queued_rows = 0
+        self.in_flight_rows = 0
+        self.rows_per_sec = 0.0  # moving average of scoring throughput
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 1024])
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self._pending = deque()  # (rows, future, submitted)
+        self._wakeup = None
+        self._executor = None
+        self._tasks = []
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="predict")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    def retry_after(self, rows=0):
+        """Whole seconds until ``rows`` more rows could be queued, 1 to 60."""
+        backlog = self.queued_rows + self.in_flight_rows + rows
+        if self.rows_per_sec <= 0:
+            return 1
+        return int(min(60, max(1, math.ceil(backlog / self.rows_per_sec))))
+
+    async def submit(self, rows):
+        """Score ``rows`` as part of the next batch; raises Overloaded when full.
+
+        A job larger than the whole queue is only accepted into an empty queue.
+        """
+        if self.queued_rows and self.queued_rows + len(rows) > self.max_queue:
+            raise Overloaded(self.retry_after(len(rows)))
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rows, future, time.perf_counter()))
+        self.queued_rows += len(rows)
+        self._wakeup.set()
+        return await future
+
+    def _take(self):
+        jobs, n = [], 0
+        while self._pending and (not jobs or n + len(self._pending[0][0]) <= self.max_batch):
+            job = self._pending.popleft()
+            self.queued_rows -= len(job[0])
+            if job[1].done():  # client went away while queued
+                continue
+            jobs.append(job)
+            n += len(job[0])
+        return jobs, n
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            jobs, n = self._take()
+            if not jobs:
+                continue
+            started = time.perf_counter()
+            for _, _, submitted in jobs:
+                self.queue_wait.observe(started - submitted)
+            self.batch_sizes.observe(n)
+            self.in_flight_rows += n
+            try:
+                rows = [row for job_rows, _, _ in jobs for row in job_rows]
+                predictions, tag = await loop.run_in_executor(self._executor, self.score_fn, rows)
+            except Exception as e:
+                for _, future, _ in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.in_flight_rows -= n
+            seconds = time.perf_counter() - started
+            rate = n / seconds if seconds > 0 else 0.0
+            self.rows_per_sec = rate if not self.rows_per_sec else 0.8 * self.rows_per_sec + 0.2 * rate
+            start = 0
+            for job_rows, future, _ in jobs:
+                if not future.done():
+                    future.set_result((predictions[start:start + len(job_rows)], tag))
+                start += len(job_rows)
+
+    def stats(self):
+        return {"workers": self.workers, "max_queue": self.max_queue,
+                "max_batch": self.max_batch, "queued_rows": self.queued_rows,
+                "in_flight_rows": self.in_flight_rows, "rows_per_sec": self.rows_per_sec,
+                "batch_size": self.batch_sizes.snapshot(),
+                "queue_wait_p99_s": self.queue_wait.quantile(0.99)}
+
+
+# -- service ------------------------------------------------------------------
+metrics = Metrics()
+drift = DriftMonitor(interval=float(os.environ.get("DRIFT_CHECK_INTERVAL", 300)),
+                     min_rows=int(os.environ.get("DRIFT_MIN_ROWS", 200)))
+registry = ModelRegistry(MODEL_PATHS, poll_interval=float(os.environ.get("MODEL_POLL_INTERVAL", 10)),
+                         on_swap=lambda new: drift.load_reference(new.path))
+
+
+def score_versioned(rows):
+    drift.observe(rows)
+    current = registry.get()
+    return np.asarray(score_rows(current.model, rows, metrics), dtype=np.float64), current.version
+
+
+def client_id(request):
+    key = request.headers.get("X-API-Key")
+    if key:
+        return "key:" + key
+    if TRUST_PROXY and request.headers.get("X-Forwarded-For"):
+        return request.headers["X-Forwarded-For"].split(",")[0].strip()
+    return request.remote or "unknown"
+
+
+def _rate_limited(request):
+    """429 response if the client is over its rate limit, else None."""
+    wait = request.app["limiter"].acquire(client_id(request))
+    if not wait:
+        return None
+    return _rejected(429, "rate_limit", max(1, math.ceil(wait)), "rate limit exceeded")
+
+
+def _rejected(status, reason, retry_after, message):
+    metrics.inc("requests_rejected_total", help="Requests refused before scoring", reason=reason)
+    return web.json_response({"error": message, "retry_after": retry_after}, status=status,
+                             headers={"Retry-After": str(retry_after)})
+
+
+def _bounds(log_prices, version):
+    # registry.get() can wait for a reload: call it off the event loop
+    current = registry.get()
+    if current.version != version:
+        return None, None
+    bounds = price_bounds(current.model, log_prices)
+    return bounds, (current.model.intervals.coverage if bounds is not None else None)
+
+
+def _parse_batch(body, mimetype):
+    fmt, records = parse_listings(body, mimetype)
+    if len(records) > BATCH_MAX_ROWS:
+        raise BatchError(f"batch of {len(records)} rows exceeds the {BATCH_MAX_ROWS} row limit")
+    return fmt, records, [normalize_listing(record, i) for i, record in enumerate(records)]
+
+
+async def predict_one(request):
+    limited = _rate_limited(request)
+    if limited is not None:
+        return limited
+    try:
+        body = await request.json()
+        if not isinstance(body, dict):
+            raise BatchError("body must be one listing object")
+        row = normalize_listing(body)
+    except ValueError as e:  # BatchError and invalid JSON
+        metrics.inc("prediction_errors_total", help="Failed predictions", endpoint="async")
+        return web.json_response({"error": str(e)}, status=400)
+    loop = asyncio.get_running_loop()
+    try:
+        log_prices, version = await request.app["scheduler"].submit([row])
+    except Overloaded as e:
+        return _rejected(503, "overload", e.retry_after, str(e))
+    metrics.inc("predictions_total", help="Predictions served", endpoint="async")
+    result = {"log_price": round(float(log_prices[0]), 6),
+              "price": round(float(np.exp(log_prices[0])), 2), "model_version": version}
+    bounds, _ = await loop.run_in_executor(None, _bounds, log_prices, version)
+    if bounds is not None:
+        result["price_low"] = round(float(np.exp(bounds[0][0])), 2)
+        result["price_high"] = round(float(np.exp(bounds[1][0])), 2)
+    return web.json_response(result)
+
+
+async def predict_batch(request):
+    limited = _rate_limited(request)
+    if limited is not None:
+        return limited
+    scheduler = request.app["scheduler"]
+    # Refuse before reading and parsing the body when the queue is already full
+    if scheduler.queued_rows >= scheduler.max_queue:
+        return _rejected(503, "overload", scheduler.retry_after(), "prediction queue is full")
+    loop = asyncio.get_running_loop()
+    body = await request.read()
+    try:
+        fmt, records, rows = await loop.run_in_executor(None, _parse_batch, body, request.content_type)
+    except BatchError as e:
+        metrics.inc("prediction_errors_total", help="Failed predictions", endpoint="async_batch")
+        status = 413 if "row limit" in str(e) else 400
+        return web.json_response({"error": str(e)}, status=status)
+    if not rows:
+        return web.Response(text="".join(stream_predictions([], np.empty(0), fmt)),
+                            content_type=MIMETYPES[fmt])
+    try:
+        log_prices, version = await scheduler.submit(rows)
+    except Overloaded as e:
+        return _rejected(503, "overload", e.retry_after, str(e))
+    metrics.inc("predictions_total", len(rows), help="Predictions served", endpoint="async_batch")
+    bounds, coverage = await loop.run_in_executor(None, _bounds, log_prices, version)
+    headers = {"X-Model-Version": version}
+    if coverage is not None:
+        headers["X-Interval-Coverage"] = f"{coverage:g}"
+    text = await loop.run_in_executor(
+        None, lambda: "".join(stream_predictions(records, log_prices, fmt, bounds)))
+    return web.Response(text=text, content_type=MIMETYPES[fmt], headers=headers)
+
+
+async def prometheus_metrics(request):
+    return web.Response(text=metrics.render(),
+                        headers={"Content-Type": "text/plain; version=0.0.4"})
+
+
+async def healthz(request):
+    current = await asyncio.get_running_loop().run_in_executor(None, registry.get)
+    return web.json_response({"status": "ok", "model_version": current.version,
+                              "scheduler": request.app["scheduler"].stats(),
+                              "drift": drift.last_report})
+
+
+def create_app(workers=ASYNC_WORKERS, max_queue=ASYNC_MAX_QUEUE, max_batch=ASYNC_MAX_BATCH,
+               rate=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST):
+    if web is None:
+        raise RuntimeError("the async service needs aiohttp: pip install '.[async]'")
+    registry.preload()
+    scheduler = PredictionScheduler(score_versioned, workers, max_queue, max_batch)
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["scheduler"] = scheduler
+    app["limiter"] = RateLimiter(rate, burst)
+
+    metrics.add_gauge("async_in_flight_rows", "Rows being scored by the async service",
+                      lambda: scheduler.in_flight_rows)
+    metrics.add_gauge("async_queue_depth", "Rows waiting for a scoring thread",
+                      lambda: scheduler.queued_rows)
+    metrics.add_histogram("async_batch_size", "Rows per scoring call", scheduler.batch_sizes)
+    metrics.add_histogram("async_queue_wait_seconds", "Time spent queued before scoring",
+                          scheduler.queue_wait)
+
+    async def start(app):
+        await scheduler.start()
+
+    async def stop(app):
+        await scheduler.stop()
+
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+    app.router.add_post("/api/predict", predict_one)
+    app.router.add_post("/api/predict/batch", predict_batch)
+    app.router.add_get("/metrics", prometheus_metrics)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async rate-limited prediction service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ASYNC_PORT", 8060)))
+    args = parser.parse_args()
+    app = create_app()
+    web.run_app(app, host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+batch_api.py
+Helpers behind the /api/predict/batch endpoint: parse a JSON array, NDJSON or
+CSV body of listings, normalize every row the same way predict_price does,
+score the whole batch with a single model.predict and stream the results back.
+"""
+import csv
+import io
+import json
+import math
+
+import numpy as np
+
+from car_features import (  # noqa: F401  (re-exported for the other modules)
+    CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS, OWNER_MAPPING, UNIT_SUFFIXES,
+    brand_of, parse_unit,
+)
+
+# Accept the Dash form ids as well as the model column names
+FIELD_ALIASES = {"km": "km_driven", "power": "max_power"}
+
+# Request content types and the matching response formats
+FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+MIMETYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Number of result rows serialized per streamed chunk
+STREAM_CHUNK_ROWS = 1000
+
+
+class BatchError(ValueError):
+    """Raised for malformed batch bodies; reported to the client as HTTP 400."""
+
+
+def _is_missing(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip() == ""
+    return isinstance(value, float) and math.isnan(value)
+
+
+# The trees are evaluated on float32 features; larger magnitudes become inf
+MAX_ABS_VALUE = float(np.finfo(np.float32).max)
+
+
+def _to_float(value, field, index):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise BatchError(f"row {index}: '{field}' must be numeric, got {value!r}")
+    return _finite(number, field, index, value)
+
+
+def _finite(number, field, index, value):
+    # "inf", "nan" and 1e308 parse as floats but are not values a listing has
+    if not math.isfinite(number) or abs(number) > MAX_ABS_VALUE:
+        raise BatchError(f"row {index}: '{field}' must be a finite number, got {value!r}")
+    return number
+
+
+def normalize_listing(record, index=0):
+    """Turn one raw listing (form values or API record) into model inputs.
+
+    Missing values are left as NaN so the pipeline's imputers fill them
+    (SimpleImputer only masks NaN; a None category would be encoded as unknown).
+    """
+    record = {FIELD_ALIASES.get(k, k): v for k, v in record.items()}
+    row = {}
+    for col in FEATURE_COLUMNS:
+        value = record.get(col)
+        if _is_missing(value):
+            row[col] = np.nan
+        elif col == "owner":
+            owner = OWNER_MAPPING.get(value, value) if isinstance(value, str) else value
+            row[col] = _to_float(owner, col, index)
+        elif col in UNIT_SUFFIXES and isinstance(value, str):
+            # Raw Cars.csv strings such as "74 bhp" are accepted too
+            number = parse_unit(value, col)
+            if math.isnan(number):
+                raise BatchError(f"row {index}: '{col}' must be numeric, got {value!r}")
+            row[col] = _finite(number, col, index, value)
+        elif col in NUMERIC_COLUMNS:
+            row[col] = _to_float(value, col, index)
+        elif col == "brand":
+            row[col] = brand_of(value)
+        else:
+            row[col] = str(value).strip()
+    return row
+
+
+def missing_fields(row):
+    """List the feature columns the pipeline will have to impute."""
+    return [col for col in FEATURE_COLUMNS if _is_missing(row[col])]
+
+
+def listings_to_frame(rows):
+    """Build the model input DataFrame from normalized rows."""
+    # Imported here: only the sklearn pipeline path needs pandas
+    import pandas as pd
+
+    return pd.DataFrame.from_records(rows, columns=FEATURE_COLUMNS)
+
+
+def parse_listings(body, mimetype):
+    """Parse a request body into (format, list of raw records)."""
+    fmt = FORMATS.get((mimetype or "").lower())
+    if fmt is None:
+        raise BatchError(
+            f"unsupported content type {mimetype!r}; use one of {sorted(FORMATS)}"
+        )
+    try:
+        text = body.decode("utf-8-sig") if isinstance(body, bytes) else body
+    except UnicodeDecodeError as e:
+        raise BatchError(f"body is not UTF-8: {e}")
+
+    if fmt == "json":
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BatchError(f"invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise BatchError("JSON body must be an array of listing objects")
+    elif fmt == "ndjson":
+        records = []
+        for lineno, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise BatchError(f"invalid JSON on line {lineno}: {e}")
+    else:
+        records = list(csv.DictReader(io.StringIO(text)))
+
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise BatchError(f"row {i}: expected an object, got {type(record).__name__}")
+    return fmt, records
+
+
+def score_rows(model, rows, metrics=None):
+    """Score normalized rows; compiled pipelines take the dicts directly.
+
+    With ``metrics`` (a metrics.Metrics) the frame, preprocess and inference
+    stages are timed separately.
+    """
+    if metrics is None:
+        if getattr(model, "accepts_records", False):
+            return model.predict(rows)
+        return model.predict(listings_to_frame(rows))
+
+    if getattr(model, "accepts_records", False):
+        with metrics.time("preprocess"):
+            matrix = model.transform(rows)
+        with metrics.time("inference"):
+            return model.predict_matrix(matrix)
+    with metrics.time("frame"):
+        frame = listings_to_frame(rows)
+    if len(getattr(model, "steps", ())) < 2:
+        with metrics.time("inference"):
+            return model.predict(frame)
+    # Same as Pipeline.predict, split at the final estimator
+    with metrics.time("preprocess"):
+        matrix = model[:-1].transform(frame)
+    with metrics.time("inference"):
+        return model[-1].predict(matrix)
+
+
+def predict_log_prices(model, records, metrics=None, drift=None):
+    """Normalize all records and score them with one vectorized predict call.
+
+    ``drift`` (a drift.DriftMonitor) counts the normalized rows.
+    """
+    if metrics is None:
+        rows = [normalize_listing(record, i) for i, record in enumerate(records)]
+    else:
+        with metrics.time("normalize"):
+            rows = [normalize_listing(record, i) for i, record in enumerate(records)]
+    if drift is not None:
+        drift.observe(rows)
+    if not rows:
+        return np.empty(0, dtype=np.float64)
+    return np.asarray(score_rows(model, rows, metrics), dtype=np.float64)
+
+
+def price_bounds(model, log_prices):
+    """(low, high) log-price interval bounds from the model's interval table.
+
+    None when the model carries no table (e.g. a plain sklearn pickle).
+    """
+    table = getattr(model, "intervals", None)
+    if table is None:
+        return None
+    return table.apply(log_prices)
+
+
+def stream_predictions(records, log_prices, fmt, bounds=None):
+    """Yield the serialized results in chunks of STREAM_CHUNK_ROWS rows.
+
+    Each result echoes the listing's ``id`` (or its row index) together with
+    the log-scale prediction and the price, plus ``price_low``/``price_high``
+    when interval ``bounds`` are given.
+    """
+    ids = [record.get("id", i) for i, record in enumerate(records)]
+    prices = np.exp(log_prices)
+    lows, highs = (np.exp(bounds[0]), np.exp(bounds[1])) if bounds is not None else (None, None)
+
+    if fmt == "csv":
+        yield "id,log_price,price,price_low,price_high\n" if bounds is not None else "id,log_price,price\n"
+    elif fmt == "json":
+        yield "["
+
+    for start in range(0, len(ids), STREAM_CHUNK_ROWS):
+        stop = min(start + STREAM_CHUNK_ROWS, len(ids))
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            for i in range(start, stop):
+                row = [ids[i], f"{log_prices[i]:.6f}", f"{prices[i]:.2f}"]
+                if bounds is not None:
+                    row += [f"{lows[i]:.2f}", f"{highs[i]:.2f}"]
+                writer.writerow(row)
+            yield buf.getvalue()
+        else:
+            items = []
+            for i in range(start, stop):
+                item = {"id": ids[i],
+                        "log_price": round(float(log_prices[i]), 6),
+                        "price": round(float(prices[i]), 2)}
+                if bounds is not None:
+                    item["price_low"] = round(float(lows[i]), 2)
+                    item["price_high"] = round(float(highs[i]), 2)
+                items.append(json.dumps(item))
+            if fmt == "json":
+                yield ("," if start else "") + ",".join(items)
+            else:
+                yield "\n".join(items) + "\n"
+
+    if fmt == "json":
+        yield "]"
@@ -0,0 +1,152 @@
+"""
+car_features.py
+Feature engineering for the Cars.csv schema, shared by training
+(export_model.py), offline scoring and the web app, so a listing is turned
+into model inputs the same way everywhere.
+
+Column-wise parsing is done on the distinct values only: a column is
+factorized once (one hashing pass in C), the few hundred unique strings such
+as "23.4 kmpl" or "Land Rover Discovery" are parsed with a compiled regex, and
+the results are broadcast back with a single take. pandas is imported lazily
+so the serving path can use the scalar helpers without it.
+"""
+import math
+import re
+
+import numpy as np
+
+# Column order the trained pipeline expects
+FEATURE_COLUMNS = [
+    "year", "km_driven", "fuel", "transmission", "owner",
+    "engine", "max_power", "brand", "mileage",
+]
+NUMERIC_COLUMNS = ["year", "km_driven", "owner", "engine", "max_power", "mileage"]
+CATEGORICAL_COLUMNS = ["fuel", "transmission", "brand"]
+TARGET_COLUMN = "selling_price"
+
+# Cleaning rules (assignment): rows dropped before training and scoring
+EXCLUDED_FUELS = ["CNG", "LPG"]
+EXCLUDED_OWNERS = ["Test Drive Car"]
+
+# Map owner text to numeric values for model input
+OWNER_MAPPING = {
+    'First Owner': 1,
+    'Second Owner': 2,
+    'Third Owner': 3,
+    'Fourth & Above Owner': 4
+}
+
+# Unit suffixes stripped from the raw Cars.csv strings
+UNIT_SUFFIXES = {
+    "mileage": ["kmpl", "km/kg"],
+    "engine": ["CC"],
+    "max_power": ["bhp"],
+}
+UNIT_PATTERNS = {
+    col: re.compile(r"^\s*(.*?)\s*(?:%s)?\s*$" % "|".join(re.escape(s) for s in suffixes))
+    for col, suffixes in UNIT_SUFFIXES.items()
+}
+
+# The model is trained on the first word of the car name ("Land Rover
+# Discovery" -> "Land"); brand names from the form are reduced the same way
+_FIRST_WORD = re.compile(r"\S+")
+
+# Raw columns read from a Cars.csv file and their dtypes
+RAW_DTYPES = {
+    "name": "object", "year": "float64", "selling_price": "float64",
+    "km_driven": "float64", "fuel": "object", "transmission": "object",
+    "owner": "object", "mileage": "object", "engine": "object",
+    "max_power": "object",
+}
+
+
+def _to_number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_unit(value, column):
+    """Number from one raw value such as "74 bhp"; NaN if it does not parse."""
+    if isinstance(value, str):
+        return _to_number(UNIT_PATTERNS[column].match(value).group(1))
+    if value is None:
+        return math.nan
+    return _to_number(value)
+
+
+def brand_of(name):
+    """Model brand for a car name or a brand name; None if blank."""
+    match = _FIRST_WORD.search(str(name))
+    return match.group(0) if match else None
+
+
+def _per_unique(series, fn, dtype):
+    """Apply fn to the distinct values of series and broadcast the results back."""
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # Missing values get code -1, which picks the trailing NaN
+    parsed = np.array([fn(v) for v in uniques] + [np.nan], dtype=dtype)
+    return parsed[codes]
+
+
+def parse_unit_column(series, column):
+    """Vectorized parse_unit over a Series of raw strings; float64 array."""
+    return _per_unique(series, lambda v: parse_unit(v, column), np.float64)
+
+
+def brand_column(names):
+    """Vectorized brand_of over a Series of car names; object array, NaN if blank."""
+    return _per_unique(names, lambda v: brand_of(v) or np.nan, object)
+
+
+def clean_listings(df):
+    """Apply the cleaning rules to a raw Cars.csv frame (fuel/owner filters)."""
+    keep = ~df["fuel"].isin(EXCLUDED_FUELS).to_numpy()
+    keep &= ~df["owner"].isin(EXCLUDED_OWNERS).to_numpy()
+    return df[keep]
+
+
+def build_features(df):
+    """Model input frame (FEATURE_COLUMNS, explicit dtypes) from raw Cars.csv rows.
+
+    Rows are not filtered here; call clean_listings first. A ``brand`` column
+    is used as is when there is no ``name`` column.
+    """
+    import pandas as pd
+
+    out = {}
+    for col in ("year", "km_driven"):
+        out[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(np.float64)
+    out["owner"] = df["owner"].map(OWNER_MAPPING).to_numpy(np.float64)
+    for col in UNIT_SUFFIXES:
+        out[col] = parse_unit_column(df[col], col)
+    for col in ("fuel", "transmission"):
+        out[col] = df[col].to_numpy(object)
+    out["brand"] = brand_column(df["name"] if "name" in df else df["brand"])
+    return pd.DataFrame({col: out[col] for col in FEATURE_COLUMNS}, index=df.index)
+
+
+def log_target(df):
+    """Training target: natural log of the selling price."""
+    return np.log(df[TARGET_COLUMN].astype(np.float64))
+
+
+def read_cars(path, **kwargs):
+    """pd.read_csv for Cars.csv with only the needed columns and fixed dtypes.
+
+    Extra keyword arguments (e.g. ``chunksize``) are passed to read_csv.
+    """
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {c: t for c, t in RAW_DTYPES.items() if c in header}
+    return pd.read_csv(path, usecols=list(dtypes), dtype=dtypes, **kwargs)
+
+
+def load_training_data(path):
+    """(X, y) for training: cleaned features and the log selling price."""
+    df = clean_listings(read_cars(path))
+    return build_features(df), log_target(df)
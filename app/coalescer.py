@@ -0,0 +1,112 @@
+"""
+coalescer.py
+Micro-batching scheduler for single-row predictions. Concurrent callers hand
+in one normalized listing each; a background thread gathers them for up to
+``window_ms`` milliseconds (or ``max_batch_size`` rows), runs one vectorized
+predict over the batch and hands every caller its own result.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import Histogram
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into small batches.
+
+    ``predict_fn`` takes a list of rows and returns a sequence of predictions
+    of the same length. The worker thread is started lazily on first use and
+    restarted after a fork, so the batcher is safe to create before gunicorn
+    preforks its workers.
+    """
+
+    def __init__(self, predict_fn, window_ms=2.0, max_batch_size=64):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        # Seconds, 100 us .. 100 ms
+        self.added_latency = Histogram([0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005,
+                                        0.01, 0.025, 0.05, 0.1])
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name="predict-coalescer",
+                                 daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, row):
+        """Queue one row and return a Future resolving to its prediction."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, submitted in batch:
+                self.added_latency.observe(started - submitted)
+            self.batch_sizes.observe(len(batch))
+            self.batches += 1
+            self.rows += len(batch)
+
+            try:
+                predictions = list(self.predict_fn([row for row, _, _ in batch]))
+                # zip would leave the callers past the end waiting forever
+                if len(predictions) != len(batch):
+                    raise RuntimeError(f"predict_fn returned {len(predictions)} predictions "
+                                       f"for {len(batch)} rows")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "added_latency_seconds": self.added_latency.snapshot(),
+            "added_latency_p50_ms": self.added_latency.quantile(0.5) * 1000.0,
+            "added_latency_p99_ms": self.added_latency.quantile(0.99) * 1000.0,
+        }
@@ -0,0 +1,307 @@
+"""
+drift.py
+Input drift and data-quality monitoring without keeping raw requests. Every
+feature is summarized as counts over fixed slots:
+- numeric features: bins between the training deciles
+- categorical features: the training categories plus an "unseen" slot
+  (values the one-hot encoder ignores, e.g. the form's "Others" brand)
+- one slot for missing values, which the pipeline imputes
+Each served row adds one count per feature, a bisect or a dict lookup
+(O(1) per request). The reference profile is computed from the training data
+by export_model.py and stored as profile.json in the artifact directory. A
+background job compares the current window of counts with it (PSI per
+feature, KS for numeric features, missing and unseen rates) and then starts a
+new window.
+
+Export for an existing artifact:
+    python drift.py ../data/Cars.csv ../model/car_price.artifact
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from car_features import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+
+PROFILE_FILE = "profile.json"
+
+# PSI above this is reported as drift (0.1-0.2 is usually read as moderate)
+PSI_ALERT = 0.2
+
+# Share added to empty slots so PSI stays finite
+_EPSILON = 1e-4
+
+log = logging.getLogger(__name__)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class Profile:
+    """Per-feature slot counts over a fixed layout.
+
+    ``edges`` maps numeric features to their inner bin edges (len(edges) + 1
+    bins), ``categories`` maps categorical features to the known categories.
+    The slot after the bins or categories counts unseen categories (always
+    zero for numeric features) and the last slot counts missing values.
+    """
+
+    def __init__(self, edges, categories, counts=None, rows=0):
+        self.edges = {f: [float(e) for e in v] for f, v in edges.items()}
+        self.categories = {f: list(v) for f, v in categories.items()}
+        self._index = {f: {c: i for i, c in enumerate(v)} for f, v in self.categories.items()}
+        # Plain lists: a list item increment is far cheaper than a numpy one
+        self.counts = {f: [0] * self.slots(f) for f in self.features}
+        if counts is not None:
+            for f, c in counts.items():
+                self.counts[f] = [int(n) for n in c]
+        self.rows = rows
+        # Per feature: (name, counts, edges or None, category index or None,
+        # unseen slot, missing slot), so a row costs one pass over this list
+        self._layout = [(f, self.counts[f], self.edges.get(f), self._index.get(f),
+                         self.slots(f) - 2, self.slots(f) - 1) for f in self.features]
+
+    @property
+    def features(self):
+        return list(self.edges) + list(self.categories)
+
+    def slots(self, feature):
+        if feature in self.edges:
+            return len(self.edges[feature]) + 3
+        return len(self.categories[feature]) + 2
+
+    @classmethod
+    def from_frame(cls, frame, bins=10):
+        """Layout and counts from the training features (a DataFrame)."""
+        edges, categories = {}, {}
+        for col in NUMERIC_COLUMNS:
+            values = frame[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            edges[col] = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+        for col in CATEGORICAL_COLUMNS:
+            categories[col] = sorted(frame[col].dropna().unique().tolist())
+        profile = cls(edges, categories)
+        profile.update(frame.to_dict(orient="records"))
+        return profile
+
+    def empty(self):
+        """A profile with the same layout and no counts."""
+        return Profile(self.edges, self.categories)
+
+    def slot(self, feature, value):
+        if _is_missing(value):
+            return self.slots(feature) - 1
+        if feature in self.edges:
+            return bisect.bisect_right(self.edges[feature], value)
+        return self._index[feature].get(value, len(self.categories[feature]))
+
+    def update(self, rows):
+        """Count a list of normalized rows (dicts of feature values)."""
+        if len(rows) < 32:
+            for row in rows:
+                for feature, counts, edges, index, unseen, missing in self._layout:
+                    value = row.get(feature)
+                    if value is None or value != value:  # None or NaN
+                        counts[missing] += 1
+                    elif edges is not None:
+                        counts[bisect.bisect_right(edges, value)] += 1
+                    else:
+                        counts[index.get(value, unseen)] += 1
+        else:
+            # Batches: one searchsorted / bincount per feature
+            for feature, counts in self.counts.items():
+                values = [row.get(feature) for row in rows]
+                if feature in self.edges:
+                    x = np.array(values, dtype=np.float64)
+                    slots = np.searchsorted(self.edges[feature], x, side="right")
+                    slots[np.isnan(x)] = len(counts) - 1
+                else:
+                    slots = np.fromiter((self.slot(feature, v) for v in values),
+                                        dtype=np.int64, count=len(values))
+                for i, n in enumerate(np.bincount(slots, minlength=len(counts)).tolist()):
+                    counts[i] += n
+        self.rows += len(rows)
+
+    def merge(self, other):
+        for feature, counts in other.counts.items():
+            mine = self.counts[feature]
+            for i, n in enumerate(counts):
+                mine[i] += n
+        self.rows += other.rows
+
+    def to_dict(self):
+        return {"rows": self.rows, "edges": self.edges, "categories": self.categories,
+                "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["edges"], data["categories"], data["counts"], data["rows"])
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors of one layout."""
+    e = np.asarray(expected, dtype=np.float64)
+    a = np.asarray(actual, dtype=np.float64)
+    e = np.maximum(e / max(e.sum(), 1.0), _EPSILON)
+    a = np.maximum(a / max(a.sum(), 1.0), _EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov distance between two binned distributions.
+
+    Computed on the bin CDFs, so it is a lower bound of the exact statistic
+    at the resolution of the training deciles.
+    """
+    e = np.asarray(expected, dtype=np.float64)
+    a = np.asarray(actual, dtype=np.float64)
+    if e.sum() == 0 or a.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(e) / e.sum() - np.cumsum(a) / a.sum())))
+
+
+def drift_report(reference, current):
+    """Per-feature drift scores of ``current`` against ``reference``."""
+    features = {}
+    for feature in reference.features:
+        ref, cur = reference.counts[feature], current.counts[feature]
+        entry = {
+            "psi": psi(ref, cur),
+            "missing_rate": float(cur[-1] / current.rows) if current.rows else 0.0,
+            "reference_missing_rate": float(ref[-1] / reference.rows) if reference.rows else 0.0,
+        }
+        if feature in reference.edges:
+            # Missing values are scored by the missing rates, not the KS
+            entry["ks"] = ks(ref[:-2], cur[:-2])
+        else:
+            entry["unseen_rate"] = float(cur[-2] / current.rows) if current.rows else 0.0
+            known = {c: int(n) for c, n in zip(reference.categories[feature], cur) if n}
+            entry["top"] = dict(sorted(known.items(), key=lambda kv: -kv[1])[:5])
+        entry["drift"] = entry["psi"] > PSI_ALERT
+        features[feature] = entry
+    return {"rows": current.rows, "reference_rows": reference.rows, "features": features,
+            "drifted": sorted(f for f, e in features.items() if e["drift"])}
+
+
+class DriftMonitor:
+    """Counts served rows into a window and scores it every ``interval`` seconds.
+
+    A window with fewer than ``min_rows`` rows is carried over to the next
+    check instead of being scored. The checker thread is started lazily and
+    restarted after a fork, like the coalescer; ``set_reference`` swaps in the
+    profile of a new model version and starts a new window.
+    """
+
+    def __init__(self, reference=None, interval=300.0, min_rows=200):
+        self.interval = interval
+        self.min_rows = min_rows
+        self.reference = None
+        self.window = None
+        self.last_report = None
+        self.rows_seen = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self.set_reference(reference)
+
+    def set_reference(self, reference):
+        with self._lock:
+            self.reference = reference
+            self.window = reference.empty() if reference is not None else None
+            self.last_report = None
+
+    def load_reference(self, model_path):
+        """Use the profile stored with the model at ``model_path``; a missing or
+        unreadable profile turns monitoring off until the next model."""
+        try:
+            self.set_reference(load_profile(model_path))
+        except Exception as e:
+            self.set_reference(None)
+            log.warning("Drift reference profile not loaded from %s: %s", model_path, e)
+        if self.reference is None:
+            log.info("No drift reference profile for %s; drift monitoring is off", model_path)
+
+    def observe(self, rows):
+        """Count normalized rows that were just scored."""
+        if self.window is None:
+            return
+        self._ensure_worker()
+        with self._lock:
+            self.window.update(rows)
+            self.rows_seen += len(rows)
+
+    def check(self):
+        """Score the current window if it is big enough; returns the report or None."""
+        with self._lock:
+            if self.window is None or self.window.rows < self.min_rows:
+                return None
+            reference, window = self.reference, self.window
+            self.window = reference.empty()
+        report = drift_report(reference, window)
+        report["checked_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.last_report = report
+        if report["drifted"]:
+            log.warning("Input drift over the last %d rows: %s", window.rows,
+                        ", ".join(f"{f} (PSI {report['features'][f]['psi']:.2f})"
+                                  for f in report["drifted"]))
+        return report
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid() or self.interval <= 0:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name="drift-monitor", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                log.error("Drift check failed: %s", e)
+
+
+def profile_path(model_path):
+    """Where the reference profile of a model lives: inside an artifact
+    directory, or next to a pickled pipeline."""
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, PROFILE_FILE)
+    return os.path.splitext(model_path)[0] + "." + PROFILE_FILE
+
+
+def load_profile(model_path):
+    """The model's reference Profile, or None if it was exported without one."""
+    path = profile_path(model_path)
+    return Profile.load(path) if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+    from car_features import load_training_data
+
+    parser = argparse.ArgumentParser(description="Write the training reference profile")
+    parser.add_argument("data", help="training data, e.g. ../data/Cars.csv")
+    parser.add_argument("model", help="artifact directory or pickled pipeline it belongs to")
+    parser.add_argument("--bins", type=int, default=10)
+    args = parser.parse_args()
+
+    X, _ = load_training_data(args.data)
+    profile = Profile.from_frame(X, bins=args.bins)
+    profile.save(profile_path(args.model))
+    print(f"Saved profile of {profile.rows} rows to {profile_path(args.model)}")
@@ -0,0 +1,156 @@
+"""
+fast_pipeline.py
+Pandas-free inference path for the saved sklearn Pipeline. The fitted imputer
+statistics, scaler mean/scale and one-hot category tables are pulled out of
+the ColumnTransformer into flat NumPy arrays and dicts, rows are preprocessed
+straight from plain dicts (or a DataFrame) and the XGBoost booster is called
+directly, skipping ColumnTransformer dispatch and sparse matrix assembly.
+"""
+import numpy as np
+
+
+class NumericBlock:
+    """SimpleImputer (+ optional StandardScaler) over numeric columns."""
+
+    def __init__(self, columns, fill, mean, scale):
+        self.columns = list(columns)
+        self.fill = np.asarray(fill, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.width = len(self.columns)
+
+    def transform(self, values, out):
+        # values: (n, len(columns)) float64 with NaN for missing
+        missing = np.isnan(values)
+        if missing.any():
+            values = np.where(missing, self.fill, values)
+        np.subtract(values, self.mean, out=out)
+        np.divide(out, self.scale, out=out)
+
+
+class OneHotBlock:
+    """SimpleImputer(most_frequent) + OneHotEncoder(handle_unknown='ignore')."""
+
+    def __init__(self, columns, fill, categories, drop_idx):
+        self.columns = list(columns)
+        self.fill = list(fill)
+        # Per column: category -> output offset inside this block; dropped and
+        # unknown categories have no entry and encode as all zeros
+        self.lookup = []
+        offset = 0
+        for cats, drop in zip(categories, drop_idx):
+            table = {}
+            for i, cat in enumerate(cats):
+                if drop is not None and i == drop:
+                    continue
+                table[cat] = offset
+                offset += 1
+            self.lookup.append(table)
+        self.width = offset
+
+    def transform(self, values, out):
+        # values: list of per-column sequences of str/None
+        out.fill(0.0)
+        for table, fill, column in zip(self.lookup, self.fill, values):
+            for i, value in enumerate(column):
+                if value is None or value != value:  # None or NaN
+                    value = fill
+                offset = table.get(value)
+                if offset is not None:
+                    out[i, offset] = 1.0
+
+
+def _numeric_params(steps):
+    imputer = steps.get("imputer")
+    scaler = steps.get("scaler")
+    if imputer is None or getattr(imputer, "add_indicator", False):
+        raise ValueError("numeric branch must start with a SimpleImputer without indicators")
+    fill = imputer.statistics_.astype(np.float64)
+    n = len(fill)
+    if scaler is None:
+        return fill, np.zeros(n), np.ones(n)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n)
+    return fill, mean, scale
+
+
+def _onehot_params(steps):
+    imputer, encoder = steps.get("imputer"), steps.get("onehot")
+    if imputer is None or encoder is None:
+        raise ValueError("categorical branch must be SimpleImputer -> OneHotEncoder")
+    if encoder.handle_unknown != "ignore" or getattr(encoder, "_infrequent_enabled", False):
+        raise ValueError("only OneHotEncoder(handle_unknown='ignore') without "
+                         "infrequent categories is supported")
+    drop_idx = encoder.drop_idx_
+    if drop_idx is None:
+        drop_idx = [None] * len(encoder.categories_)
+    return list(imputer.statistics_), [list(c) for c in encoder.categories_], list(drop_idx)
+
+
+class CompiledPipeline:
+    """Flat re-implementation of preprocess -> XGBRegressor for fast scoring."""
+
+    # Callers may pass normalized row dicts instead of a DataFrame
+    accepts_records = True
+
+    def __init__(self, blocks, booster, zero_as_missing):
+        self.blocks = blocks
+        self.booster = booster
+        # The ColumnTransformer emits a sparse matrix, and XGBoost treats the
+        # absent (zero) entries of a sparse matrix as missing values
+        self.zero_as_missing = zero_as_missing
+        self.n_features = sum(block.width for block in blocks)
+        self.version = None
+        self.intervals = None  # intervals.IntervalTable, set by load_artifact
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Extract the fitted parameters from a Pipeline(preprocessor, XGBRegressor)."""
+        preprocessor, regressor = pipeline[0], pipeline[-1]
+        if len(pipeline) != 2 or not hasattr(regressor, "get_booster"):
+            raise ValueError("expected Pipeline([preprocessor, XGBRegressor])")
+
+        blocks = []
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == "remainder":
+                if transformer != "drop":
+                    raise ValueError("ColumnTransformer remainder must be 'drop'")
+                continue
+            steps = dict(transformer.named_steps)
+            if "onehot" in steps:
+                blocks.append(OneHotBlock(columns, *_onehot_params(steps)))
+            else:
+                blocks.append(NumericBlock(columns, *_numeric_params(steps)))
+        return cls(blocks, regressor.get_booster(),
+                   zero_as_missing=bool(preprocessor.sparse_output_))
+
+    def _columns(self, X):
+        if isinstance(X, dict):
+            X = [X]
+        if isinstance(X, list):
+            return lambda col: [row.get(col) for row in X], len(X)
+        return lambda col: X[col].tolist(), len(X)  # DataFrame
+
+    def transform(self, X):
+        """Preprocess rows (dict, list of dicts or DataFrame) into a dense matrix."""
+        column, n = self._columns(X)
+        out = np.empty((n, self.n_features), dtype=np.float64)
+        start = 0
+        for block in self.blocks:
+            view = out[:, start:start + block.width]
+            if isinstance(block, NumericBlock):
+                values = np.array([column(c) for c in block.columns], dtype=np.float64).T
+                block.transform(values.reshape(n, block.width), view)
+            else:
+                block.transform([column(c) for c in block.columns], view)
+            start += block.width
+        if self.zero_as_missing:
+            out[out == 0.0] = np.nan
+        return out
+
+    def predict_matrix(self, matrix):
+        return self.booster.inplace_predict(matrix)
+
+    def predict(self, X):
+        """Predict log prices, matching Pipeline.predict."""
+        return self.predict_matrix(self.transform(X))
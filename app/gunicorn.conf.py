@@ -0,0 +1,61 @@
+"""
+gunicorn.conf.py
+Production server settings: gunicorn -c gunicorn.conf.py app:server
+
+The app is imported once in the master before workers are forked, so every
+worker shares the imported modules copy-on-write. With MODEL_WARMUP=preload
+(the default for the xgboost runtime) the model is loaded in the master too
+and shared the same way, at the cost of serving nothing until it is loaded.
+With MODEL_WARMUP=background (the default for the numpy runtime) each worker
+loads the model on a warm-up thread and serves pages meanwhile (/api/ready
+reports when it can score).
+Worker and thread counts come from the environment:
+    WEB_CONCURRENCY   number of worker processes (default: CPU count)
+    GUNICORN_THREADS  threads per worker (default: 4)
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")  # e.g. "-" for stdout
+errorlog = "-"
+
+# Parallelism comes from workers x threads; one OpenMP thread per predict call
+# avoids oversubscription and keeps the model warm-up in the master from
+# leaving an OpenMP thread pool behind in the forked workers. Must be set
+# before xgboost is imported.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+
+def when_ready(server):
+    # With MODEL_WARMUP=preload (app.py resolves auto), load the model here,
+    # in the master, so every worker inherits it instead of loading its own copy
+    app_module = sys.modules.get("app")
+    if app_module is not None and getattr(app_module, "MODEL_WARMUP", "preload") == "preload":
+        if hasattr(app_module, "router"):
+            app_module.router.preload()  # the primary plus any A/B and shadow models
+        elif hasattr(app_module, "registry"):
+            app_module.registry.preload()
+
+    # Move everything allocated during preload into the permanent GC
+    # generation so collections in the workers don't touch (and copy) the
+    # pages holding the model and the imported modules.
+    gc.freeze()
+    server.log.info("Preloaded app, %d objects frozen before fork", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork; each worker starts its own warm-up
+    # (a no-op load when the master preloaded the model)
+    app_module = sys.modules.get("app")
+    if app_module is not None and hasattr(app_module, "start_warmup"):
+        app_module.start_warmup()
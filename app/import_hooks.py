@@ -0,0 +1,22 @@
+"""
+import_hooks.py
+Keeps optional modules out of the import of a dependency that would load them
+without needing them, e.g. IPython, which dash imports for notebook display
+whenever it is installed.
+"""
+import contextlib
+import sys
+
+
+@contextlib.contextmanager
+def hidden_module(name):
+    """Make ``import name`` raise ImportError inside the block, if not imported yet."""
+    if name in sys.modules:
+        yield
+        return
+    sys.modules[name] = None
+    try:
+        yield
+    finally:
+        if sys.modules.get(name, False) is None:
+            del sys.modules[name]
@@ -0,0 +1,62 @@
+"""
+intervals.py
+Prediction intervals from a residual-quantile table. At training time the
+out-of-fold residuals (log price - predicted log price) are grouped into bins
+of the predicted value, and each bin stores the residual quantiles that bound
+the requested coverage. At serving time the interval is the point prediction
+plus its bin's offsets: one searchsorted and two takes over the whole batch,
+computed from the same predictions as the point estimate.
+"""
+import numpy as np
+
+
+class IntervalTable:
+    """Per-bin residual quantiles on the log-price scale.
+
+    ``edges`` are the inner bin boundaries of the predicted log price,
+    ``low``/``high`` the residual offsets per bin (len(edges) + 1 entries).
+    """
+
+    def __init__(self, coverage, edges, low, high):
+        self.coverage = float(coverage)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        if not (len(self.low) == len(self.high) == len(self.edges) + 1):
+            raise ValueError("interval table needs one low/high pair per bin")
+
+    @classmethod
+    def fit(cls, predicted, actual, coverage=0.8, bins=5):
+        """Learn the table from out-of-fold predictions and true log prices."""
+        predicted = np.asarray(predicted, dtype=np.float64)
+        residuals = np.asarray(actual, dtype=np.float64) - predicted
+        # Equal-count bins of the predicted value
+        edges = np.unique(np.quantile(predicted, np.linspace(0, 1, bins + 1)[1:-1]))
+        index = np.searchsorted(edges, predicted, side="right")
+        tail = (1.0 - coverage) / 2.0
+        low, high = [], []
+        for b in range(len(edges) + 1):
+            r = residuals[index == b]
+            low.append(np.quantile(r, tail))
+            high.append(np.quantile(r, 1.0 - tail))
+        return cls(coverage, edges, low, high)
+
+    def apply(self, predicted):
+        """(low, high) log-price bounds for an array of point predictions."""
+        predicted = np.asarray(predicted, dtype=np.float64)
+        index = np.searchsorted(self.edges, predicted, side="right")
+        return predicted + self.low[index], predicted + self.high[index]
+
+    def coverage_of(self, predicted, actual):
+        """Fraction of actual values inside their interval (for evaluation)."""
+        low, high = self.apply(predicted)
+        actual = np.asarray(actual, dtype=np.float64)
+        return float(np.mean((actual >= low) & (actual <= high)))
+
+    def to_dict(self):
+        return {"coverage": self.coverage, "edges": self.edges.tolist(),
+                "low": self.low.tolist(), "high": self.high.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["coverage"], data["edges"], data["low"], data["high"])
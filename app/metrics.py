@@ -0,0 +1,201 @@
+"""
+metrics.py
+Low-overhead instrumentation for the prediction path: per-stage latency
+histograms, counters, a Prometheus text exposition for the /metrics endpoint
+and sampled request logging to replace per-request prints.
+
+Stages timed by the app: normalize (form values -> model row), frame
+(DataFrame construction, sklearn path only), preprocess (imputers, scalers,
+one-hot), inference (booster) and render (Dash result payload). Metrics are
+kept per process; under gunicorn every worker exposes its own.
+"""
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+
+# Default latency buckets in seconds, 100 us .. 2.5 s
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction q of observations fall."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank, seen = q * count, 0
+        for bound, n in zip(self.buckets + [float("inf")], counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + [float("inf")], self.counts):
+                running += n
+                cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+            return {"buckets": cumulative, "sum": self.total, "count": self.count}
+
+
+class _StageTimer:
+    # A plain class rather than @contextmanager, which costs more per block
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+def _labels(labels, **extra):
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Metrics:
+    """Named histograms and counters plus externally owned metrics to export.
+
+    ``time(stage)`` records into the ``<prefix>_stage_seconds`` histogram with
+    a ``stage`` label. Histograms, counters and gauges owned by other
+    components (the coalescer, the cache) are registered with
+    ``add_histogram`` / ``add_counter`` / ``add_gauge`` and read at scrape
+    time. Times are in seconds, following Prometheus base units.
+    """
+
+    def __init__(self, prefix="car_price", buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.stages = {}
+        self.counters = {}  # (name, labels tuple) -> value
+        self._help = {}
+        self._histograms = []  # (name, help, Histogram, labels)
+        self._gauges = []  # (name, help, fn returning {labels tuple: value}, type)
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        hist = self.stages.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(name, Histogram(self.buckets))
+        return hist
+
+    def time(self, stage):
+        """Context manager timing its block into the ``stage`` histogram."""
+        return _StageTimer(self.stage(stage))
+
+    def inc(self, name, amount=1, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self._help.setdefault(name, help)
+
+    def add_histogram(self, name, help, histogram, **labels):
+        """Register under one name with different labels for several series."""
+        self._histograms.append((name, help, histogram, labels))
+
+    def add_gauge(self, name, help, fn):
+        """fn() returns a number, or a dict of {labels dict as tuple: number}."""
+        self._gauges.append((name, help, fn, "gauge"))
+
+    def add_counter(self, name, help, fn):
+        """Like add_gauge, for a count that only goes up (name it ``*_total``)."""
+        self._gauges.append((name, help, fn, "counter"))
+
+    def _render_histogram(self, lines, name, hist, labels):
+        snap = hist.snapshot()
+        for le, count in snap["buckets"].items():
+            lines.append(f"{name}_bucket{_labels(labels, le=le)} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {snap['sum']:.9g}")
+        lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_seconds Time spent per prediction stage",
+                 f"# TYPE {p}_stage_seconds histogram"]
+        for stage, hist in sorted(self.stages.items()):
+            self._render_histogram(lines, f"{p}_stage_seconds", hist, {"stage": stage})
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {p}_{name} {self._help.get(name, '')}",
+                          f"# TYPE {p}_{name} counter"]
+            lines.append(f"{p}_{name}{_labels(dict(labels))} {value}")
+
+        # One HELP/TYPE block per name; histograms registered under the same
+        # name with different labels (one per model) are series of one family
+        families = {}
+        for name, help, hist, labels in self._histograms:
+            families.setdefault(name, (help, []))[1].append((hist, labels))
+        for name, (help, series) in families.items():
+            lines += [f"# HELP {p}_{name} {help}", f"# TYPE {p}_{name} histogram"]
+            for hist, labels in series:
+                self._render_histogram(lines, f"{p}_{name}", hist, labels)
+
+        for name, help, fn, kind in self._gauges:
+            lines += [f"# HELP {p}_{name} {help}", f"# TYPE {p}_{name} {kind}"]
+            values = fn()
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labels, value in values.items():
+                lines.append(f"{p}_{name}{_labels(dict(labels))} {float(value):.9g}")
+
+        lines += [f"# HELP {p}_process_id Worker process exposing these metrics",
+                  f"# TYPE {p}_process_id gauge", f"{p}_process_id {os.getpid()}"]
+        return "\n".join(lines) + "\n"
+
+
+class SampledLogger:
+    """Logs a fraction ``sample_rate`` of requests; 0 turns request logs off.
+
+    Errors are always logged. Check ``sampled()`` before building the log
+    message so unsampled requests pay nothing for it.
+    """
+
+    def __init__(self, name, sample_rate=0.0):
+        self.logger = logging.getLogger(name)
+        self.sample_rate = sample_rate
+
+    def sampled(self):
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def info(self, msg, *args):
+        self.logger.info(msg, *args)
+
+    def error(self, msg, *args):
+        self.logger.error(msg, *args)
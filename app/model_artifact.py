@@ -0,0 +1,233 @@
+"""
+model_artifact.py
+Deterministic, fast-loading model artifact. Instead of unpickling the whole
+sklearn Pipeline, a model is stored as a directory:
+
+    manifest.json   format version, feature schema, block layout, checksums
+                    and the optional prediction interval table
+    booster.ubj     the XGBoost booster in its native UBJSON format
+    trees.npz       the same trees as flat NumPy arrays, for serving without
+                    xgboost (tree_runtime.py)
+    preprocess.npy  imputer fills, scaler means and scales as one flat float64
+                    array
+
+Every file is written to a temporary name and renamed into place, the manifest
+last, so a directory can be re-exported while it is served: loaded versions
+keep the files they were read from, and the watcher only sees the new version
+once all of it is in place.
+
+MODEL_RUNTIME picks the tree evaluator on load: "xgboost", "numpy", or "auto"
+(default: xgboost when it is installed, else numpy). Both give identical
+predictions; the lean image has no xgboost and always uses numpy.
+
+Export: python model_artifact.py ../model/car_price.model ../model/car_price.artifact
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import time
+
+import numpy as np
+
+from batch_api import FEATURE_COLUMNS
+from fast_pipeline import CompiledPipeline, NumericBlock, OneHotBlock
+from intervals import IntervalTable
+from tree_runtime import TreeEnsemble
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+BOOSTER_FILE = "booster.ubj"
+ARRAYS_FILE = "preprocess.npy"
+TREES_FILE = "trees.npz"
+
+RUNTIME = os.environ.get("MODEL_RUNTIME", "auto").lower()
+
+
+class ArtifactError(RuntimeError):
+    """Raised when an artifact is missing files, corrupt or incompatible."""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def replace_file(path, write):
+    """Call ``write(tmp_path)`` for a temporary file next to ``path``, then
+    rename it over ``path``. Readers of the old file keep its inode, and no
+    reader ever sees a partly written file."""
+    directory, name = os.path.split(os.path.abspath(path))
+    # Keeps the extension: xgboost picks the format from it
+    tmp = os.path.join(directory, f".tmp-{os.getpid()}-{name}")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_tree_file(compiled, path):
+    # np.savez appends .npz to names without it; write to the exact name
+    with open(path, "wb") as f:
+        TreeEnsemble.from_booster(compiled.booster).save(f)
+
+
+def export_artifact(model, out_dir, source=None, intervals=None):
+    """Write a fitted Pipeline (or CompiledPipeline) as an artifact directory.
+
+    ``intervals`` is an IntervalTable stored with the model; by default a
+    CompiledPipeline keeps the one it was loaded with.
+    """
+    compiled = model if isinstance(model, CompiledPipeline) else CompiledPipeline.from_pipeline(model)
+    if isinstance(compiled.booster, TreeEnsemble):
+        raise ArtifactError("a model loaded with the numpy runtime cannot be re-exported")
+    if intervals is None:
+        intervals = compiled.intervals
+    os.makedirs(out_dir, exist_ok=True)
+
+    blocks, arrays, offset = [], [], 0
+    for block in compiled.blocks:
+        if isinstance(block, NumericBlock):
+            blocks.append({"kind": "numeric", "columns": block.columns,
+                           "offset": offset, "size": block.width})
+            arrays.extend([block.fill, block.mean, block.scale])
+            offset += 3 * block.width
+        else:
+            blocks.append({"kind": "onehot", "columns": block.columns, "fill": block.fill,
+                           "categories": [sorted(t, key=t.get) for t in block.lookup],
+                           "width": block.width})
+
+    flat = np.concatenate(arrays).astype(np.float64) if arrays else np.empty(0)
+    replace_file(os.path.join(out_dir, ARRAYS_FILE), lambda tmp: np.save(tmp, flat))
+    replace_file(os.path.join(out_dir, BOOSTER_FILE), compiled.booster.save_model)
+    replace_file(os.path.join(out_dir, TREES_FILE), lambda tmp: _write_tree_file(compiled, tmp))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": os.path.basename(source) if source else None,
+        "source_sha256": _sha256(source) if source else None,
+        "feature_columns": [c for c in FEATURE_COLUMNS
+                            if any(c in b["columns"] for b in blocks)],
+        "n_features": compiled.n_features,
+        "zero_as_missing": compiled.zero_as_missing,
+        "blocks": blocks,
+        "intervals": intervals.to_dict() if intervals is not None else None,
+        "files": {name: _sha256(os.path.join(out_dir, name))
+                  for name in (BOOSTER_FILE, ARRAYS_FILE, TREES_FILE)},
+    }
+    # Same model -> same version id, independent of the export time
+    hashed = [manifest["files"], manifest["blocks"], manifest["intervals"]]
+    manifest["version"] = hashlib.sha256(
+        json.dumps(hashed, sort_keys=True).encode()).hexdigest()[:12]
+    replace_file(os.path.join(out_dir, MANIFEST), lambda tmp: _write_json(manifest, tmp))
+    return manifest
+
+
+def _write_json(data, path):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def _use_xgboost(runtime):
+    if runtime == "numpy":
+        return False
+    if runtime not in ("auto", "xgboost"):
+        raise ArtifactError(f"unknown MODEL_RUNTIME {runtime!r}")
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        if runtime == "xgboost":
+            raise
+        return False
+    return True
+
+
+def uses_xgboost(path, runtime=None):
+    """Whether loading ``path`` imports xgboost and, through it, sklearn and
+    scipy: a pickled pipeline always does, an artifact unless it runs on
+    numpy. Answers without importing xgboost."""
+    if not is_artifact(path):
+        return True
+    runtime = runtime or RUNTIME
+    if runtime == "auto":
+        return importlib.util.find_spec("xgboost") is not None
+    return runtime != "numpy"
+
+
+def load_artifact(path, verify=True, runtime=None):
+    """Load an artifact directory into a CompiledPipeline.
+
+    The preprocessing arrays are read into memory, not memory-mapped, so a
+    re-export cannot change a loaded version; with ``verify`` the file
+    checksums in the manifest are checked first. ``runtime`` overrides
+    MODEL_RUNTIME.
+    """
+    if not is_artifact(path):
+        raise ArtifactError(f"{path} has no {MANIFEST}")
+    manifest = read_manifest(path)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ArtifactError(f"unsupported artifact format {manifest.get('format_version')!r}")
+    unknown = set(manifest["feature_columns"]) - set(FEATURE_COLUMNS)
+    if unknown:
+        raise ArtifactError(f"artifact expects unknown features {sorted(unknown)}")
+    if verify:
+        for name, expected in manifest["files"].items():
+            file_path = os.path.join(path, name)
+            if not os.path.isfile(file_path) or _sha256(file_path) != expected:
+                raise ArtifactError(f"checksum mismatch for {name} in {path}")
+
+    arrays = np.load(os.path.join(path, ARRAYS_FILE))
+    blocks = []
+    for spec in manifest["blocks"]:
+        if spec["kind"] == "numeric":
+            start, size = spec["offset"], spec["size"]
+            fill, mean, scale = (arrays[start + i * size:start + (i + 1) * size]
+                                 for i in range(3))
+            blocks.append(NumericBlock(spec["columns"], fill, mean, scale))
+        else:
+            blocks.append(OneHotBlock(spec["columns"], spec["fill"], spec["categories"],
+                                      [None] * len(spec["columns"])))
+
+    if _use_xgboost(runtime or RUNTIME):
+        import xgboost as xgb
+        booster = xgb.Booster(model_file=os.path.join(path, BOOSTER_FILE))
+    elif TREES_FILE in manifest["files"]:
+        booster = TreeEnsemble.load(os.path.join(path, TREES_FILE))
+    else:
+        raise ArtifactError(f"{path} has no {TREES_FILE}; re-export it to serve without xgboost")
+    compiled = CompiledPipeline(blocks, booster, zero_as_missing=manifest["zero_as_missing"])
+    if compiled.n_features != manifest["n_features"]:
+        raise ArtifactError("feature layout does not match the manifest")
+    compiled.version = manifest["version"]
+    if manifest.get("intervals"):
+        compiled.intervals = IntervalTable.from_dict(manifest["intervals"])
+    return compiled
+
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export a pickled pipeline as an artifact")
+    parser.add_argument("model", help="pickled sklearn Pipeline, e.g. ../model/car_price.model")
+    parser.add_argument("out_dir", help="artifact directory to write")
+    args = parser.parse_args()
+
+    manifest = export_artifact(joblib.load(args.model), args.out_dir, source=args.model)
+    print(f"Saved artifact {manifest['version']} to {args.out_dir}")
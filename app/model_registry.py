@@ -0,0 +1,366 @@
+"""
+model_registry.py
+Versioned model holder with hot reload and rollback. A new model is loaded
+and warmed up with a canned batch in the background, then swapped in with a
+single reference assignment: requests that already hold the previous
+ModelVersion finish on it, new requests see the new one. Earlier versions are
+kept for rollback.
+
+Reloads are triggered by a watcher thread that polls the model paths, or by
+an admin call. Admin actions are also written to a small control file next
+to the model so every gunicorn worker applies them, not just the one that
+served the request. A worker started later adopts the model the last action
+left serving instead of replaying the action.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from batch_api import normalize_listing, score_rows
+from fast_pipeline import CompiledPipeline
+from model_artifact import MANIFEST, is_artifact, load_artifact
+
+CONTROL_FILE = ".model-control.json"
+
+# Where the services (app.py, async_service.py) look for the primary model.
+# Artifact directories (see model_artifact.py) load fastest; pickled pipelines
+# are the fallback. MODEL_PATH (artifact directory or pickle) is tried first.
+MODEL_PATHS = [
+    "./car_price.artifact",  # For Docker deployment
+    "./model/car_price.artifact",  # For root directory local development
+    "../model/car_price.artifact",  # For app directory local development
+    "./car_price.model",
+    "./model/car_price.model",
+    "../model/car_price.model",
+]
+if os.environ.get("MODEL_PATH"):
+    MODEL_PATHS.insert(0, os.environ["MODEL_PATH"])
+
+log = logging.getLogger(__name__)
+
+# Canned warm-up batch: a typical listing, an all-missing one and a few partial
+# rows, so the imputers and every preprocessing branch run before the swap
+WARMUP_LISTINGS = [
+    {"year": 2015, "km_driven": 60000, "fuel": "Diesel", "transmission": "Manual",
+     "owner": "First Owner", "engine": 1248, "max_power": 74, "brand": "Maruti",
+     "mileage": 23.4},
+    {},
+    {"year": 2019, "fuel": "Petrol", "brand": "BMW"},
+    {"km_driven": 120000, "transmission": "Automatic", "brand": "Others"},
+    {"owner": "Fourth & Above Owner", "engine": 2179, "max_power": 120},
+]
+
+
+def path_signature(path):
+    """Cheap fingerprint of a model path: (mtime_ns, size) of the file, or of
+    the manifest for an artifact directory."""
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def load_model_file(path, fast_inference=True):
+    """Load one artifact directory or pickled pipeline; returns (model, version)."""
+    if is_artifact(path):
+        if not fast_inference:
+            raise ValueError("artifact directories always serve the compiled path")
+        model = load_artifact(path)
+        return model, model.version
+
+    # Pickled pipelines need the training stack (sklearn, xgboost); artifacts
+    # can be served without it
+    import joblib
+
+    with open(path, "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    model = joblib.load(path)
+    if fast_inference:
+        try:
+            model = CompiledPipeline.from_pipeline(model)
+        except ValueError as e:
+            log.warning("Fast inference unavailable, using sklearn pipeline. Reason: %s", e)
+    return model, version
+
+
+class ModelVersion:
+    """One loaded model and where it came from."""
+
+    def __init__(self, model, version, path, signature):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.signature = signature
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {"version": self.version, "path": self.path,
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+                "model_type": type(self.model).__name__}
+
+
+class ModelRegistry:
+    """Holds the serving ModelVersion and swaps it atomically on reload.
+
+    ``candidates`` are probed in order; the first that loads is served. With
+    ``poll_interval`` > 0 a watcher thread reloads whenever the preferred
+    path's signature changes. A model an admin reloaded from another path is
+    kept until a new file appears at the preferred path. Threads are started
+    lazily and restarted after a fork.
+    """
+
+    def __init__(self, candidates, fast_inference=True, keep=3, poll_interval=0.0,
+                 on_swap=None):
+        self.candidates = list(candidates)
+        self.fast_inference = fast_inference
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.history = deque(maxlen=keep)  # previous versions, newest last
+        self.last_error = None
+        self.reloads = 0
+        self._current = None
+        # The watcher does not reload a path signature that failed to load or
+        # that was explicitly rolled back from
+        self._ignored_signature = None
+        # (path, preferred path signature) of a model reloaded from a path
+        # other than the preferred one; the watcher keeps it while the
+        # preferred path is unchanged
+        self._pinned = None
+        self._lock = threading.Lock()  # serializes loads and swaps
+        self._start_lock = threading.Lock()
+        self._pid = None
+        # Read per process when it starts serving (see _sync_control), not
+        # here: this runs in the gunicorn master, long before a respawned
+        # worker starts
+        self._control_seq = 0
+
+    # -- serving ------------------------------------------------------------
+    def get(self):
+        """Current ModelVersion, loading the first candidate on first use."""
+        current = self._current or self.preload()
+        if self._pid != os.getpid():
+            self._start()
+            current = self._current
+        return current
+
+    def preload(self):
+        """Load the first candidate without starting the watcher (pre-fork)."""
+        with self._lock:
+            if self._current is None:
+                self._swap(self._load_first())
+            return self._current
+
+    @property
+    def loaded(self):
+        return self._current is not None
+
+    @property
+    def current(self):
+        """The serving ModelVersion, or None before the first load."""
+        return self._current
+
+    def _load_first(self):
+        for path in self.candidates:
+            if not os.path.exists(path):
+                continue
+            try:
+                return self._load(path)
+            except Exception as e:
+                log.error("Failed to load model from %s: %s", path, e)
+        raise RuntimeError("No valid model found in any of the expected paths")
+
+    def _load(self, path):
+        signature = path_signature(path)
+        model, version = load_model_file(path, self.fast_inference)
+        self._warm_up(model)
+        log.info("Model %s loaded from %s", version, path)
+        return ModelVersion(model, version, os.path.abspath(path), signature)
+
+    @staticmethod
+    def _warm_up(model):
+        rows = [normalize_listing(listing) for listing in WARMUP_LISTINGS]
+        predictions = np.asarray(score_rows(model, rows), dtype=np.float64)
+        if predictions.shape != (len(rows),) or not np.isfinite(predictions).all():
+            raise ValueError("warm-up batch produced invalid predictions")
+
+    def _swap(self, new):
+        old, self._current = self._current, new
+        if old is not None:
+            self.history.append(old)
+        if self.on_swap is not None:
+            self.on_swap(new)
+
+    # -- reload / rollback --------------------------------------------------
+    def _preferred_path(self):
+        return next((p for p in self.candidates if os.path.exists(p)), None)
+
+    def reload(self, path=None, background=False):
+        """Load ``path`` (default: the preferred candidate) and swap it in.
+
+        Returns the new version description, or None when run in the
+        background. If loading or warm-up fails the current model stays.
+        """
+        if background:
+            threading.Thread(target=self.reload, args=(path,), daemon=True,
+                             name="model-reload").start()
+            return None
+        path = path or self._preferred_path()
+        with self._lock:
+            try:
+                new = self._load(path)
+            except Exception as e:
+                self.last_error = f"{path}: {e}"
+                log.error("Model reload from %s failed, keeping current model: %s", path, e)
+                raise
+            preferred = self._preferred_path()
+            if preferred is None or os.path.abspath(path) == os.path.abspath(preferred):
+                self._pinned = None
+            else:
+                self._pinned = (new.path, path_signature(preferred))
+            if self._current is not None and new.version == self._current.version:
+                self._current.signature = new.signature
+                return self._current.describe()
+            self._swap(new)
+            self.reloads += 1
+            self.last_error = None
+            return new.describe()
+
+    def rollback(self):
+        """Swap back to the previous version; returns its description.
+
+        The version rolled back from is dropped; a later reload (or a new
+        file at the model path) brings a newer model back.
+        """
+        with self._lock:
+            if not self.history:
+                raise LookupError("no previous model version to roll back to")
+            previous = self.history.pop()
+            current, self._current = self._current, previous
+            self._ignored_signature = current.signature
+            if self.on_swap is not None:
+                self.on_swap(previous)
+            log.warning("Rolled back model %s -> %s", current.version, previous.version)
+            return previous.describe()
+
+    # -- cross-worker admin actions ----------------------------------------
+    def _control_path(self):
+        path = self._preferred_path() or self.candidates[0]
+        return os.path.join(os.path.dirname(os.path.abspath(path)), CONTROL_FILE)
+
+    def _read_control(self):
+        try:
+            with open(self._control_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def broadcast(self, action, path=None):
+        """Apply an admin action here, then record it for the other workers.
+
+        Next to the action, the control file holds its outcome (the version
+        served and where it came from), which workers started later adopt.
+        """
+        result = self.rollback() if action == "rollback" else self.reload(path)
+        control = self._read_control()
+        seq = max(control.get("seq", 0), self._control_seq) + 1
+        self._control_seq = seq
+        preferred = self._preferred_path()
+        state = {"seq": seq, "action": action, "path": path,
+                 "version": self._current.version, "model_path": self._current.path,
+                 "preferred_signature": path_signature(preferred) if preferred else None,
+                 "ignored_signature": self._ignored_signature}
+        tmp = self._control_path() + f".{os.getpid()}"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self._control_path())
+        except OSError as e:
+            log.error("Could not record admin action for other workers: %s", e)
+        return result
+
+    def _sync_control(self):
+        """Catch up with the control file when this process starts serving.
+
+        The last action is not replayed (a new worker has no history to roll
+        back through); its outcome is adopted instead, unless a new model has
+        been published at the preferred path since.
+        """
+        control = self._read_control()
+        self._control_seq = control.get("seq", 0)
+        version, current = control.get("version"), self._current
+        if not version or current is None or current.version == version:
+            return
+        preferred = self._preferred_path()
+        if preferred is None or path_signature(preferred) != control.get("preferred_signature"):
+            return
+        self._ignored_signature = control.get("ignored_signature")
+        try:
+            self.reload(control["model_path"])
+        except Exception:
+            return
+        if self._current.version != version:
+            log.warning("Model %s set by the last admin action is no longer at %s; serving %s",
+                        version, control["model_path"], self._current.version)
+
+    # -- watcher ------------------------------------------------------------
+    def _start(self):
+        """Once per process: sync with the control file, start the watcher."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._sync_control()
+            self._pid = os.getpid()
+        if self.poll_interval > 0:
+            threading.Thread(target=self._watch, daemon=True, name="model-watcher").start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self._poll()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def _poll(self):
+        control = self._read_control()
+        if control.get("seq", 0) > self._control_seq:
+            self._control_seq = control["seq"]
+            if control.get("action") == "rollback":
+                self.rollback()
+            else:
+                self.reload(control.get("path"))
+            return
+
+        current, path = self._current, self._preferred_path()
+        if path is None or current is None:
+            return
+        signature = path_signature(path)
+        if self._pinned is not None and signature == self._pinned[1]:
+            return  # keep the admin's choice until the preferred path changes
+        if signature == self._ignored_signature:
+            return
+        if os.path.abspath(path) != current.path or signature != current.signature:
+            try:
+                self.reload(path)
+            except Exception:
+                self._ignored_signature = signature
+
+    def status(self):
+        current = self._current
+        return {
+            "current": current.describe() if current else None,
+            "previous": [v.describe() for v in reversed(self.history)],
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "poll_interval": self.poll_interval,
+            "pid": os.getpid(),
+        }
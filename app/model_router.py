@@ -0,0 +1,304 @@
+"""
+model_router.py
+Several models served side by side. Next to the primary model (MODEL_PATHS),
+MODEL_VARIANTS adds A/B arms that take a share of the traffic, and
+MODEL_SHADOWS adds models that score the same rows after the response is
+sent, on a background thread:
+
+    MODEL_VARIANTS="rf=../model/car_price_rf.model:0.1"
+    MODEL_SHADOWS="linear=../model/car_price_linear.model,tree=../model/car_price_tree.model"
+
+Each model is held by its own ModelRegistry, so it is hot-reloaded like the
+primary. A request is routed by hashing a key (the listing), so the same
+listing always gets a price from the same arm. The primary takes whatever
+share the variants leave.
+
+Per model the router records calls, rows, errors and latency, the RSS added
+when it was loaded, and for shadows the divergence from the price that was
+served (|log price difference|, about the relative price difference).
+"""
+import hashlib
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from batch_api import normalize_listing, score_rows
+from metrics import LATENCY_BUCKETS, Histogram
+from model_registry import ModelRegistry
+
+PRIMARY = "primary"
+
+# |log price difference| buckets: 0.5% .. 100%
+DIVERGENCE_BUCKETS = [0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+
+log = logging.getLogger(__name__)
+
+
+def parse_models(spec, weighted=True):
+    """[(name, path, weight)] from "name=path[:weight],..." (weight 0 if absent)."""
+    models = []
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, sep, path = item.partition("=")
+        if not sep or not name or not path:
+            raise ValueError(f"expected name=path in {item!r}")
+        weight = 0.0
+        if weighted:
+            head, colon, tail = path.rpartition(":")
+            if colon and tail.replace(".", "", 1).isdigit():
+                path, weight = head, float(tail)
+        models.append((name.strip(), path.strip(), weight))
+    names = [name for name, _, _ in models]
+    if PRIMARY in names or len(set(names)) != len(names):
+        raise ValueError(f"model names must be unique and not {PRIMARY!r}: {names}")
+    return models
+
+
+def rss_bytes():
+    """Resident set size of this process (0 where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def path_bytes(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class ModelStats:
+    """Counters and histograms of one served or shadow model."""
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)  # seconds per call
+        self.divergence = Histogram(DIVERGENCE_BUCKETS)  # per row, shadows only
+        self.load_rss_bytes = None
+        self._lock = threading.Lock()
+
+    def record(self, rows, seconds):
+        self.latency.observe(seconds)
+        with self._lock:
+            self.calls += 1
+            self.rows += rows
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def describe(self):
+        snap = self.divergence.snapshot()
+        out = {
+            "calls": self.calls, "rows": self.rows, "errors": self.errors,
+            "latency_ms": {f"p{q}": self.latency.quantile(q / 100) * 1e3 for q in (50, 90, 99)},
+            "mean_ms_per_row": self.latency.total / self.rows * 1e3 if self.rows else None,
+            "load_rss_mb": None if self.load_rss_bytes is None else self.load_rss_bytes / 2**20,
+        }
+        if snap["count"]:
+            out["divergence"] = {"rows": snap["count"], "mean_abs_log": snap["sum"] / snap["count"],
+                                 "p50": self.divergence.quantile(0.5),
+                                 "p90": self.divergence.quantile(0.9)}
+        return out
+
+
+class ModelRouter:
+    """Weighted A/B arms over the primary registry, plus shadow models.
+
+    ``variants`` are (name, path, weight) arms, ``shadows`` (name, path, _).
+    Shadow rows wait in a queue of ``shadow_queue`` batches; when it is full
+    they are dropped (and counted), so shadows never slow down responses.
+    A fraction ``shadow_sample_rate`` of the requests is shadowed, which
+    bounds the CPU the shadows take from serving on a busy machine.
+    Batches are cut to their first ``shadow_max_rows`` rows, and the shadow
+    thread merges queued batches up to that size into one call per model.
+    It is started lazily and restarted after a fork.
+    """
+
+    def __init__(self, primary, variants=(), shadows=(), fast_inference=True, poll_interval=0.0,
+                 shadow_queue=1000, shadow_max_rows=1000, shadow_sample_rate=1.0):
+        self.weights = {name: weight for name, _, weight in variants}
+        if sum(self.weights.values()) > 1.0:
+            raise ValueError("variant weights add up to more than 1")
+        self.weights = {PRIMARY: 1.0 - sum(self.weights.values()), **self.weights}
+        self.roles = {PRIMARY: "primary", **{name: "variant" for name, _, _ in variants},
+                      **{name: "shadow" for name, _, _ in shadows}}
+        self.registries = {PRIMARY: primary}
+        for name, path, _ in list(variants) + list(shadows):
+            self.registries[name] = ModelRegistry([path], fast_inference=fast_inference,
+                                                  poll_interval=poll_interval)
+        self.shadows = [name for name, _, _ in shadows]
+        self.stats = {name: ModelStats() for name in self.registries}
+        self.shadow_max_rows = shadow_max_rows
+        self.shadow_sample_rate = shadow_sample_rate
+        self.shadow_dropped = 0
+        # Cumulative weights for the arms, primary first
+        self._arms = [name for name in self.weights if self.weights[name] > 0]
+        self._bounds = np.cumsum([self.weights[name] for name in self._arms]).tolist()
+        self._queue = queue.Queue(maxsize=shadow_queue)
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def active(self):
+        """Whether anything besides the primary is configured."""
+        return len(self.registries) > 1
+
+    def preload(self):
+        """Load every model in turn, recording the RSS each one adds."""
+        for name, registry in self.registries.items():
+            if registry.loaded:
+                continue
+            before = rss_bytes()
+            try:
+                registry.preload()
+            except Exception as e:
+                self.stats[name].record_error()
+                log.error("Model %s not loaded: %s", name, e)
+                continue
+            self.stats[name].load_rss_bytes = max(rss_bytes() - before, 0)
+
+    # -- A/B routing --------------------------------------------------------
+    def choose(self, key):
+        """Arm for a routing key (any repr-able value); stable across processes."""
+        if len(self._arms) == 1:
+            return self._arms[0]
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+        point = int.from_bytes(digest, "big") / 2**64 * self._bounds[-1]
+        for name, bound in zip(self._arms, self._bounds):
+            if point < bound:
+                return name
+        return self._arms[-1]
+
+    def find(self, version):
+        """The serving ModelVersion with this version id, or None."""
+        for registry in self.registries.values():
+            current = registry.current
+            if current is not None and current.version == version:
+                return current
+        return None
+
+    def score(self, name, rows, metrics=None):
+        """(log prices, version) of rows scored by one arm, with its stats."""
+        current = self.registries[name].get()
+        start = time.perf_counter()
+        try:
+            log_prices = score_rows(current.model, rows, metrics)
+        except Exception:
+            self.stats[name].record_error()
+            raise
+        self.stats[name].record(len(rows), time.perf_counter() - start)
+        return log_prices, current.version
+
+    # -- shadows ------------------------------------------------------------
+    def shadow(self, rows, served_log_prices, raw=False):
+        """Queue rows and the prices served for them for the shadow models.
+
+        ``raw`` rows are request records, normalized on the shadow thread.
+        """
+        if not self.shadows:
+            return
+        if self.shadow_sample_rate < 1 and random.random() >= self.shadow_sample_rate:
+            return
+        self._ensure_worker()
+        n = self.shadow_max_rows
+        try:
+            self._queue.put_nowait((rows[:n], np.asarray(served_log_prices[:n], dtype=np.float64), raw))
+        except queue.Full:
+            with self._lock:
+                self.shadow_dropped += 1
+
+    def drain(self, timeout=10.0):
+        """Wait until queued shadow work is scored (benchmarks, shutdown)."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.005)
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name="model-shadow", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _take(self):
+        """Block for one queued batch, then merge whatever else is waiting
+        (up to shadow_max_rows rows) so each shadow model is called once."""
+        items = [self._queue.get()]
+        rows = len(items[0][0])
+        while rows < self.shadow_max_rows:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            rows += len(items[-1][0])
+        merged, served = [], []
+        for batch, prices, raw in items:
+            merged += [normalize_listing(r, i) for i, r in enumerate(batch)] if raw else batch
+            served.append(prices)
+        return merged, np.concatenate(served), len(items)
+
+    def _run(self):
+        while True:
+            rows, served, taken = self._take()
+            try:
+                for name in self.shadows:
+                    try:
+                        log_prices, _ = self.score(name, rows)
+                    except Exception as e:
+                        log.warning("Shadow model %s failed: %s", name, e)
+                        continue
+                    for diff in np.abs(np.asarray(log_prices, dtype=np.float64) - served).tolist():
+                        self.stats[name].divergence.observe(diff)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    # -- reporting ----------------------------------------------------------
+    def describe(self):
+        models = {}
+        for name, registry in self.registries.items():
+            current = registry.current
+            entry = {"role": self.roles[name], "weight": self.weights.get(name, 0.0),
+                     "version": current.version if current else None,
+                     "path": current.path if current else registry.candidates[0],
+                     "model_type": type(current.model).__name__ if current else None}
+            entry["size_mb"] = path_bytes(entry["path"]) / 2**20
+            entry.update(self.stats[name].describe())
+            models[name] = entry
+        return {"models": models, "shadow_sample_rate": self.shadow_sample_rate,
+                "shadow_queue": self._queue.qsize(),
+                "shadow_dropped": self.shadow_dropped, "pid": os.getpid()}
+
+    def gauges(self, metrics):
+        """Register per-model counters, histograms and gauges on a metrics.Metrics."""
+        def per_model(read):
+            return lambda: {(("model", name), ("role", self.roles[name])): value
+                            for name in self.registries
+                            for value in [read(self.stats[name])] if value is not None}
+
+        metrics.add_counter("model_calls_total", "Scoring calls per model", per_model(lambda s: s.calls))
+        metrics.add_counter("model_rows_total", "Rows scored per model", per_model(lambda s: s.rows))
+        metrics.add_counter("model_errors_total", "Failed scoring calls per model",
+                            per_model(lambda s: s.errors))
+        # Histograms rather than quantiles, so workers can be summed
+        for name in self.registries:
+            role = self.roles[name]
+            metrics.add_histogram("model_latency_seconds", "Scoring latency per call",
+                                  self.stats[name].latency, model=name, role=role)
+            if role == "shadow":
+                metrics.add_histogram("model_divergence", "|log price - served log price| of shadow models",
+                                      self.stats[name].divergence, model=name, role=role)
+        metrics.add_gauge("model_load_rss_bytes", "RSS added by loading the model",
+                          per_model(lambda s: s.load_rss_bytes))
+        metrics.add_counter("shadow_dropped_total", "Shadow batches dropped because the queue was full",
+                            lambda: self.shadow_dropped)
@@ -0,0 +1,152 @@
+"""
+prediction_cache.py
+Bounded LRU/TTL cache for single-listing predictions, keyed on the normalized
+feature tuple built in predict_price. Entries are tied to the model version
+that produced them and dropped when the registry swaps in another version.
+An optional SQLite backend lets several gunicorn workers share hits through
+one file on local disk.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from batch_api import FEATURE_COLUMNS
+
+
+def cache_key(row):
+    """Hashable key for a normalized listing; NaN (never equal to itself) -> None."""
+    return tuple(
+        None if isinstance(v, float) and math.isnan(v) else v
+        for v in (row[c] for c in FEATURE_COLUMNS)
+    )
+
+
+class SqliteBackend:
+    """Shared second-level cache in a SQLite file, safe across processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " key TEXT PRIMARY KEY, version TEXT, value REAL, expires REAL)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key, version, now):
+        row = self._conn().execute(
+            "SELECT value FROM predictions WHERE key = ? AND version = ? AND expires > ?",
+            (json.dumps(key), version, now),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key, value, version, expires):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+            (json.dumps(key), version, value, expires),
+        )
+
+    def clear(self, keep_version=None):
+        self._conn().execute(
+            "DELETE FROM predictions WHERE version IS NOT ?", (keep_version,)
+        )
+
+
+class PredictionCache:
+    """LRU cache with per-entry TTL and hit/miss/eviction counters.
+
+    Call ``set_version`` whenever a different model starts serving; every
+    cached prediction of the previous version is discarded.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600.0, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.version = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+
+    def set_version(self, version):
+        """Serve a different model version: drop everything cached so far."""
+        if version == self.version:
+            return
+        if self.version is not None:
+            self.invalidations += 1
+        self.version = version
+        self.clear()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+        if self.backend is not None:
+            value = self.backend.get(key, self.version, now)
+            if value is not None:
+                self.shared_hits += 1
+                self._store(key, value, now + self.ttl)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value, version):
+        """Cache a prediction made by ``version``; stale versions are ignored."""
+        if version != self.version:
+            return
+        expires = time.time() + self.ttl
+        self._store(key, value, expires)
+        if self.backend is not None:
+            self.backend.put(key, value, version, expires)
+
+    def _store(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear(keep_version=self.version)
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "version": self.version,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "backend": self.backend.path if self.backend is not None else None,
+        }
@@ -0,0 +1,124 @@
+"""
+tree_runtime.py
+NumPy-only evaluator for the XGBoost tree ensemble, so the serving image does
+not need xgboost (or sklearn, scipy, pandas) to score. The trees are exported
+from the booster's JSON dump into flat node arrays (trees.npz in the artifact
+directory) and evaluated for all trees of a batch at once, one tree level per
+step.
+
+Matches Booster.inplace_predict bit for bit: inputs are compared as float32,
+missing values (NaN) follow each split's default direction, and the output
+is base_score plus the leaf values, summed in tree order.
+"""
+import json
+
+import numpy as np
+
+# Rows evaluated per step; bounds the (rows x trees) work arrays
+CHUNK_ROWS = 2048
+
+
+class TreeEnsemble:
+    """Flat arrays over the nodes of all trees.
+
+    Leaves point to themselves with an infinite threshold, so every row can
+    take the same number of steps (``depth``) regardless of where it lands.
+    ``children`` holds the left child at 2 * node and the right one at
+    2 * node + 1.
+    """
+
+    def __init__(self, feature, threshold, children, default_left, value, roots,
+                 depth, base_score, n_features):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.children = np.asarray(children, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = int(depth)
+        self.base_score = float(base_score)
+        self.n_features = int(n_features)
+        # Rows are widened to [x with NaN -> -inf, x with NaN -> +inf]; a node
+        # reads the copy that sends missing values its default way, so no
+        # step needs a NaN check
+        self._column = np.where(self.default_left, self.feature,
+                                self.feature + self.n_features).astype(np.intp)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Flatten a regression gbtree Booster (xgboost is only needed here)."""
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("only gbtree boosters can be exported")
+        if learner["objective"]["name"] != "reg:squarederror":
+            raise ValueError(f"unsupported objective {learner['objective']['name']!r}")
+        params = learner["learner_model_param"]
+        trees = learner["gradient_booster"]["model"]["trees"]
+
+        feature, threshold, children, default_left, value, roots = [], [], [], [], [], []
+        depth, start = 0, 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("categorical splits are not supported")
+            left, right = tree["left_children"], tree["right_children"]
+            node_depth = [0] * len(left)
+            for node, (l, r) in enumerate(zip(left, right)):
+                if l == -1:
+                    feature.append(0)
+                    threshold.append(np.inf)
+                    children.extend([start + node, start + node])
+                    value.append(tree["split_conditions"][node])
+                else:
+                    feature.append(tree["split_indices"][node])
+                    threshold.append(tree["split_conditions"][node])
+                    children.extend([start + l, start + r])
+                    value.append(0.0)
+                    node_depth[l] = node_depth[r] = node_depth[node] + 1
+                default_left.append(bool(tree["default_left"][node]))
+            depth = max(depth, max(node_depth))
+            roots.append(start)
+            start += len(left)
+        return cls(feature, threshold, children, default_left, value, roots, depth,
+                   float(params["base_score"]), int(params["num_feature"]))
+
+    def inplace_predict(self, matrix):
+        """Predictions for a dense (n, n_features) matrix with NaN for missing."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got shape {matrix.shape}")
+        out = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), CHUNK_ROWS):
+            out[start:start + CHUNK_ROWS] = self._predict_chunk(matrix[start:start + CHUNK_ROWS])
+        return out
+
+    def _predict_chunk(self, matrix):
+        n, width = len(matrix), 2 * self.n_features
+        missing = np.isnan(matrix)
+        wide = np.empty((n, width), dtype=np.float32)
+        np.copyto(wide[:, :self.n_features], np.where(missing, -np.inf, matrix))
+        np.copyto(wide[:, self.n_features:], np.where(missing, np.inf, matrix))
+        flat, row_start = wide.ravel(), (np.arange(n) * width)[:, None]
+
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.depth):
+            x = flat[row_start + self._column[nodes]]
+            nodes = self.children[2 * nodes + (x >= self.threshold[nodes])]
+        # Summed in float32 in tree order from base_score, like xgboost, so
+        # the predictions are bit-identical
+        total = np.empty((n, len(self.roots) + 1), dtype=np.float32)
+        total[:, 0] = self.base_score
+        total[:, 1:] = self.value[nodes]
+        return np.cumsum(total, axis=1, out=total)[:, -1]
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold,
+                 children=self.children, default_left=self.default_left, value=self.value,
+                 roots=self.roots, meta=np.array([self.depth, self.base_score, self.n_features]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            depth, base_score, n_features = data["meta"].tolist()
+            return cls(data["feature"], data["threshold"], data["children"],
+                       data["default_left"], data["value"], data["roots"],
+                       depth, base_score, n_features)
@@ -0,0 +1,107 @@
+"""
+whatif.py
+What-if pricing: price curves against one field (km_driven, year) with every
+other field of the listing fixed, scored as one batch instead of one request
+per value. QuoteIndex precomputes these curves for the brand / fuel /
+transmission combinations the form offers, for listings that leave every
+other field to the imputers, and keeps them in one float32 array per field so
+those curves are answered without touching the model.
+"""
+import math
+
+import numpy as np
+
+from batch_api import normalize_listing, score_rows
+
+# Default x values of each curve
+CURVE_GRIDS = {
+    "km_driven": np.arange(0, 300001, 10000, dtype=np.float64),
+    "year": np.arange(1995, 2021, dtype=np.float64),
+}
+
+# Upper bound on caller-supplied curve points
+MAX_CURVE_POINTS = 200
+
+
+def price_curves(model, listing, grids, metrics=None):
+    """{field: (values, log_prices)} for a normalized listing, one score_rows call.
+
+    ``grids`` maps each field to the (normalized) values it takes; the
+    listing's own value of that field is replaced, everything else stays as
+    given. Categorical fields work too, e.g. {"brand": ["Maruti", "BMW"]}.
+    """
+    rows, spans = [], {}
+    for field, values in grids.items():
+        spans[field] = (len(rows), len(rows) + len(values))
+        rows.extend(dict(listing, **{field: v}) for v in values)
+    log_prices = np.asarray(score_rows(model, rows, metrics), dtype=np.float64)
+    return {field: (np.asarray(grids[field]), log_prices[a:b])
+            for field, (a, b) in spans.items()}
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class QuoteIndex:
+    """Precomputed log-price curves keyed on (brand, fuel, transmission).
+
+    An entry answers a listing whose only non-missing fields are the key
+    fields and the curve's own field. ``version`` is the model version the
+    curves were computed with.
+    """
+
+    KEY_FIELDS = ("brand", "fuel", "transmission")
+
+    def __init__(self, keys, grids, curves, version):
+        self.keys = {key: i for i, key in enumerate(keys)}
+        self.grids = grids
+        self.curves = curves  # field -> float32 array (len(keys), len(grid))
+        self.version = version
+
+    @classmethod
+    def build(cls, model, brands, fuels, transmissions, version, grids=CURVE_GRIDS):
+        keys, rows = [], []
+        for brand in brands:
+            for fuel in fuels:
+                for transmission in transmissions:
+                    base = normalize_listing({"brand": brand, "fuel": fuel,
+                                              "transmission": transmission})
+                    key = tuple(base[f] for f in cls.KEY_FIELDS)
+                    if key in keys:  # e.g. two form brands with one model brand
+                        continue
+                    keys.append(key)
+                    rows.append(base)
+        # All combinations and fields in one batch
+        stacked, spans = [], {}
+        for field, values in grids.items():
+            spans[field] = (len(stacked), len(values))
+            stacked.extend(dict(row, **{field: float(v)}) for row in rows for v in values)
+        log_prices = np.asarray(score_rows(model, stacked), dtype=np.float32)
+        curves = {}
+        for field, (start, width) in spans.items():
+            block = log_prices[start:start + len(rows) * width]
+            curves[field] = block.reshape(len(rows), width)
+        return cls(keys, {f: np.asarray(v, dtype=np.float64) for f, v in grids.items()},
+                   curves, version)
+
+    def lookup(self, listing, field, version):
+        """(values, log_prices) from the index, or None if it does not apply."""
+        if version != self.version or field not in self.curves:
+            return None
+        for name, value in listing.items():
+            if name != field and name not in self.KEY_FIELDS and not _is_missing(value):
+                return None
+        i = self.keys.get(tuple(listing[f] for f in self.KEY_FIELDS))
+        if i is None:
+            return None
+        return self.grids[field], self.curves[field][i].astype(np.float64)
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.curves.values())
+
+    def stats(self):
+        return {"version": self.version, "entries": len(self.keys),
+                "fields": {f: len(g) for f, g in self.grids.items()},
+                "bytes": self.nbytes}
@@ -0,0 +1,75 @@
+"""
+_common.py
+Shared helpers for the benchmark scripts: puts app/ on sys.path so the serving
+modules import the same way they do in the container, and samples realistic
+listings from data/Cars.csv.
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+DATA = os.path.join(ROOT, "data", "Cars.csv")
+MODEL = os.path.join(ROOT, "model", "car_price.model")
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+def sample_listings(n, seed=0):
+    """Sample n listings from Cars.csv as API records (raw form values)."""
+    from car_features import build_features, clean_listings, read_cars
+
+    df = clean_listings(read_cars(DATA))
+    df = df.sample(n=n, replace=n > len(df), random_state=seed)
+    # Parsed numbers and brands, but the owner stays as form text
+    out = build_features(df).assign(owner=df["owner"].to_numpy())
+    records = out.to_dict(orient="records")
+    for i, record in enumerate(records):
+        record["id"] = i
+        for k, v in record.items():
+            if isinstance(v, float) and np.isnan(v):
+                record[k] = None
+    return records
+
+
+def blank_fields(records, rate, seed=0):
+    """Blank a fraction of the fields in place so the imputers get exercised."""
+    rng = random.Random(seed)
+    for record in records:
+        for key in list(record):
+            if key != "id" and rng.random() < rate:
+                record[key] = None
+    return records
+
+
+def dash_predict_payload(record, n_clicks=1):
+    """Request body for the predict_price callback on /_dash-update-component."""
+    form = {
+        "year": record.get("year"), "km": record.get("km_driven"),
+        "fuel": record.get("fuel"), "transmission": record.get("transmission"),
+        "owner": record.get("owner"), "mileage": record.get("mileage"),
+        "engine": record.get("engine"), "power": record.get("max_power"),
+        "brand": record.get("brand"),
+    }
+    return {
+        "output": "prediction.data",
+        "outputs": {"id": "prediction", "property": "data"},
+        "inputs": [{"id": "predict", "property": "n_clicks", "value": n_clicks}],
+        "changedPropIds": ["predict.n_clicks"],
+        "state": [{"id": k, "property": "value", "value": v} for k, v in form.items()],
+    }
+
+
+def timed(fn, *args, repeat=1):
+    """Run fn repeat times and return (best wall-clock seconds, last result)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
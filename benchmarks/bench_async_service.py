@@ -0,0 +1,137 @@
+"""
+bench_async_service.py
+Burst behaviour of the Dash app under gunicorn against app/async_service.py.
+Requests arrive open-loop at a fixed rate (new requests keep coming whether
+or not earlier ones finished, like real bursts), each with a client timeout.
+For every server and rate it reports requests served, shed (429/503 with
+Retry-After), timed out, and the latency percentiles of served requests.
+Arrival rates above capacity should show up as shed load on the async
+service, and as queueing and timeouts on the synchronous app.
+Needs aiohttp (pip install '.[async]').
+Run: python benchmarks/bench_async_service.py [--rates 100 400 800] [--duration 10]
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from _common import APP_DIR, dash_predict_payload, sample_listings
+from load_test import start_server, stop_server
+
+import aiohttp
+
+
+def start_async(port, workers, max_queue, rate_limit):
+    env = dict(os.environ, ASYNC_WORKERS=str(workers), ASYNC_MAX_QUEUE=str(max_queue),
+               RATE_LIMIT_RPS=str(rate_limit), MODEL_POLL_INTERVAL="0")
+    proc = subprocess.Popen([sys.executable, "async_service.py", "--port", str(port)],
+                            cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f"async service did not come up on port {port}")
+
+
+async def open_loop(url, bodies, rate, duration, timeout):
+    """Send rate requests/sec for duration seconds; returns outcome counts."""
+    outcomes = {"ok": 0, "shed": 0, "timeout": 0, "error": 0}
+    latencies = []
+    limits = aiohttp.TCPConnector(limit=0)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    headers = {"Content-Type": "application/json"}
+
+    async with aiohttp.ClientSession(connector=limits, timeout=client_timeout) as session:
+        async def one(i):
+            sent = time.perf_counter()
+            try:
+                async with session.post(url, data=bodies[i % len(bodies)], headers=headers) as r:
+                    await r.read()
+                    if r.status == 200:
+                        outcomes["ok"] += 1
+                        latencies.append((time.perf_counter() - sent) * 1000.0)
+                    elif r.status in (429, 503):
+                        outcomes["shed"] += 1
+                    else:
+                        outcomes["error"] += 1
+            except asyncio.TimeoutError:
+                outcomes["timeout"] += 1
+            except aiohttp.ClientError:
+                outcomes["error"] += 1
+
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i)))
+        await asyncio.gather(*tasks)
+
+    outcomes["sent"] = len(tasks)
+    outcomes["goodput"] = outcomes["ok"] / duration
+    for q in (50, 99):
+        outcomes[f"p{q}_ms"] = float(np.percentile(latencies, q)) if latencies else float("nan")
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst load: Dash/gunicorn vs async service")
+    parser.add_argument("--rates", type=float, nargs="+", default=[100, 400, 800],
+                        help="arrival rates in requests/sec")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=5.0, help="client timeout (s)")
+    parser.add_argument("--gunicorn-workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--async-workers", type=int, default=1)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="per-client RATE_LIMIT_RPS for the async service (0 = off)")
+    parser.add_argument("--port", type=int, default=18070)
+    args = parser.parse_args()
+
+    records = sample_listings(2000)
+    servers = {
+        f"gunicorn w={args.gunicorn_workers} t={args.threads}": (
+            lambda: start_server("gunicorn", args.port, args.gunicorn_workers, args.threads),
+            "/_dash-update-component",
+            [json.dumps(dash_predict_payload(r, n_clicks=i + 1)) for i, r in enumerate(records)]),
+        f"async w={args.async_workers} q={args.max_queue}": (
+            lambda: start_async(args.port, args.async_workers, args.max_queue, args.rate_limit),
+            "/api/predict",
+            [json.dumps(r) for r in records]),
+    }
+
+    print(f"{os.cpu_count()} CPUs, {args.duration:.0f}s per run, {args.timeout:g}s client timeout")
+    print(f"{'server':<22} {'rate':>6} {'sent':>6} {'ok':>6} {'shed':>6} {'timeout':>8} "
+          f"{'error':>6} {'goodput':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, (start, path, bodies) in servers.items():
+        proc = start()
+        try:
+            url = f"http://127.0.0.1:{args.port}{path}"
+            asyncio.run(open_loop(url, bodies, 20, 1.0, args.timeout))  # warm-up
+            for rate in args.rates:
+                r = asyncio.run(open_loop(url, bodies, rate, args.duration, args.timeout))
+                print(f"{name:<22} {rate:>6.0f} {r['sent']:>6} {r['ok']:>6} {r['shed']:>6} "
+                      f"{r['timeout']:>8} {r['error']:>6} {r['goodput']:>8.0f} "
+                      f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+                time.sleep(args.timeout)  # let the server drain
+        finally:
+            stop_server(proc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+bench_batch.py
+Compares the per-row predict_price path (one DataFrame + model.predict per
+listing) with the /api/predict/batch endpoint (one vectorized predict per
+request) and reports rows/sec for each.
+Run: python benchmarks/bench_batch.py [--rows 5000]
+"""
+import argparse
+import json
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import sample_listings, timed
+
+import app as serving
+from batch_api import listings_to_frame, normalize_listing
+
+
+def per_row(records):
+    for record in records:
+        serving.get_model().predict(listings_to_frame([normalize_listing(record)]))
+
+
+def batch_http(client, body, mimetype):
+    response = client.post("/api/predict/batch", data=body, content_type=mimetype)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_data()
+
+
+def to_csv(records):
+    columns = list(records[0])
+    lines = [",".join(columns)]
+    for r in records:
+        lines.append(",".join("" if r[c] is None else str(r[c]) for c in columns))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs per-row scoring throughput")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--baseline-rows", type=int, default=500,
+                        help="rows scored one at a time for the per-row baseline")
+    args = parser.parse_args()
+
+    records = sample_listings(args.rows)
+    client = serving.server.test_client()
+
+    base_rows = records[:args.baseline_rows]
+    seconds, _ = timed(per_row, base_rows)
+    print(f"{'per-row predict':<22} {len(base_rows) / seconds:>12,.0f} rows/sec")
+
+    ndjson = "\n".join(json.dumps(r) for r in records)
+    bodies = {
+        "application/json": json.dumps(records),
+        "application/x-ndjson": ndjson,
+        "text/csv": to_csv(records),
+    }
+    for mimetype, body in bodies.items():
+        seconds, _ = timed(batch_http, client, body, mimetype, repeat=3)
+        print(f"{'batch ' + mimetype.split('/')[1]:<22} {len(records) / seconds:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
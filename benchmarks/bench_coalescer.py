@@ -0,0 +1,61 @@
+"""
+bench_coalescer.py
+Drives the micro-batching coalescer with concurrent single-row callers and
+reports throughput, caller latency percentiles and mean batch size for a few
+window / max batch size settings, next to direct per-request scoring.
+Run: python benchmarks/bench_coalescer.py [--clients 32] [--requests 3000]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import sample_listings
+
+import app as serving
+from batch_api import listings_to_frame, normalize_listing
+from coalescer import MicroBatcher
+
+
+def run(score, rows, clients):
+    def call(row):
+        start = time.perf_counter()
+        score(row)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = np.array(list(pool.map(call, rows))) * 1000.0
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return len(rows) / elapsed, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching coalescer load test")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    rows = [normalize_listing(r) for r in sample_listings(args.requests)]
+
+    def predict_rows(batch):
+        return serving.get_model().predict(listings_to_frame(batch))
+
+    print(f"{'mode':<26} {'req/sec':>10} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    rps, p50, p99 = run(lambda row: predict_rows([row]), rows, args.clients)
+    print(f"{'direct':<26} {rps:>10,.0f} {p50:>8.2f} {p99:>8.2f} {1:>6.1f}")
+
+    for window_ms, max_batch in [(1, 16), (2, 64), (5, 64), (10, 128)]:
+        batcher = MicroBatcher(predict_rows, window_ms=window_ms,
+                               max_batch_size=max_batch)
+        rps, p50, p99 = run(batcher.predict, rows, args.clients)
+        label = f"window={window_ms}ms max={max_batch}"
+        print(f"{label:<26} {rps:>10,.0f} {p50:>8.2f} {p99:>8.2f} "
+              f"{batcher.stats()['mean_batch_size']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
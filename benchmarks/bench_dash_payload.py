@@ -0,0 +1,191 @@
+"""
+bench_dash_payload.py
+Bytes on the wire and server time of the Dash round trips: the initial
+layout, the server callbacks fired when /predict loads, one navigation
+between the two pages and the predict callback. The callbacks are read from
+/_dash-dependencies, so the same measurement runs against any version of the
+app; --before REF extracts app/ at that git ref and reports it next to the
+working tree. Requests go through the Flask test client (no network), with
+the prediction cache and coalescer off so every predict call is scored.
+Run: python benchmarks/bench_dash_payload.py [--before e0374f3] [--rows 200]
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+import numpy as np
+
+from _common import APP_DIR, ROOT, sample_listings
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+# Values of the trigger inputs the renderer would send
+INITIAL_VALUES = {"url.pathname": "/predict", "predict.n_clicks": 0}
+
+# Form component id -> record field
+FORM_FIELDS = {"year": "year", "km": "km_driven", "fuel": "fuel",
+               "transmission": "transmission", "owner": "owner", "mileage": "mileage",
+               "engine": "engine", "power": "max_power", "brand": "brand"}
+
+
+def prop_id(item):
+    return f"{item['id']}.{item['property']}"
+
+
+def triggers(dep):
+    """Input prop ids ("component.property") of a callback."""
+    return {prop_id(i) for i in dep["inputs"]}
+
+
+def callback_body(dep, values):
+    """/_dash-update-component body for a single-output callback."""
+    component, prop = dep["output"].rsplit(".", 1)
+    return {
+        "output": dep["output"],
+        "outputs": {"id": component, "property": prop},
+        "inputs": [dict(i, value=values.get(prop_id(i))) for i in dep["inputs"]],
+        "changedPropIds": [prop_id(i) for i in dep["inputs"]],
+        "state": [dict(s, value=values.get(prop_id(s))) for s in dep["state"]],
+    }
+
+
+def post(client, body):
+    start = time.perf_counter()
+    response = client.post("/_dash-update-component", json=body)
+    seconds = time.perf_counter() - start
+    if response.status_code not in (200, 204):
+        raise RuntimeError(f"{body['output']}: HTTP {response.status_code}")
+    return response.get_data(), seconds
+
+
+def sizes(payloads):
+    return {"bytes": float(np.mean([len(p) for p in payloads])),
+            "gzip_bytes": float(np.mean([len(gzip.compress(p)) for p in payloads]))}
+
+
+def measure(app_dir, records):
+    """Runs inside the worker process with app_dir first on sys.path."""
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    import app as dash_app
+
+    client = dash_app.server.test_client()
+    layout_ms = []
+    for _ in range(20):
+        start = time.perf_counter()
+        layout = client.get("/_dash-layout").get_data()
+        layout_ms.append((time.perf_counter() - start) * 1e3)
+    deps = json.loads(client.get("/_dash-dependencies").get_data())
+    server_side = [d for d in deps if not d.get("clientside_function")]
+
+    # Server callbacks the renderer fires when /predict is opened
+    load = [post(client, callback_body(d, INITIAL_VALUES))[0]
+            for d in server_side if not d.get("prevent_initial_call")]
+    result = {"layout": dict(sizes([layout]), p50_ms=float(np.median(layout_ms))),
+              "load_callbacks": len(load),
+              "load_bytes": len(layout) + sum(len(p) for p in load)}
+
+    nav = [d for d in server_side if "url.pathname" in triggers(d)]
+    if nav:
+        timings = [post(client, callback_body(nav[0], {"url.pathname": path}))
+                   for _ in range(20) for path in ("/", "/predict")]
+        nav_ms = np.array([s for _, s in timings]) * 1e3
+        result["navigation"] = dict(sizes([p for p, _ in timings]),
+                                    p50_ms=float(np.median(nav_ms)))
+
+    predict = next(d for d in server_side if "predict.n_clicks" in triggers(d))
+    bodies = []
+    for i, r in enumerate(records):
+        values = {f"{k}.value": r.get(v) for k, v in FORM_FIELDS.items()}
+        values["predict.n_clicks"] = i + 1
+        bodies.append(callback_body(predict, values))
+    for body in bodies[:10]:  # warm-up
+        post(client, body)
+    timings = [post(client, body) for body in bodies]
+    ms = np.array([s for _, s in timings]) * 1e3
+    result["predict"] = dict(sizes([p for p, _ in timings]),
+                             p50_ms=float(np.percentile(ms, 50)),
+                             p90_ms=float(np.percentile(ms, 90)))
+    return result
+
+
+def extract_app(ref, dest):
+    archive = subprocess.run(["git", "archive", "--format=tar", ref, "app"], cwd=ROOT,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(dest)
+    return os.path.join(dest, "app")
+
+
+def run_worker(app_dir, records_path):
+    env = dict(os.environ, MODEL_PATH=ARTIFACT, MODEL_POLL_INTERVAL="0",
+               PREDICT_CACHE_SIZE="0", PREDICT_BATCH_WINDOW_MS="0", LOG_LEVEL="WARNING")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", app_dir,
+               "--records", records_path]
+    out = subprocess.run(command, env=env, capture_output=True, text=True,
+                         check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def report(results):
+    names = list(results)
+    print(f"{'':<28}" + "".join(f"{n:>16}" for n in names))
+
+    def row(label, get, fmt="{:,.0f}"):
+        cells = []
+        for n in names:
+            try:
+                cells.append(fmt.format(get(results[n])))
+            except KeyError:
+                cells.append("-")
+        print(f"{label:<28}" + "".join(f"{c:>16}" for c in cells))
+
+    row("layout bytes", lambda r: r["layout"]["bytes"])
+    row("layout gzip bytes", lambda r: r["layout"]["gzip_bytes"])
+    row("layout p50 ms", lambda r: r["layout"]["p50_ms"], "{:.2f}")
+    row("callbacks on page load", lambda r: r["load_callbacks"])
+    row("page load bytes", lambda r: r["load_bytes"])
+    row("navigation bytes", lambda r: r["navigation"]["bytes"])
+    row("navigation p50 ms", lambda r: r["navigation"]["p50_ms"], "{:.2f}")
+    row("predict bytes", lambda r: r["predict"]["bytes"])
+    row("predict gzip bytes", lambda r: r["predict"]["gzip_bytes"])
+    row("predict p50 ms", lambda r: r["predict"]["p50_ms"], "{:.2f}")
+    row("predict p90 ms", lambda r: r["predict"]["p90_ms"], "{:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Dash payload size and callback latency")
+    parser.add_argument("--before", default=None,
+                        help="git ref of the app to compare with")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--records", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.records) as f:
+            print(json.dumps(measure(args.worker, json.load(f))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records_path = os.path.join(tmp, "records.json")
+        with open(records_path, "w") as f:
+            json.dump(sample_listings(args.rows), f)
+        results = {}
+        if args.before:
+            before_dir = extract_app(args.before, tmp)
+            results[args.before] = run_worker(before_dir, records_path)
+        results["working tree"] = run_worker(APP_DIR, records_path)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+bench_drift.py
+Cost and sensitivity of the drift monitor. Times DriftMonitor.observe for
+single rows and batches next to the single-row predict it rides along with,
+and scores windows of listings sampled from Cars.csv (no drift expected)
+against windows shifted the way live traffic could move: newer cars, more
+kilometers, "Others" brands and blank fields.
+Run: python benchmarks/bench_drift.py [--rows 2000]
+"""
+import argparse
+import os
+
+from _common import ROOT, blank_fields, sample_listings, timed
+
+from batch_api import normalize_listing, score_rows
+from drift import DriftMonitor, drift_report, load_profile
+from model_artifact import load_artifact
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+
+def score_window(reference, rows):
+    window = reference.empty()
+    window.update(rows)
+    report = drift_report(reference, window)
+    worst = max(report["features"].items(), key=lambda kv: kv[1]["psi"])
+    return report, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drift monitor cost and sensitivity")
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    model = load_artifact(ARTIFACT)
+    reference = load_profile(ARTIFACT)
+    rows = [normalize_listing(r) for r in sample_listings(args.rows, seed=1)]
+
+    monitor = DriftMonitor(reference, interval=0)
+    seconds, _ = timed(lambda: [monitor.observe([row]) for row in rows], repeat=5)
+    per_row_us = seconds / len(rows) * 1e6
+    seconds, _ = timed(lambda: [score_rows(model, [row]) for row in rows[:500]], repeat=3)
+    predict_us = seconds / 500 * 1e6
+    print(f"observe, single row: {per_row_us:.1f} us "
+          f"({per_row_us / predict_us:.1%} of a {predict_us:.0f} us single-row predict)")
+    seconds, _ = timed(monitor.observe, rows, repeat=5)
+    print(f"observe, batch of {len(rows)}: {seconds * 1e3:.1f} ms "
+          f"({seconds / len(rows) * 1e6:.2f} us/row)")
+    seconds, _ = timed(monitor.check, repeat=1)
+    print(f"drift check: {seconds * 1e3:.1f} ms, profile {len(str(reference.to_dict()))} bytes")
+    print()
+
+    windows = {
+        "sample of Cars.csv": rows,
+        "cars from 2017 on": [dict(r, year=max(r["year"], 2017.0)) for r in rows],
+        "km_driven x 2": [dict(r, km_driven=r["km_driven"] * 2) for r in rows],
+        "30% 'Others' brand": [dict(r, brand="Others") if i % 10 < 3 else r
+                               for i, r in enumerate(rows)],
+        "20% fields blank": [normalize_listing(r) for r in
+                             blank_fields(sample_listings(args.rows, seed=1), 0.2, seed=1)],
+    }
+    print(f"{'window':<22} {'drifted':>8} {'worst':<12} {'PSI':>6} {'KS':>6} {'missing':>8}")
+    for name, window_rows in windows.items():
+        report, (feature, entry) = score_window(reference, window_rows)
+        ks = f"{entry['ks']:.2f}" if "ks" in entry else "-"
+        print(f"{name:<22} {len(report['drifted']):>5} / {len(report['features'])} "
+              f"{feature:<12} {entry['psi']:>6.2f} {ks:>6} {entry['missing_rate']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
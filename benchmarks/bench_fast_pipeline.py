@@ -0,0 +1,61 @@
+"""
+bench_fast_pipeline.py
+Checks that the compiled fast path reproduces the sklearn Pipeline on sampled
+listings (with randomly blanked fields that hit the imputers), then compares
+per-row latency and batch throughput of the two paths.
+Run: python benchmarks/bench_fast_pipeline.py [--rows 5000] [--tolerance 1e-6]
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import MODEL, blank_fields, sample_listings, timed
+
+from batch_api import listings_to_frame, normalize_listing
+from fast_pipeline import CompiledPipeline
+
+
+def per_row_ms(score, rows):
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        score(row)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled vs sklearn pipeline inference")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--missing-rate", type=float, default=0.1)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    args = parser.parse_args()
+
+    pipeline = joblib.load(MODEL)
+    compiled = CompiledPipeline.from_pipeline(pipeline)
+    rows = [normalize_listing(r) for r in
+            blank_fields(sample_listings(args.rows), args.missing_rate)]
+
+    expected = pipeline.predict(listings_to_frame(rows))
+    diff = float(np.max(np.abs(expected - compiled.predict(rows))))
+    print(f"max |sklearn - compiled| = {diff:.3g} over {len(rows)} rows")
+    if diff > args.tolerance:
+        raise SystemExit(f"parity check failed: {diff:.3g} > {args.tolerance:g}")
+
+    sample = rows[:500]
+    p50, p99 = per_row_ms(lambda r: pipeline.predict(listings_to_frame([r])), sample)
+    print(f"{'sklearn per-row':<20} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+    p50, p99 = per_row_ms(lambda r: compiled.predict([r]), sample)
+    print(f"{'compiled per-row':<20} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+    seconds, _ = timed(lambda: pipeline.predict(listings_to_frame(rows)), repeat=3)
+    print(f"{'sklearn batch':<20} {len(rows) / seconds:>12,.0f} rows/sec")
+    seconds, _ = timed(lambda: compiled.predict(rows), repeat=3)
+    print(f"{'compiled batch':<20} {len(rows) / seconds:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
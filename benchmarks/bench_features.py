@@ -0,0 +1,99 @@
+"""
+bench_features.py
+Feature extraction on a Cars.csv scaled up to millions of rows: the original
+export_model.py parsing (a str copy plus one str.replace per unit suffix, a
+str.split for the brand, .loc fix-ups) against the shared car_features module
+(one factorize per column, values parsed once per distinct string). Times the
+parse step alone and the full file load, and checks both give the same
+features.
+Run: python benchmarks/bench_features.py [--rows 2000000]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA, timed
+from car_features import (build_features, clean_listings, FEATURE_COLUMNS, read_cars)
+
+
+def legacy_features(df):
+    """The parsing export_model.py used to do, kept verbatim for comparison."""
+    df = df[~df['fuel'].isin(['CNG', 'LPG'])]
+    df = df[df['owner'] != 'Test Drive Car']
+
+    owner_map = {'First Owner': 1, 'Second Owner': 2, 'Third Owner': 3,
+                 'Fourth & Above Owner': 4}
+    df['owner'] = df['owner'].map(owner_map)
+
+    def _num(series, sufs):
+        s = series.copy().astype(str)
+        for suf in sufs:
+            s = s.str.replace(suf, '', regex=False)
+        return pd.to_numeric(s, errors='coerce')
+
+    df['mileage'] = _num(df['mileage'], [' kmpl', ' km/kg'])
+    df['engine'] = _num(df['engine'], [' CC'])
+    df['max_power'] = _num(df['max_power'], [' bhp'])
+
+    df['brand'] = df['name'].str.split().str[0]
+    df.loc[df['brand'] == 'Land', 'brand'] = 'Land Rover'
+    df.loc[df['brand'] == 'Ashok', 'brand'] = 'Ashok Leyland'
+    return df[FEATURE_COLUMNS].copy()
+
+
+def shared_features(df):
+    return build_features(clean_listings(df))
+
+
+def scaled_csv(rows, path):
+    base = pd.read_csv(DATA)
+    reps = -(-rows // len(base))
+    pd.concat([base] * reps, ignore_index=True).iloc[:rows].to_csv(path, index=False)
+
+
+def check_parity(old, new):
+    # The legacy code spelled two brands out; the served model uses first words
+    first_words = {'Land Rover': 'Land', 'Ashok Leyland': 'Ashok'}
+    old = old.assign(brand=old['brand'].replace(first_words))
+    for col in FEATURE_COLUMNS:
+        a, b = old[col].to_numpy(), new[col].to_numpy()
+        if a.dtype.kind in 'fi' or b.dtype.kind == 'f':
+            ok = np.allclose(a.astype(float), b, equal_nan=True, rtol=0, atol=0)
+        else:
+            ok = pd.Series(a).equals(pd.Series(b))
+        if not ok:
+            raise AssertionError(f"feature {col!r} differs")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cars.csv feature extraction benchmark")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cars_scaled.csv")
+        scaled_csv(args.rows, path)
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.0f} MB CSV")
+
+        raw = pd.read_csv(path)
+        t_old, old = timed(legacy_features, raw, repeat=args.repeat)
+        t_new, new = timed(shared_features, raw, repeat=args.repeat)
+        check_parity(old, new)
+        print(f"{'parse only':<22} legacy {t_old:7.2f}s  shared {t_new:7.2f}s  "
+              f"({t_old / t_new:.1f}x, {len(new) / t_new:,.0f} rows/s)")
+        del raw, old, new
+
+        t_old, _ = timed(lambda: legacy_features(pd.read_csv(path)), repeat=args.repeat)
+        t_new, _ = timed(lambda: shared_features(read_cars(path)), repeat=args.repeat)
+        print(f"{'read_csv + parse':<22} legacy {t_old:7.2f}s  shared {t_new:7.2f}s  "
+              f"({t_old / t_new:.1f}x)")
+    print("features identical (brands compared as first words)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+bench_incremental.py
+Incremental updates (update_model.py) against full refits as new listings
+arrive. A base model is trained on part of the training split and the rest
+arrives in batches. After each batch it compares, on the same held-out test
+split export_model.py uses:
+- the stale base model
+- the incremental update: streaming statistics, rescaled trees and --rounds
+  more trees on the batch (plus --replay-rows base rows)
+- a full refit on every row seen so far with the current hyperparameters
+- with --search, a full refit after the cached CV search
+Also checks that rescaling the trees alone leaves predictions unchanged.
+Run: python benchmarks/bench_incremental.py [--base-fraction 0.6] [--batches 2] [--rounds 100]
+"""
+import argparse
+import copy
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA, ROOT, timed
+
+sys.path.insert(0, ROOT)
+
+from export_model import SEED, build_pipeline, search_cached, split_train_test  # noqa: E402
+from update_model import (TrainingState, rescale_thresholds, rmse,  # noqa: E402
+                          update_pipeline, update_preprocessor)
+from car_features import load_training_data  # noqa: E402
+from sklearn.model_selection import KFold  # noqa: E402
+
+PARAMS = {"learning_rate": 0.1, "max_depth": 4, "n_estimators": 500}
+
+
+def rescale_parity(pipeline, state, X_new, X_test):
+    """Max prediction change from new statistics plus rescaled trees alone."""
+    import xgboost as xgb
+    moved = copy.deepcopy(pipeline)
+    state = copy.deepcopy(state)
+    state.update(X_new)
+    booster = rescale_thresholds(pipeline[-1].get_booster(),
+                                 update_preprocessor(moved[0], state))
+    observed = X_test[~X_test.isna().any(axis=1)]  # imputed rows get the new fills
+    before = pipeline[-1].get_booster().predict(xgb.DMatrix(pipeline[0].transform(observed)))
+    after = booster.predict(xgb.DMatrix(moved[0].transform(observed)))
+    return float(np.abs(before - after).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental update vs full refit")
+    parser.add_argument("--base-fraction", type=float, default=0.6,
+                        help="share of the training split the base model sees")
+    parser.add_argument("--batches", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--replay-rows", type=int, default=0)
+    parser.add_argument("--search", action="store_true",
+                        help="also time a full cached search per batch (slow)")
+    args = parser.parse_args()
+
+    X, y = load_training_data(DATA)
+    X_train, X_test, y_train, y_test = split_train_test(X, y)
+    order = np.random.RandomState(SEED).permutation(len(X_train))
+    n_base = int(args.base_fraction * len(order))
+    base_rows = order[:n_base]
+    batch_rows = np.array_split(order[n_base:], args.batches)
+
+    X_seen, y_seen = X_train.iloc[base_rows], y_train.iloc[base_rows]
+    seconds, base = timed(lambda: build_pipeline("XGBoost", PARAMS).fit(X_seen, y_seen))
+    state = TrainingState.from_frame(X_seen)
+    incremental = base
+    print(f"base model: {len(X_seen)} rows, {seconds:.1f}s, test RMSE {rmse(base, X_test, y_test):.4f} "
+          f"(log price, {len(X_test)} test rows)")
+    print(f"rescaled trees, unchanged predictions: max |diff| "
+          f"{rescale_parity(base, state, X_train.iloc[batch_rows[0]], X_test):.1e}")
+    print()
+    print(f"{'batch':>5} {'rows':>6} {'seen':>6} {'model':<22} {'seconds':>8} {'trees':>6} {'test RMSE':>10}")
+
+    for i, rows in enumerate(batch_rows, 1):
+        X_new, y_new = X_train.iloc[rows], y_train.iloc[rows]
+        X_replay = y_replay = None
+        if args.replay_rows:
+            pick = np.random.RandomState(i).choice(len(X_seen), args.replay_rows, replace=False)
+            X_replay, y_replay = X_seen.iloc[pick], y_seen.iloc[pick]
+        X_seen, y_seen = pd.concat([X_seen, X_new]), pd.concat([y_seen, y_new])
+
+        results = [("stale base", 0.0, base)]
+        seconds, incremental = timed(update_pipeline, incremental, state, X_new, y_new,
+                                     args.rounds, X_replay, y_replay)
+        results.append((f"incremental +{args.rounds}", seconds, incremental))
+        seconds, refit = timed(lambda: build_pipeline("XGBoost", PARAMS).fit(X_seen, y_seen))
+        results.append(("full refit", seconds, refit))
+        if args.search:
+            def search_and_refit():
+                cv = KFold(n_splits=5, shuffle=True, random_state=SEED)
+                _, name, params = search_cached(X_seen, y_seen, cv)
+                return build_pipeline(name, params).fit(X_seen, y_seen)
+            seconds, searched = timed(search_and_refit)
+            results.append(("full search + refit", seconds, searched))
+
+        for name, seconds, model in results:
+            trees = model[-1].get_booster().num_boosted_rounds() if hasattr(model[-1], "get_booster") else "-"
+            print(f"{i:>5} {len(rows):>6} {len(X_seen):>6} {name:<22} {seconds:>8.2f} {trees:>6} "
+                  f"{rmse(model, X_test, y_test):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
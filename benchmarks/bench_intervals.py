@@ -0,0 +1,81 @@
+"""
+bench_intervals.py
+Overhead of the prediction interval on top of the point estimate: per-row
+latency and batch throughput of score_rows alone against score_rows followed
+by the interval lookup (price_bounds) on the artifact model. Also reports
+how often the sampled listings' prices fall inside their interval. These
+listings are training data, so this figure is optimistic; export_model.py
+prints the held-out coverage.
+Run: python benchmarks/bench_intervals.py [--rows 5000]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from _common import ROOT, blank_fields, sample_listings, timed
+
+from batch_api import normalize_listing, price_bounds, score_rows
+from car_features import build_features, clean_listings, log_target, read_cars
+from model_artifact import load_artifact
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+
+def point(model, rows):
+    return score_rows(model, rows)
+
+
+def point_and_interval(model, rows):
+    log_prices = score_rows(model, rows)
+    return log_prices, price_bounds(model, log_prices)
+
+
+def per_row_us(fn, model, rows):
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(model, [row])
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction interval overhead")
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    model = load_artifact(ARTIFACT)
+    if model.intervals is None:
+        raise SystemExit(f"{ARTIFACT} has no interval table; re-export it with export_model.py")
+    rows = [normalize_listing(r) for r in blank_fields(sample_listings(args.rows), 0.1)]
+
+    sample = rows[:1000]
+    fns = [("point", point), ("point + interval", point_and_interval)]
+    # Alternate the two paths over several rounds so drift hits both equally
+    stats = {label: ([], [], []) for label, _ in fns}
+    for _ in range(5):
+        for label, fn in fns:
+            p50, p99 = per_row_us(fn, model, sample)
+            seconds, _ = timed(fn, model, rows)
+            stats[label][0].append(p50)
+            stats[label][1].append(p99)
+            stats[label][2].append(len(rows) / seconds)
+    print(f"{'':<22} {'p50 us':>8} {'p99 us':>8} {'batch rows/s':>13}")
+    for label, (p50s, p99s, rates) in stats.items():
+        print(f"{label:<22} {np.median(p50s):>8.1f} {np.median(p99s):>8.1f} "
+              f"{np.median(rates):>13,.0f}")
+
+    seconds, _ = timed(price_bounds, model, np.zeros(1), repeat=1000)
+    print(f"interval lookup: {seconds * 1e6:.1f} us per single-row call", end=", ")
+    seconds, _ = timed(price_bounds, model, np.zeros(len(rows)), repeat=5)
+    print(f"{seconds / len(rows) * 1e9:.1f} ns/row in a batch")
+
+    df = clean_listings(read_cars(os.path.join(ROOT, "data", "Cars.csv")))
+    coverage = model.intervals.coverage_of(model.predict(build_features(df)), log_target(df))
+    print(f"in-sample coverage of the {model.intervals.coverage:.0%} interval: {coverage:.1%}")
+
+
+if __name__ == "__main__":
+    main()
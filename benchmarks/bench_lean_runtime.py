@@ -0,0 +1,157 @@
+"""
+bench_lean_runtime.py
+The numpy tree runtime (app/tree_runtime.py) against the xgboost booster it
+replaces in the lean image:
+- parity: the artifact scored with both runtimes and the pickled sklearn
+  Pipeline on sampled listings with blank fields, max |difference|
+- per-row latency and batch throughput of score_rows with either runtime
+- cold start of the app (import app + model load) and its RSS, each in a
+  fresh interpreter. The lean run blocks sklearn, xgboost, scipy, pandas
+  and joblib imports, as in an image that does not have them installed.
+- installed size of the dependency closure of pyproject.toml against
+  requirements-serve.txt, from the packages installed here
+Run: python benchmarks/bench_lean_runtime.py [--rows 5000] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from importlib import metadata
+
+import numpy as np
+
+from _common import APP_DIR, MODEL, ROOT, blank_fields, sample_listings, timed
+
+from batch_api import listings_to_frame, normalize_listing, score_rows
+from model_artifact import load_artifact
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+TRAINING_STACK = ["sklearn", "xgboost", "scipy", "pandas", "joblib"]
+
+CHILD = r"""
+import json, sys, time
+blocked = {blocked!r}
+
+class Blocker:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in blocked:
+            raise ImportError(f"{{name}} is not installed in the lean image")
+
+sys.meta_path.insert(0, Blocker())
+sys.path.insert(0, {app_dir!r})
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.registry.preload()
+t2 = time.perf_counter()
+with open("/proc/self/status") as f:
+    rss = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+heavy = sorted({{m.split(".")[0] for m in sys.modules}} & {stack!r})
+print(json.dumps({{"import_ms": (t1 - t0) * 1e3, "load_ms": (t2 - t1) * 1e3,
+                  "rss_mb": rss / 1024, "modules": len(sys.modules), "heavy": heavy}}))
+"""
+
+
+def cold_start(runtime, blocked):
+    code = CHILD.format(blocked=set(blocked), app_dir=APP_DIR, stack=set(TRAINING_STACK))
+    env = dict(os.environ, MODEL_RUNTIME=runtime, MODEL_PATH=ARTIFACT, MODEL_POLL_INTERVAL="0",
+               LOG_LEVEL="WARNING")
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def requirement_names(lines):
+    from packaging.requirements import Requirement
+    names = []
+    for line in lines:
+        line = line.split("#")[0].strip()
+        if line:
+            names.append(Requirement(line).name)
+    return names
+
+
+def closure_size(names):
+    """(MB on disk, installed packages, missing packages) of names and their
+    runtime dependencies."""
+    from packaging.requirements import Requirement
+    seen, missing, total, todo = set(), set(), 0, list(names)
+    while todo:
+        name = todo.pop().lower().replace("_", "-")
+        if name in seen or name in missing:
+            continue
+        try:
+            dist = metadata.distribution(name)
+        except metadata.PackageNotFoundError:
+            missing.add(name)
+            continue
+        seen.add(name)
+        total += sum(f.size or 0 for f in dist.files or [])
+        for spec in dist.requires or []:
+            req = Requirement(spec)
+            if req.marker is None or req.marker.evaluate({"extra": ""}):
+                todo.append(req.name)
+    return total / 1e6, len(seen), sorted(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="numpy tree runtime vs xgboost")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    args = parser.parse_args()
+
+    import joblib
+    pipeline = joblib.load(MODEL)
+    runtimes = {name: load_artifact(ARTIFACT, runtime=name) for name in ("xgboost", "numpy")}
+    rows = [normalize_listing(r) for r in blank_fields(sample_listings(args.rows, seed=3), 0.1)]
+
+    reference = runtimes["xgboost"].predict(rows)
+    diffs = {"numpy runtime vs xgboost booster": np.abs(runtimes["numpy"].predict(rows) - reference).max(),
+             "numpy runtime vs sklearn Pipeline":
+                 np.abs(runtimes["numpy"].predict(rows) - pipeline.predict(listings_to_frame(rows))).max()}
+    print(f"parity on {len(rows)} rows (10% blank fields), max |diff| in log price:")
+    for label, diff in diffs.items():
+        print(f"  {label}: {diff:.1e}")
+        if diff > args.tolerance:
+            raise SystemExit(f"parity check failed: {label} {diff:.3g} > {args.tolerance:g}")
+    print()
+
+    print(f"{'runtime':<8} {'1 row us':>9} {'batch 1000 ms':>14} {'rows/s':>9}")
+    for name, model in runtimes.items():
+        single = []
+        for row in rows[:2000]:
+            start = time.perf_counter()
+            score_rows(model, [row])
+            single.append((time.perf_counter() - start) * 1e6)
+        seconds, _ = timed(score_rows, model, rows[:1000], repeat=5)
+        print(f"{name:<8} {np.median(single):>9.0f} {seconds * 1e3:>14.1f} {1000 / seconds:>9.0f}")
+    print()
+
+    print(f"{'app cold start':<24} {'import ms':>10} {'load ms':>8} {'RSS MB':>7} {'modules':>8}  training stack loaded")
+    for label, runtime, blocked in [("full, xgboost runtime", "xgboost", []),
+                                    ("lean, numpy runtime", "numpy", TRAINING_STACK)]:
+        runs = [cold_start(runtime, blocked) for _ in range(args.runs)]
+        med = {k: statistics.median(r[k] for r in runs) for k in ("import_ms", "load_ms", "rss_mb", "modules")}
+        print(f"{label:<24} {med['import_ms']:>10.0f} {med['load_ms']:>8.0f} {med['rss_mb']:>7.0f} "
+              f"{med['modules']:>8.0f}  {', '.join(runs[-1]['heavy']) or '-'}")
+    print()
+
+    import tomllib
+    with open(os.path.join(ROOT, "pyproject.toml"), "rb") as f:
+        full = tomllib.load(f)["project"]["dependencies"]
+    with open(os.path.join(ROOT, "requirements-serve.txt")) as f:
+        lean = f.read().splitlines()
+    print("installed size of the dependency closure (packages installed here):")
+    for label, names in [("pyproject.toml", requirement_names(full)),
+                         ("requirements-serve.txt", requirement_names(lean))]:
+        mb, count, missing = closure_size(names)
+        note = f", not installed here: {', '.join(missing)}" if missing else ""
+        print(f"  {label:<24} {mb:>7.0f} MB in {count} packages{note}")
+
+
+if __name__ == "__main__":
+    main()
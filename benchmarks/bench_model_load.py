@@ -0,0 +1,68 @@
+"""
+bench_model_load.py
+Cold-start comparison of the pickled pipeline (joblib.load) and the artifact
+directory (flat arrays + native booster). Each load runs in a fresh
+interpreter; reports the shared numpy/xgboost import time, the load time of
+each format, first prediction latency and the process RSS afterwards (median
+over --runs).
+Run: python benchmarks/bench_model_load.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from _common import APP_DIR, MODEL, ROOT
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+# numpy + xgboost are needed either way and are timed separately ("import");
+# "load" covers everything the format itself adds, including its imports.
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+mode, path = sys.argv[1], sys.argv[2]
+import numpy, xgboost
+t1 = time.perf_counter()
+if mode == "pickle":
+    import joblib
+    model = joblib.load(path)
+else:
+    from model_artifact import load_artifact
+    model = load_artifact(path)
+t2 = time.perf_counter()
+from batch_api import normalize_listing, score_rows
+score_rows(model, [normalize_listing({{"year": 2015, "brand": "Maruti"}})])
+t3 = time.perf_counter()
+with open("/proc/self/status") as f:
+    rss = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+print(json.dumps({{"import_ms": (t1 - t0) * 1e3, "load_ms": (t2 - t1) * 1e3,
+                  "first_predict_ms": (t3 - t2) * 1e3, "rss_mb": rss / 1024}}))
+"""
+
+
+def run_once(mode, path):
+    code = CHILD.format(app_dir=APP_DIR)
+    out = subprocess.run([sys.executable, "-c", code, mode, path],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pickle vs artifact cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'format':<10} {'import ms':>10} {'load ms':>9} {'1st pred ms':>12} {'RSS MB':>8}")
+    for mode, path in [("pickle", MODEL), ("artifact", ARTIFACT)]:
+        runs = [run_once(mode, path) for _ in range(args.runs)]
+        med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print(f"{mode:<10} {med['import_ms']:>10.1f} {med['load_ms']:>9.1f} "
+              f"{med['first_predict_ms']:>12.1f} {med['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+bench_model_router.py
+Cost and accuracy of the notebook's models side by side, served through the
+model router (app/model_router.py). Random Forest, Linear Regression and a
+Decision Tree are trained on the same split as export_model.py and saved to
+a temporary directory. The app then runs in a worker process:
+- alone, as the baseline for response latency
+- with all three as shadow models, on every request and on a 20% sample
+- with a 20% Random Forest A/B arm and the other two as shadows
+For each run it reports the predict callback latency, and for the last one
+the router's per-model accounting (/api/models) next to the test RMSE.
+Run: python benchmarks/bench_model_router.py [--requests 300] [--rate 20]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from _common import APP_DIR, DATA, MODEL, ROOT, dash_predict_payload, sample_listings
+
+sys.path.insert(0, ROOT)
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+VARIANTS = {
+    "rf": ("Random Forest", {"max_depth": 10, "n_estimators": 15}),
+    "linear": ("Linear Regression", {}),
+    "tree": ("Decision Tree", {"max_depth": 10}),
+}
+
+
+def train_variants(out_dir):
+    """Fit the variants on the training split; returns (paths, test RMSE per model)."""
+    import joblib
+    from sklearn.metrics import mean_squared_error
+    from export_model import build_pipeline, split_train_test
+    from car_features import load_training_data
+
+    X, y = load_training_data(DATA)
+    X_train, X_test, y_train, y_test = split_train_test(X, y)
+
+    def rmse(model):
+        return float(np.sqrt(mean_squared_error(y_test, model.predict(X_test))))
+
+    paths, scores = {}, {"primary": rmse(joblib.load(MODEL))}
+    for name, (estimator, params) in VARIANTS.items():
+        model = build_pipeline(estimator, params).fit(X_train, y_train)
+        paths[name] = os.path.join(out_dir, f"car_price_{name}.model")
+        joblib.dump(model, paths[name])
+        scores[name] = rmse(model)
+    return paths, scores
+
+
+def measure(records, rate):
+    """Runs inside the worker process: paced predict callbacks, then /api/models."""
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    import app as dash_app
+
+    dash_app.router.preload()
+    client = dash_app.server.test_client()
+
+    def predict(record, clicks):
+        return client.post("/_dash-update-component",
+                           json=dash_predict_payload(record, clicks))
+
+    for i, record in enumerate(records[:10]):  # warm-up
+        predict(record, i + 1)
+    latencies, start = [], time.perf_counter()
+    for i, record in enumerate(records):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sent = time.perf_counter()
+        response = predict(record, i + 1)
+        latencies.append((time.perf_counter() - sent) * 1e3)
+        if response.status_code != 200:
+            raise RuntimeError(f"predict callback returned HTTP {response.status_code}")
+    dash_app.router.drain()
+    return {"p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "models": json.loads(client.get("/api/models").get_data())}
+
+
+def run_worker(records_path, rate, variants="", shadows="", sample_rate=1.0):
+    env = dict(os.environ, MODEL_PATH=ARTIFACT, MODEL_POLL_INTERVAL="0",
+               PREDICT_CACHE_SIZE="0", PREDICT_BATCH_WINDOW_MS="0", LOG_LEVEL="WARNING",
+               PYTHONWARNINGS="ignore", MODEL_VARIANTS=variants, MODEL_SHADOWS=shadows,
+               SHADOW_SAMPLE_RATE=str(sample_rate))
+    command = [sys.executable, os.path.abspath(__file__), "--worker", records_path,
+               "--rate", str(rate)]
+    out = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A/B and shadow models side by side")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=20, help="predict requests/sec")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.worker) as f:
+            print(json.dumps(measure(json.load(f), args.rate)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, rmse = train_variants(tmp)
+        records_path = os.path.join(tmp, "records.json")
+        with open(records_path, "w") as f:
+            json.dump(sample_listings(args.requests, seed=5), f)
+
+        def spec(names, weight=""):
+            return ",".join(f"{n}={paths[n]}{weight}" for n in names)
+
+        def run(**kwargs):
+            return run_worker(records_path, args.rate, **kwargs)
+
+        runs = {
+            "primary only": run(),
+            "+ 3 shadows": run(shadows=spec(VARIANTS)),
+            "+ 3 shadows, 20% sampled": run(shadows=spec(VARIANTS), sample_rate=0.2),
+            "20% rf arm + 2 shadows": run(variants=spec(["rf"], ":0.2"),
+                                          shadows=spec(["linear", "tree"])),
+        }
+
+    print(f"{args.requests} predict callbacks at {args.rate:g}/s, "
+          "Flask test client, 1 process")
+    print(f"{'configuration':<26} {'p50 ms':>7} {'p99 ms':>7} {'shadow dropped':>15}")
+    for name, run in runs.items():
+        print(f"{name:<26} {run['p50_ms']:>7.1f} {run['p99_ms']:>7.1f} "
+              f"{run['models']['shadow_dropped']:>15}")
+    print()
+
+    models = runs["20% rf arm + 2 shadows"]["models"]["models"]
+    print(f"{'model':<8} {'role':<8} {'type':<17} {'calls':>6} {'p50 ms':>7} "
+          f"{'ms/row':>7} {'load MB':>8} {'disk MB':>8} {'diverg.':>8} "
+          f"{'test RMSE':>10}")
+    roles = ["primary", "variant", "shadow"]
+    for name, m in sorted(models.items(), key=lambda kv: roles.index(kv[1]["role"])):
+        divergence = m.get("divergence", {}).get("mean_abs_log")
+        divergence = "-" if divergence is None else f"{divergence:.3f}"
+        print(f"{name:<8} {m['role']:<8} {m['model_type']:<17} {m['calls']:>6} "
+              f"{m['latency_ms']['p50']:>7.1f} {m['mean_ms_per_row'] or 0:>7.2f} "
+              f"{m['load_rss_mb'] or 0:>8.1f} {m['size_mb']:>8.2f} "
+              f"{divergence:>8} {rmse[name]:>10.4f}")
+    print("latency p50 is the upper bound of its histogram bucket; divergence is the "
+          "mean |log price - served log price|; load MB includes imports the model "
+          "pulled in first")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+bench_search.py
+Sequential against pooled runs of export_model.py's cached search. Each run
+scores every XGBoost / Random Forest candidate on the same cached folds; the
+pooled runs use a process pool of --n-jobs workers, each fitting with one
+thread. Reports wall time, the peak number of threads in the process tree
+(sampled every 50 ms) and the model picked, which must be the same for every
+run.
+Run: python benchmarks/bench_search.py [--n-jobs 1 2 4]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+from _common import DATA, ROOT
+from load_test import process_tree
+
+sys.path.insert(0, ROOT)
+
+
+def thread_count(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(int(line.split()[1]) for line in f
+                              if line.startswith("Threads:"))
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+def timed_search(X, y, cv, n_jobs):
+    """(seconds, peak threads, (score, name, params)) of one cached search."""
+    from export_model import search_cached
+
+    peak, done = [0], threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak[0] = max(peak[0], thread_count(process_tree(os.getpid())))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        result = search_cached(X, y, cv, n_jobs=n_jobs)
+    finally:
+        done.set()
+        sampler.join()
+    # The sampler thread itself is not part of the search
+    return time.perf_counter() - start, peak[0] - 1, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sequential vs pooled candidate search")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, os.cpu_count()],
+                        help="1 runs sequentially in this process")
+    args = parser.parse_args()
+
+    from sklearn.model_selection import KFold
+    from export_model import SEED, load_dataset, split_train_test
+
+    X, y = load_dataset(DATA)
+    X_train, _, y_train, _ = split_train_test(X, y)
+    cv = KFold(n_splits=5, shuffle=True, random_state=SEED)
+
+    print(f"cached search on {len(X_train)} rows, {os.cpu_count()} CPUs")
+    print(f"{'run':<20} {'seconds':>8} {'speedup':>8} {'peak threads':>13}  picked")
+    base, picked = None, set()
+    for n_jobs in args.n_jobs:
+        seconds, threads, result = timed_search(X_train, y_train, cv, n_jobs)
+        score, name, params = result
+        base = base or seconds
+        label = "sequential" if n_jobs <= 1 else f"pool, {n_jobs} workers"
+        picked.add((name, tuple(sorted(params.items())), round(score, 10)))
+        print(f"{label:<20} {seconds:>8.1f} {base / seconds:>7.2f}x {threads:>13}  "
+              f"{name} {params} CV MSE {-score:.5f}")
+    if len(picked) != 1:
+        raise SystemExit("runs picked different models")
+
+
+if __name__ == "__main__":
+    main()
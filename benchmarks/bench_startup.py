@@ -0,0 +1,134 @@
+"""
+bench_startup.py
+Where the app's startup time goes, and how soon it serves.
+- import profile: `python -X importtime` of `import app` and then of the
+  model load, in a fresh interpreter. Self time is summed per top-level
+  package, so "dash" is dash's own modules and "IPython" is what it pulls in
+  on its own.
+- time to first byte: gunicorn (gunicorn.conf.py) is started with each model
+  warm-up mode and runtime. It reports the time from launch until GET / (the
+  instructions page) first answers, and until /api/ready turns 200 and a
+  prediction can be served. It also reports the RSS and PSS of all the
+  server processes once ready.
+Run: python benchmarks/bench_startup.py [--runs 3] [--workers 2] [--top 12]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from _common import APP_DIR, ROOT
+from load_test import memory_kb, process_tree, stop_server
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+PHASE_MARK = "startup-phase:"
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+sys.stderr.write("{mark} model load\n")
+app.registry.preload()
+t2 = time.perf_counter()
+print(json.dumps({{"import app": (t1 - t0) * 1e3, "model load": (t2 - t1) * 1e3}}))
+"""
+
+
+def import_profile(runtime):
+    """({phase: wall ms}, {phase: {package: self ms}}) from one cold start."""
+    env = dict(os.environ, MODEL_PATH=ARTIFACT, MODEL_RUNTIME=runtime, MODEL_POLL_INTERVAL="0",
+               LOG_LEVEL="WARNING")
+    code = CHILD.format(app_dir=APP_DIR, mark=PHASE_MARK)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    phase, packages = "import app", defaultdict(lambda: defaultdict(float))
+    for line in out.stderr.splitlines():
+        if line.startswith(PHASE_MARK):
+            phase = line[len(PHASE_MARK):].strip()
+        elif line.startswith("import time:") and "self [us]" not in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            packages[phase][name.strip().split(".")[0]] += int(self_us) / 1e3
+    return json.loads(out.stdout.strip().splitlines()[-1]), packages
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def time_to_serve(port, workers, warmup, runtime):
+    """Seconds from launch to the first page and to readiness, and memory."""
+    env = dict(os.environ, PORT=str(port), DEBUG="False", WEB_CONCURRENCY=str(workers),
+               MODEL_WARMUP=warmup, MODEL_RUNTIME=runtime, MODEL_PATH=ARTIFACT,
+               LOG_LEVEL="WARNING")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:server"],
+                            cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    first_byte = ready = None
+    try:
+        while ready is None and time.perf_counter() - start < 60:
+            try:
+                if first_byte is None and get(port, "/") == 200:
+                    first_byte = time.perf_counter() - start
+                if first_byte is not None and get(port, "/api/ready") == 200:
+                    ready = time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.01)
+        # Every worker has loaded once the process tree stops growing
+        time.sleep(2)
+        rss = pss = 0
+        for pid in process_tree(proc.pid):
+            r, p = memory_kb(pid)
+            rss, pss = rss + r, pss + p
+    finally:
+        stop_server(proc)
+    if ready is None:
+        raise RuntimeError(f"gunicorn ({warmup}, {runtime}) was not ready within 60 s")
+    return {"first_byte": first_byte, "ready": ready, "rss_mb": rss / 1024, "pss_mb": pss / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup profile and time to first byte")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--top", type=int, default=12, help="packages listed per phase")
+    parser.add_argument("--port", type=int, default=18070)
+    args = parser.parse_args()
+
+    for runtime in ("xgboost", "numpy"):
+        walls, packages = import_profile(runtime)
+        print(f"import profile, MODEL_RUNTIME={runtime} (self time per top-level package, -X importtime)")
+        for phase, wall in walls.items():
+            own = packages[phase]
+            print(f"  {phase}: {wall:.0f} ms wall, {sum(own.values()):.0f} ms in {len(own)} packages")
+            for name, ms in sorted(own.items(), key=lambda kv: -kv[1])[:args.top]:
+                print(f"    {name:<24} {ms:>7.1f} ms")
+        print()
+
+    print(f"gunicorn, {args.workers} workers, median of {args.runs} launches")
+    print(f"{'warm-up':<11} {'runtime':<8} {'first byte s':>13} {'ready s':>8} {'RSS MB':>7} {'PSS MB':>7}")
+    for warmup in ("preload", "background"):
+        for runtime in ("xgboost", "numpy"):
+            runs = [time_to_serve(args.port, args.workers, warmup, runtime) for _ in range(args.runs)]
+            med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+            print(f"{warmup:<11} {runtime:<8} {med['first_byte']:>13.2f} {med['ready']:>8.2f} "
+                  f"{med['rss_mb']:>7.0f} {med['pss_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+bench_whatif.py
+Cost of a what-if price curve (price against km_driven and year with the
+rest of the listing fixed): one single-row predict per curve point, as when
+a user edits the field and clicks again, against one batched price_curves
+call and a lookup in the precomputed QuoteIndex. Also reports the index
+build time and size.
+Run: python benchmarks/bench_whatif.py [--listings 200]
+"""
+import argparse
+import os
+
+import numpy as np
+
+from _common import ROOT, sample_listings, timed
+
+from batch_api import normalize_listing, score_rows
+from model_artifact import load_artifact
+from whatif import CURVE_GRIDS, QuoteIndex, price_curves
+
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+FUELS = ["Petrol", "Diesel"]
+TRANSMISSIONS = ["Manual", "Automatic"]
+
+
+def per_click(model, listings):
+    for listing in listings:
+        for field, values in CURVE_GRIDS.items():
+            for v in values:
+                score_rows(model, [dict(listing, **{field: float(v)})])
+
+
+def batched(model, listings):
+    for listing in listings:
+        price_curves(model, listing, CURVE_GRIDS)
+
+
+def indexed(index, listings, version):
+    for listing in listings:
+        for field in CURVE_GRIDS:
+            index.lookup(listing, field, version)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="What-if curve cost")
+    parser.add_argument("--listings", type=int, default=200)
+    args = parser.parse_args()
+
+    model = load_artifact(ARTIFACT)
+    records = sample_listings(args.listings)
+    listings = [normalize_listing(r) for r in records]
+    # Form-style listings with only brand/fuel/transmission filled: index hits
+    partial = [normalize_listing({k: r[k] for k in QuoteIndex.KEY_FIELDS})
+               for r in records]
+    brands = sorted({r["brand"] for r in records})
+
+    seconds, index = timed(QuoteIndex.build, model, brands, FUELS, TRANSMISSIONS,
+                           model.version, repeat=3)
+    points = sum(len(v) for v in CURVE_GRIDS.values())
+    print(f"index build: {len(index.keys)} combinations x {points} "
+          f"points in {seconds * 1e3:.0f} ms, {index.nbytes / 1024:.0f} KiB")
+
+    hits = sum(index.lookup(listing, "year", model.version) is not None
+               for listing in partial)
+    n = len(listings)
+    print(f"{'per listing (2 curves, ' + str(points) + ' points)':<38} {'ms':>8}")
+    seconds, _ = timed(per_click, model, listings[:20])
+    print(f"{'one predict per point':<38} {seconds / 20 * 1e3:>8.2f}")
+    seconds, _ = timed(batched, model, listings, repeat=3)
+    print(f"{'price_curves (one batch)':<38} {seconds / n * 1e3:>8.2f}")
+    seconds, _ = timed(indexed, index, partial, model.version, repeat=3)
+    print(f"{'QuoteIndex lookup':<38} {seconds / n * 1e3:>8.3f}   ({hits}/{n} hits)")
+
+    # Index curves must equal freshly scored ones
+    for listing in partial[:20]:
+        for field in CURVE_GRIDS:
+            hit = index.lookup(listing, field, model.version)
+            fresh = price_curves(model, listing, {field: CURVE_GRIDS[field]})[field][1]
+            assert np.allclose(hit[1], fresh, atol=1e-6), field
+    print("index curves match the model")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+load_test.py
+Starts the app under the Dash dev server (python app.py) and under gunicorn
+with several worker counts, drives the predict_price callback with concurrent
+keep-alive clients and reports requests/sec next to the resident memory of the
+server processes (RSS, and PSS which splits copy-on-write shared pages).
+Run: python benchmarks/load_test.py [--workers 1 2 4] [--clients 16] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from _common import APP_DIR, dash_predict_payload, sample_listings
+
+
+def memory_kb(pid):
+    """(rss_kb, pss_kb) for one process, read from /proc."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:"):
+                    values[parts[0]] = int(parts[1])
+    except OSError:
+        pass
+    return values.get("Rss:", 0), values.get("Pss:", 0)
+
+
+def process_tree(pid):
+    pids, frontier = [pid], [pid]
+    while frontier:
+        parent = frontier.pop()
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children") as f:
+                children = [int(c) for c in f.read().split()]
+        except OSError:
+            children = []
+        pids.extend(children)
+        frontier.extend(children)
+    return pids
+
+
+def start_server(mode, port, workers, threads):
+    env = dict(os.environ, PORT=str(port), DEBUG="False",
+               PREDICT_CACHE_SIZE="0", WEB_CONCURRENCY=str(workers),
+               GUNICORN_THREADS=str(threads))
+    if mode == "dev":
+        cmd = [sys.executable, "app.py"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:server"]
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    # Up once the model can score; 404 is an app without /api/ready
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/ready")
+            if conn.getresponse().status in (200, 404):
+                return proc
+            time.sleep(0.2)
+        except OSError:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f"{mode} server did not come up on port {port}")
+
+
+def stop_server(proc):
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def drive(port, bodies, clients, duration, latencies=None):
+    """Post bodies from concurrent keep-alive clients for duration seconds.
+
+    Returns (requests/sec, errors); per-request latencies in ms of successful
+    requests are appended to ``latencies`` if given.
+    """
+    counts, errors = [0] * clients, [0] * clients
+    stop_at = time.perf_counter() + duration
+
+    def client(i):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        headers = {"Content-Type": "application/json"}
+        j = i
+        while time.perf_counter() < stop_at:
+            try:
+                sent = time.perf_counter()
+                conn.request("POST", "/_dash-update-component", bodies[j % len(bodies)], headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[i] += 1
+                    if latencies is not None:
+                        latencies.append((time.perf_counter() - sent) * 1000.0)
+                else:
+                    errors[i] += 1
+            except OSError:
+                errors[i] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            j += clients
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / (time.perf_counter() - start), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dev server vs gunicorn load test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=18050)
+    parser.add_argument("--skip-dev", action="store_true")
+    args = parser.parse_args()
+
+    bodies = [json.dumps(dash_predict_payload(r, n_clicks=i + 1))
+              for i, r in enumerate(sample_listings(2000))]
+    runs = [] if args.skip_dev else [("dev", 1)]
+    runs += [("gunicorn", w) for w in args.workers]
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'server':<18} {'req/sec':>9} {'errors':>7} {'procs':>6} "
+          f"{'RSS MB':>8} {'PSS MB':>8} {'PSS/worker':>11}")
+    for mode, workers in runs:
+        proc = start_server(mode, args.port, workers, args.threads)
+        try:
+            rps, errors = drive(args.port, bodies, args.clients, args.duration)
+            pids = process_tree(proc.pid)
+            mem = [memory_kb(pid) for pid in pids]
+        finally:
+            stop_server(proc)
+        rss = sum(m[0] for m in mem) / 1024
+        pss = sum(m[1] for m in mem) / 1024
+        per_worker = pss / max(1, len(pids) - (mode == "gunicorn"))
+        label = mode if mode == "dev" else f"gunicorn w={workers} t={args.threads}"
+        print(f"{label:<18} {rps:>9,.0f} {errors:>7} {len(pids):>6} "
+              f"{rss:>8.0f} {pss:>8.0f} {per_worker:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+run_suite.py
+Reproducible serving benchmark: single-row latency percentiles, batch
+throughput at several batch sizes and end-to-end HTTP latency of the
+predict_price callback under concurrent clients. Inputs are sampled from
+data/Cars.csv with a fixed seed, with a fraction of fields blanked so the
+imputers run.
+
+Results are written as JSON (benchmarks/results/<timestamp>.json by default)
+and compared against --baseline: any metric worse by more than --threshold
+is flagged, and --fail-on-regression turns that into exit code 1.
+
+Run: python benchmarks/run_suite.py [--baseline benchmarks/results/base.json]
+     python benchmarks/run_suite.py --compare old.json new.json
+     MODEL_PATH=../model/new.model python benchmarks/run_suite.py ...
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from _common import (APP_DIR, ROOT, blank_fields, dash_predict_payload,
+                     sample_listings)
+from load_test import drive, start_server, stop_server
+
+from batch_api import normalize_listing, score_rows
+from model_registry import load_model_file
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_MODELS = [os.path.join(ROOT, "model", "car_price.artifact"),
+                  os.path.join(ROOT, "model", "car_price.model")]
+
+
+def percentiles(values_ms, prefix):
+    values = np.asarray(values_ms)
+    return {f"{prefix}.p{q}_ms": float(np.percentile(values, q)) for q in (50, 90, 99)}
+
+
+def bench_single_row(model, records, repeat):
+    """Per-request path in process: normalize one listing and score it."""
+    for record in records[:50]:  # warm-up
+        score_rows(model, [normalize_listing(record)])
+    latencies = []
+    for _ in range(repeat):
+        for record in records:
+            start = time.perf_counter()
+            score_rows(model, [normalize_listing(record)])
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return percentiles(latencies, "single_row")
+
+
+def bench_batches(model, records, sizes, seconds, trials=5):
+    """Best rows/sec of several short trials per batch size (robust to noise)."""
+    results = {}
+    for size in sizes:
+        batches = [records[i:i + size] for i in range(0, len(records) - size + 1, size)] or [records]
+        best, done = 0.0, 0
+        for _ in range(trials):
+            rows = 0
+            start = time.perf_counter()
+            while True:
+                batch = batches[done % len(batches)]
+                score_rows(model, [normalize_listing(r) for r in batch])
+                rows += len(batch)
+                done += 1
+                elapsed = time.perf_counter() - start
+                if elapsed >= seconds / trials:
+                    break
+            best = max(best, rows / elapsed)
+        results[f"batch.{size}.rows_per_sec"] = best
+    return results
+
+
+def bench_http(records, clients_list, duration, server, workers, port):
+    bodies = [json.dumps(dash_predict_payload(r, n_clicks=i + 1))
+              for i, r in enumerate(records)]
+    results = {}
+    proc = start_server(server, port, workers, threads=4)
+    try:
+        drive(port, bodies, 2, 1.0)  # warm-up
+        for clients in clients_list:
+            latencies = []
+            rps, errors = drive(port, bodies, clients, duration, latencies)
+            results[f"http.c{clients}.requests_per_sec"] = rps
+            results[f"http.c{clients}.errors"] = errors
+            results.update(percentiles(latencies, f"http.c{clients}"))
+    finally:
+        stop_server(proc)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -- comparison ---------------------------------------------------------------
+def lower_is_better(name):
+    return name.endswith("_ms") or name.endswith(".errors")
+
+
+def compare(baseline, current, threshold, tail_threshold):
+    """Print metric changes; returns the names of regressed metrics.
+
+    p99 latencies are noisier than the rest and use ``tail_threshold``.
+    """
+    regressions = []
+    print(f"{'metric':<34} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, new in current["metrics"].items():
+        old = baseline["metrics"].get(name)
+        if old is None:
+            continue
+        if name.endswith(".errors"):
+            change = float(new - old)
+            worse = new > old
+        else:
+            limit = tail_threshold if name.endswith("p99_ms") else threshold
+            change = (new - old) / old if old else 0.0
+            worse = change > limit if lower_is_better(name) else change < -limit
+        flag = "  REGRESSION" if worse else ""
+        shown = f"{change:+.0f}" if name.endswith(".errors") else f"{change:+.1%}"
+        print(f"{name:<34} {old:>12.4g} {new:>12.4g} {shown:>8}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving benchmark suite")
+    parser.add_argument("--rows", type=int, default=2000, help="sampled listings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--missing-rate", type=float, default=0.1,
+                        help="fraction of fields blanked to exercise the imputers")
+    parser.add_argument("--repeat", type=int, default=3, help="passes for single-row latency")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--batch-seconds", type=float, default=2.0,
+                        help="time per batch size, split over --trials")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per HTTP run")
+    parser.add_argument("--server", choices=["gunicorn", "dev"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=18050)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--out", default=None, help="results JSON path")
+    parser.add_argument("--baseline", default=None, help="results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative change counted as a regression")
+    parser.add_argument("--tail-threshold", type=float, default=0.5,
+                        help="regression threshold for p99 latencies")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="only compare two results files")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.tail_threshold)
+        sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+    model_path = os.environ.get("MODEL_PATH") or next(p for p in DEFAULT_MODELS if os.path.exists(p))
+    if not os.path.isabs(model_path):
+        model_path = os.path.join(APP_DIR, model_path)
+    model, version = load_model_file(model_path)
+    records = blank_fields(sample_listings(args.rows, seed=args.seed), args.missing_rate, args.seed)
+
+    metrics = {}
+    metrics.update(bench_single_row(model, records, args.repeat))
+    metrics.update(bench_batches(model, records, args.batch_sizes, args.batch_seconds,
+                                 args.trials))
+    if not args.skip_http:
+        metrics.update(bench_http(records, args.clients, args.duration, args.server,
+                                  args.workers, args.port))
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "model_path": os.path.relpath(model_path, ROOT),
+            "model_version": version,
+            "model_type": type(model).__name__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items()
+                     if k not in ("out", "baseline", "compare")},
+        },
+        "metrics": metrics,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for name, value in metrics.items():
+        print(f"{name:<34} {value:>12.4g}")
+    print(f"Saved results to {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(baseline, result, args.threshold, args.tail_threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
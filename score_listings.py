@@ -0,0 +1,187 @@
+"""
+score_listings.py
+Re-prices a full listing dump in the Cars.csv schema without loading it into
+memory. The input is read in fixed-size chunks (CSV via pandas, Parquet via
+pyarrow record batches); each chunk is cleaned and parsed with the same rules
+as training (app/car_features.py) and scored in a process pool. Results are
+appended to the output in input order as soon as their chunk is done, and at
+most 2 chunks per worker are in flight, so memory stays bounded whatever the
+input size.
+
+Output columns: row (0-based position in the input), any --keep columns,
+log_price and price. Rows removed by the cleaning rules (CNG/LPG fuel, test
+drive cars) are not scored.
+
+Run: python score_listings.py dump.csv prices.csv [--chunk-rows 100000] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from batch_api import score_rows  # noqa: E402
+from car_features import RAW_DTYPES, build_features, clean_listings, read_cars  # noqa: E402
+from model_registry import load_model_file  # noqa: E402
+
+MODEL_PATHS = [
+    os.path.join(ROOT, "model", "car_price.artifact"),
+    os.path.join(ROOT, "model", "car_price.model"),
+]
+
+# Per-process model, loaded once by the pool initializer
+_MODEL = None
+
+
+def _init_worker(model_path):
+    global _MODEL
+    _MODEL, _ = load_model_file(model_path)
+
+
+def _is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def read_chunks(path, chunk_rows):
+    """Yield (first row number, raw DataFrame chunk) pairs."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        reader = pq.ParquetFile(path)
+        columns = [c for c in RAW_DTYPES if c in reader.schema_arrow.names]
+        start = 0
+        for batch in reader.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield start, batch.to_pandas()
+            start += batch.num_rows
+    else:
+        start = 0
+        for chunk in read_cars(path, chunksize=chunk_rows):
+            yield start, chunk
+            start += len(chunk)
+
+
+def score_chunk(task):
+    """Clean, parse and score one chunk; returns (n_input_rows, result frame)."""
+    start, chunk, keep = task
+    chunk.index = np.arange(start, start + len(chunk))
+    cleaned = clean_listings(chunk)
+    features = build_features(cleaned)
+    log_price = np.asarray(score_rows(_MODEL, features), dtype=np.float64)
+    result = cleaned[keep].copy() if keep else cleaned.iloc[:, :0].copy()
+    result.insert(0, "row", cleaned.index.to_numpy())
+    # Rounded like the batch API; short floats also keep to_csv on its fast path
+    result["log_price"] = np.round(log_price, 6)
+    result["price"] = np.round(np.exp(log_price), 2)
+    return len(chunk), result
+
+
+class ResultWriter:
+    """Appends result frames to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._file = None
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="")
+                frame.iloc[:0].to_csv(self._file, index=False)
+            frame.to_csv(self._file, index=False, header=False)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def _tasks(path, chunk_rows, keep):
+    for start, chunk in read_chunks(path, chunk_rows):
+        yield start, chunk, keep
+
+
+def score_file(src, dst, model_path, chunk_rows=100_000, workers=None, keep=(),
+               progress=True):
+    """Score src into dst; returns (input rows, scored rows, seconds)."""
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(dst)
+    n_in = n_out = 0
+    started = time.perf_counter()
+
+    def _done(n_rows, result):
+        nonlocal n_in, n_out
+        writer.write(result)
+        n_in += n_rows
+        n_out += len(result)
+        if progress:
+            seconds = time.perf_counter() - started
+            print(f"  {n_in:,} rows read, {n_out:,} scored, "
+                  f"{n_in / seconds:,.0f} rows/s", file=sys.stderr)
+
+    try:
+        if workers == 1:
+            _init_worker(model_path)
+            for task in _tasks(src, chunk_rows, list(keep)):
+                _done(*score_chunk(task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as pool:
+                # Bounded window of in-flight chunks, written back in input order
+                pending = []
+                for task in _tasks(src, chunk_rows, list(keep)):
+                    pending.append(pool.submit(score_chunk, task))
+                    if len(pending) >= 2 * workers:
+                        _done(*pending.pop(0).result())
+                for future in pending:
+                    _done(*future.result())
+    finally:
+        writer.close()
+    return n_in, n_out, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a Cars.csv-style dump in chunks")
+    parser.add_argument("src", help="input .csv or .parquet")
+    parser.add_argument("dst", help="output .csv or .parquet")
+    parser.add_argument("--model", default=None,
+                        help="artifact directory or pickled pipeline (default: model/)")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="scoring processes (default: all CPUs)")
+    parser.add_argument("--keep", default="",
+                        help="comma-separated input columns copied to the output, e.g. name,year")
+    parser.add_argument("--quiet", action="store_true", help="no per-chunk progress")
+    args = parser.parse_args()
+
+    model_path = args.model or next((p for p in MODEL_PATHS if os.path.exists(p)), None)
+    if model_path is None:
+        parser.error("no model found; pass --model")
+    keep = [c for c in args.keep.split(",") if c]
+    unknown = set(keep) - set(RAW_DTYPES)
+    if unknown:
+        parser.error(f"unknown --keep columns {sorted(unknown)}; choose from {sorted(RAW_DTYPES)}")
+
+    n_in, n_out, seconds = score_file(args.src, args.dst, model_path, args.chunk_rows,
+                                      args.workers, keep, progress=not args.quiet)
+    print(f"Scored {n_out:,} of {n_in:,} rows in {seconds:.1f}s "
+          f"({n_in / seconds:,.0f} rows/s) -> {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+conftest.py
+Puts app/ on sys.path so the serving modules import the same way they do in
+the container.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
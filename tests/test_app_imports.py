@@ -0,0 +1,32 @@
+"""
+test_app_imports.py
+IPython is hidden from dash only while app.py imports it: the module stays
+importable afterwards, also when an import inside the block fails.
+"""
+import sys
+
+import pytest
+
+from import_hooks import hidden_module
+
+
+def test_app_import_leaves_no_module_hidden():
+    import app  # noqa: F401
+    assert sys.modules.get("IPython", False) is not None
+
+
+def test_hidden_module_is_restored_after_failed_import():
+    name = "module_hidden_for_test"
+    with pytest.raises(ZeroDivisionError):
+        with hidden_module(name):
+            with pytest.raises(ImportError):
+                __import__(name)
+            1 / 0
+    assert name not in sys.modules
+
+
+def test_hidden_module_keeps_imported_module():
+    import json
+    with hidden_module("json"):
+        import json as hidden
+    assert hidden is json and sys.modules["json"] is json
@@ -0,0 +1,49 @@
+"""
+test_async_service.py
+The asyncio front end serves the model app.py resolves, and never calls
+registry.get(), which can wait for a reload, on the event loop thread.
+"""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import async_service  # noqa: E402
+import model_registry  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+
+def test_model_paths_are_shared_with_the_dash_app():
+    assert async_service.MODEL_PATHS is model_registry.MODEL_PATHS
+
+
+@pytest.mark.filterwarnings("ignore:It is recommended to use web.AppKey")
+def test_registry_is_read_off_the_event_loop(monkeypatch):
+    registry = async_service.registry
+    get, threads = registry.get, []
+
+    def recording_get():
+        threads.append(threading.current_thread())
+        return get()
+
+    async def run():
+        app = async_service.create_app(workers=1, rate=0)
+        monkeypatch.setattr(registry, "get", recording_get)
+        loop_thread = threading.current_thread()
+        async with TestClient(TestServer(app)) as client:
+            health = await client.get("/healthz")
+            assert health.status == 200
+            assert (await health.json())["model_version"] == get().version
+            one = await client.post("/api/predict", json={"year": 2015, "brand": "Maruti"})
+            assert one.status == 200
+            assert "price_low" in await one.json()
+            batch = await client.post("/api/predict/batch", json=[{"year": 2015}, {}])
+            assert batch.status == 200
+            assert batch.headers["X-Interval-Coverage"]
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert threads
+    assert loop_thread not in threads
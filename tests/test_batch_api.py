@@ -0,0 +1,125 @@
+"""
+test_batch_api.py
+Parsing of JSON, NDJSON and CSV batch bodies, row normalization and the 400
+answers of /api/predict/batch for malformed bodies and rows.
+"""
+import json
+import math
+
+import numpy as np
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from batch_api import (
+    BatchError, normalize_listing, parse_listings, predict_log_prices, stream_predictions,
+)
+
+LISTINGS = [
+    {"id": "a", "year": 2015, "km_driven": 60000, "fuel": "Petrol", "brand": "Maruti"},
+    {"id": "b", "year": 2012, "max_power": "74 bhp", "owner": "Second Owner"},
+]
+
+
+def test_parses_json_array():
+    fmt, records = parse_listings(json.dumps(LISTINGS).encode(), "application/json")
+    assert fmt == "json"
+    assert records == LISTINGS
+
+
+def test_parses_ndjson_skipping_blank_lines():
+    body = "\n".join(json.dumps(r) for r in LISTINGS) + "\n\n"
+    fmt, records = parse_listings(body.encode(), "application/x-ndjson")
+    assert fmt == "ndjson"
+    assert records == LISTINGS
+
+
+def test_parses_csv_with_byte_order_mark():
+    body = "\ufeffid,year,km_driven\na,2015,60000\nb,2012,\n".encode()
+    fmt, records = parse_listings(body, "text/csv")
+    assert fmt == "csv"
+    assert records == [{"id": "a", "year": "2015", "km_driven": "60000"},
+                       {"id": "b", "year": "2012", "km_driven": ""}]
+
+
+@pytest.mark.parametrize("body, mimetype, message", [
+    (b"[]", "text/plain", "unsupported content type"),
+    (b"[{", "application/json", "invalid JSON"),
+    (b'{"year": 2015}', "application/json", "must be an array"),
+    (b'{"year": 2015}\n{', "application/x-ndjson", "line 2"),
+    (b'[{"year": 2015}, 7]', "application/json", "row 1: expected an object"),
+    (b"\xff\xfey\x00e\x00a\x00r\x00", "text/csv", "not UTF-8"),
+])
+def test_malformed_bodies_raise_batch_error(body, mimetype, message):
+    with pytest.raises(BatchError, match=message):
+        parse_listings(body, mimetype)
+
+
+def test_normalize_accepts_form_ids_units_and_owner_labels():
+    row = normalize_listing({"km": "60000", "power": "74 bhp", "mileage": "23.4 kmpl",
+                             "owner": "Second Owner", "brand": "Maruti Swift Dzire",
+                             "fuel": " Diesel "})
+    assert row["km_driven"] == 60000.0
+    assert row["max_power"] == 74.0
+    assert row["mileage"] == 23.4
+    assert row["owner"] == 2.0
+    assert row["brand"] == "Maruti"
+    assert row["fuel"] == "Diesel"
+
+
+def test_normalize_leaves_missing_values_as_nan():
+    row = normalize_listing({"year": "", "km_driven": None, "engine": float("nan")})
+    assert all(isinstance(v, float) and math.isnan(v) for v in row.values())
+
+
+@pytest.mark.parametrize("field, value", [
+    ("year", "new"), ("max_power", "lots bhp"), ("owner", "Test Drive Car"),
+    ("year", "inf"), ("km_driven", "nan"), ("engine", 1e308), ("mileage", float("-inf")),
+])
+def test_normalize_rejects_bad_numbers_with_row_index(field, value):
+    with pytest.raises(BatchError, match=f"row 3: '{field}'"):
+        normalize_listing({field: value}, 3)
+
+
+def test_predict_reports_first_bad_row():
+    model = DummyRegressor().fit([[0] * 9], [11.0])
+    records = LISTINGS + [{"year": "soon"}]
+    with pytest.raises(BatchError, match="row 2: 'year'"):
+        predict_log_prices(model, records)
+
+
+def test_stream_echoes_ids_or_row_index():
+    records = [{"id": "a"}, {}]
+    log_prices = np.log([100000.0, 250000.0])
+    lines = "".join(stream_predictions(records, log_prices, "csv")).splitlines()
+    assert lines == ["id,log_price,price", "a,11.512925,100000.00", "1,12.429216,250000.00"]
+    items = json.loads("".join(stream_predictions(records, log_prices, "json")))
+    assert [item["id"] for item in items] == ["a", 1]
+
+
+@pytest.fixture(scope="module")
+def client():
+    import app
+    return app.server.test_client()
+
+
+def test_batch_endpoint_scores_every_row(client):
+    response = client.post("/api/predict/batch", data=json.dumps(LISTINGS),
+                           content_type="application/json")
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"]
+    items = response.get_json()
+    assert [item["id"] for item in items] == ["a", "b"]
+    assert all(item["price_low"] <= item["price"] <= item["price_high"] for item in items)
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b"year\n2015\n", "text/plain"),
+    (b"\xff\xfey\x00e\x00a\x00r\x00", "text/csv"),
+    (b'{"year": 2015}', "application/json"),
+    (b"year,km_driven\ninf,100\n", "text/csv"),
+    (b"year,km_driven\n2015,lots\n", "text/csv"),
+])
+def test_batch_endpoint_answers_400(client, body, content_type):
+    response = client.post("/api/predict/batch", data=body, content_type=content_type)
+    assert response.status_code == 400
+    assert response.get_json()["error"]
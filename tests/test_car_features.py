@@ -0,0 +1,84 @@
+"""
+test_car_features.py
+The vectorized Cars.csv parsing in car_features gives the same features as
+the per-row string parsing export_model.py used before, and as the scalar
+normalize_listing the app applies to one listing.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_api import normalize_listing
+from car_features import FEATURE_COLUMNS, build_features, clean_listings, read_cars
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "data", "Cars.csv")
+
+# Odd raw values next to the real rows: blanks, bare units, extra spaces
+EDGE_ROWS = [
+    {"name": "Land Rover Discovery", "mileage": "", "engine": "CC", "max_power": " bhp"},
+    {"name": "Ashok Leyland Stile", "mileage": "0.0 kmpl", "engine": "1498 CC",
+     "max_power": "  103.52 bhp "},
+    {"name": "Maruti", "mileage": "17.3 km/kg", "engine": None, "max_power": "bhp"},
+    {"name": "Tata Nano", "mileage": "23.9 kmpl", "engine": "624 CC", "max_power": "37 bhp",
+     "owner": "Fourth & Above Owner", "year": 2012, "km_driven": 0},
+]
+
+
+def legacy_features(df):
+    """The parsing export_model.py used to do, as in benchmarks/bench_features.py."""
+    df = df[~df['fuel'].isin(['CNG', 'LPG'])]
+    df = df[df['owner'] != 'Test Drive Car']
+
+    owner_map = {'First Owner': 1, 'Second Owner': 2, 'Third Owner': 3, 'Fourth & Above Owner': 4}
+    df['owner'] = df['owner'].map(owner_map)
+
+    def _num(series, sufs):
+        s = series.copy().astype(str)
+        for suf in sufs:
+            s = s.str.replace(suf, '', regex=False)
+        return pd.to_numeric(s, errors='coerce')
+
+    df['mileage'] = _num(df['mileage'], [' kmpl', ' km/kg'])
+    df['engine'] = _num(df['engine'], [' CC'])
+    df['max_power'] = _num(df['max_power'], [' bhp'])
+
+    df['brand'] = df['name'].str.split().str[0]
+    return df[FEATURE_COLUMNS].copy()
+
+
+@pytest.fixture(scope="module")
+def raw():
+    base = read_cars(DATA)
+    edge = pd.DataFrame([{**base.iloc[0].to_dict(), **row} for row in EDGE_ROWS])
+    return pd.concat([base, edge.astype(base.dtypes.to_dict())], ignore_index=True)
+
+
+def test_vectorized_parsing_matches_legacy_parser(raw):
+    old = legacy_features(raw.copy())
+    new = build_features(clean_listings(raw))
+
+    assert list(new.columns) == FEATURE_COLUMNS
+    assert new.index.equals(old.index)
+    for col in FEATURE_COLUMNS:
+        if col in ("fuel", "transmission", "brand"):
+            assert new[col].tolist() == old[col].tolist(), col
+        else:
+            np.testing.assert_array_equal(new[col].to_numpy(np.float64),
+                                          old[col].to_numpy(np.float64), err_msg=col)
+    np.testing.assert_array_equal(new["max_power"].iloc[-4:], [np.nan, 103.52, np.nan, 37.0])
+    assert new["brand"].iloc[-4:].tolist() == ["Land", "Ashok", "Maruti", "Tata"]
+
+
+def test_scalar_normalization_matches_column_parsing(raw):
+    sample = clean_listings(raw).sample(n=300, random_state=0)
+    expected = build_features(sample)
+    for (_, record), (_, row) in zip(sample.iterrows(), expected.iterrows()):
+        listing = {k: (None if pd.isna(v) else v) for k, v in record.items()}
+        listing["brand"] = listing.pop("name")
+        normalized = normalize_listing(listing)
+        for col in FEATURE_COLUMNS:
+            a, b = normalized[col], row[col]
+            assert (pd.isna(a) and pd.isna(b)) or a == b, (col, a, b)
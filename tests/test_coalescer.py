@@ -0,0 +1,67 @@
+"""
+test_coalescer.py
+MicroBatcher: concurrent callers are scored in shared batches and each gets
+its own prediction back; failures reach every caller of the batch instead of
+leaving any of them waiting.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from coalescer import MicroBatcher
+
+
+def test_coalesced_results_go_back_to_their_callers():
+    batches = []
+
+    def predict_fn(rows):
+        batches.append(len(rows))
+        return [row["x"] * 10 for row in rows]
+
+    batcher = MicroBatcher(predict_fn, window_ms=50, max_batch_size=8)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda x: batcher.predict({"x": x}, timeout=5), range(40)))
+
+    assert results == [x * 10 for x in range(40)]
+    assert sum(batches) == 40
+    assert len(batches) < 40 and max(batches) <= 8
+    assert batcher.stats()["rows"] == 40
+
+
+def test_exception_reaches_every_caller_of_the_batch():
+    def predict_fn(rows):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(predict_fn, window_ms=20)
+    futures = [batcher.submit({"x": x}) for x in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match="model failed"):
+            future.result(timeout=5)
+
+
+def test_short_result_fails_every_caller_instead_of_hanging():
+    batcher = MicroBatcher(lambda rows: [1.0] * (len(rows) - 1), window_ms=20)
+    futures = [batcher.submit({"x": x}) for x in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="2 predictions for 3 rows"):
+            future.result(timeout=5)
+
+    # The worker keeps serving later batches
+    batcher.predict_fn = lambda rows: [2.0] * len(rows)
+    assert batcher.predict({"x": 0}, timeout=5) == 2.0
+
+
+def test_predict_times_out_while_the_batch_is_scored():
+    release = threading.Event()
+
+    def predict_fn(rows):
+        release.wait(5)
+        return [0.0] * len(rows)
+
+    batcher = MicroBatcher(predict_fn, window_ms=0)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.predict({"x": 0}, timeout=0.05)
+    finally:
+        release.set()
@@ -0,0 +1,83 @@
+"""
+test_fast_pipeline.py
+CompiledPipeline.from_pipeline against the sklearn Pipeline it is extracted
+from: the same preprocessed matrix as the ColumnTransformer and the same
+predictions, including rows with missing numeric and categorical values.
+"""
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from batch_api import listings_to_frame, normalize_listing
+from car_features import CATEGORICAL_COLUMNS, load_training_data
+from fast_pipeline import CompiledPipeline
+
+pytest.importorskip("xgboost")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL = os.path.join(ROOT, "model", "car_price.model")
+DATA = os.path.join(ROOT, "data", "Cars.csv")
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return joblib.load(MODEL)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    X, _ = load_training_data(DATA)
+    records = X.sample(n=500, random_state=3).to_dict(orient="records")
+    rng = np.random.RandomState(3)
+    for record in records[:150]:  # missing categoricals
+        for key in CATEGORICAL_COLUMNS:
+            if rng.random_sample() < 0.3:
+                record[key] = None
+    for record in records[150:300]:  # missing anything
+        for key in list(record):
+            if rng.random_sample() < 0.2:
+                record[key] = None
+    records += [{}, {"fuel": None, "transmission": None, "brand": None},
+                {"brand": "Tesla", "fuel": "Electric", "year": 2020}]
+    return [normalize_listing(r) for r in records]
+
+
+def reference_matrix(pipeline, frame, zero_as_missing):
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="Found unknown categories")
+        matrix = pipeline[0].transform(frame)
+    matrix = matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+    if zero_as_missing:
+        matrix[matrix == 0.0] = np.nan
+    return matrix
+
+
+def test_transform_matches_column_transformer(pipeline, rows):
+    compiled = CompiledPipeline.from_pipeline(pipeline)
+    frame = listings_to_frame(rows)
+    expected = reference_matrix(pipeline, frame, compiled.zero_as_missing)
+
+    np.testing.assert_allclose(compiled.transform(rows), expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(compiled.transform(frame), expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_predictions_match_pipeline(pipeline, rows):
+    compiled = CompiledPipeline.from_pipeline(pipeline)
+    np.testing.assert_allclose(compiled.predict(rows), pipeline.predict(listings_to_frame(rows)),
+                               rtol=0, atol=1e-6)
+
+
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_none_and_nan_categoricals_are_both_missing(pipeline, rows):
+    # normalize_listing sends NaN; callers building rows by hand may send None
+    compiled = CompiledPipeline.from_pipeline(pipeline)
+    with_none = [{k: (None if k in CATEGORICAL_COLUMNS and v != v else v) for k, v in row.items()}
+                 for row in rows]
+    assert any(row["brand"] is None for row in with_none)
+    np.testing.assert_array_equal(compiled.predict(with_none), compiled.predict(rows))
+    np.testing.assert_allclose(compiled.predict(with_none),
+                               pipeline.predict(listings_to_frame(rows)), rtol=0, atol=1e-6)
@@ -0,0 +1,56 @@
+"""
+test_metrics.py
+Prometheus exposition of the per-model router metrics: monotonic counts are
+counters, latency and divergence are histograms with one series per model.
+"""
+import joblib
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from metrics import Metrics
+from model_registry import ModelRegistry
+from model_router import ModelRouter
+
+
+@pytest.fixture
+def router(tmp_path):
+    paths = []
+    for name in ("primary", "linear"):
+        path = str(tmp_path / f"{name}.model")
+        joblib.dump(DummyRegressor().fit([[0]], [1.0]), path)
+        paths.append(path)
+    primary = ModelRegistry([paths[0]], fast_inference=False)
+    return ModelRouter(primary, shadows=[("linear", paths[1], 0.0)], fast_inference=False)
+
+
+def types(text):
+    """{metric name: type} from the # TYPE lines; fails on a repeated name."""
+    found = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name not in found, f"{name} declared twice"
+            found[name] = kind
+    return found
+
+
+def test_router_counts_are_counters_and_latency_is_histogram(router):
+    metrics = Metrics()
+    router.gauges(metrics)
+    router.stats["primary"].record(3, 0.002)
+    router.stats["linear"].record(3, 0.004)
+    router.stats["linear"].divergence.observe(0.03)
+
+    text = metrics.render()
+    kinds = types(text)
+    for name in ("model_calls_total", "model_rows_total", "model_errors_total", "shadow_dropped_total"):
+        assert kinds[f"car_price_{name}"] == "counter"
+    assert kinds["car_price_model_latency_seconds"] == "histogram"
+    assert kinds["car_price_model_divergence"] == "histogram"
+    assert kinds["car_price_model_load_rss_bytes"] == "gauge"
+
+    assert 'car_price_model_rows_total{model="linear",role="shadow"} 3' in text
+    assert 'car_price_model_latency_seconds_count{model="primary",role="primary"} 1' in text
+    assert 'car_price_model_latency_seconds_bucket{model="linear",role="shadow",le="0.005"} 1' in text
+    assert 'car_price_model_divergence_count{model="linear",role="shadow"} 1' in text
+    assert 'car_price_model_divergence_count{model="primary"' not in text
@@ -0,0 +1,68 @@
+"""
+test_model_artifact.py
+Re-exporting an artifact directory while a version loaded from it is served:
+the loaded version keeps its preprocessing, and no file is rewritten in place.
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from batch_api import normalize_listing
+from model_artifact import ARRAYS_FILE, export_artifact, load_artifact, replace_file
+
+pytest.importorskip("xgboost")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+LISTING = normalize_listing({"year": 2015, "km_driven": 60000, "mileage": 18.0,
+                             "engine": 1200, "max_power": 80, "seats": 5,
+                             "fuel": "Petrol", "transmission": "Manual", "brand": "Maruti"})
+
+
+@pytest.fixture
+def served(tmp_path):
+    path = str(tmp_path / "car_price.artifact")
+    shutil.copytree(ARTIFACT, path)
+    return path
+
+
+def test_reexport_does_not_change_loaded_version(served):
+    loaded = load_artifact(served, runtime="xgboost")
+    before = loaded.predict([LISTING])
+    fill = loaded.blocks[0].fill.copy()
+    inode = os.stat(os.path.join(served, ARRAYS_FILE)).st_ino
+
+    changed = load_artifact(served, runtime="xgboost")
+    changed.blocks[0].fill = changed.blocks[0].fill + 1000
+    changed.blocks[0].mean = changed.blocks[0].mean + 1.0
+    manifest = export_artifact(changed, served)
+
+    assert manifest["version"] != loaded.version
+    np.testing.assert_array_equal(loaded.predict([LISTING]), before)
+    np.testing.assert_array_equal(loaded.blocks[0].fill, fill)
+    assert os.stat(os.path.join(served, ARRAYS_FILE)).st_ino != inode
+    assert load_artifact(served, runtime="xgboost").version == manifest["version"]
+
+
+def test_export_leaves_no_temporary_files(served):
+    before = sorted(os.listdir(served))
+    export_artifact(load_artifact(served, runtime="xgboost"), served)
+    assert sorted(os.listdir(served)) == before
+
+
+def test_failed_write_keeps_old_file(tmp_path):
+    path = tmp_path / "car_price.model"
+    path.write_bytes(b"served")
+
+    def write(tmp):
+        with open(tmp, "wb") as f:
+            f.write(b"half")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        replace_file(str(path), write)
+    assert path.read_bytes() == b"served"
+    assert os.listdir(tmp_path) == ["car_price.model"]
@@ -0,0 +1,156 @@
+"""
+test_model_registry.py
+Reload, rollback, the path watcher and control-file propagation between
+workers. The models are constant regressors pickled to a temporary directory,
+so every version predicts its own number.
+"""
+import os
+
+import joblib
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from batch_api import normalize_listing, score_rows
+from model_registry import ModelRegistry
+
+
+def write_model(path, constant):
+    """Pickle a regressor that always predicts ``constant``; returns path."""
+    joblib.dump(DummyRegressor(strategy="constant", constant=constant).fit([[0]], [constant]), path)
+    # Writes within one mtime tick would look unchanged to the watcher
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9 * constant))
+    return str(path)
+
+
+def prediction(registry):
+    return float(score_rows(registry.get().model, [normalize_listing({})])[0])
+
+
+def make_registry(path):
+    return ModelRegistry([path], fast_inference=False)
+
+
+@pytest.fixture
+def preferred(tmp_path):
+    return write_model(tmp_path / "car_price.model", 1)
+
+
+def test_reload_swaps_in_new_version_and_keeps_history(preferred):
+    registry = make_registry(preferred)
+    first = registry.get().version
+    write_model(preferred, 2)
+
+    loaded = registry.reload()
+    assert loaded["version"] != first
+    assert prediction(registry) == 2
+    assert [v.version for v in registry.history] == [first]
+    assert registry.reloads == 1
+
+
+def test_failed_reload_keeps_current_model(preferred, tmp_path):
+    registry = make_registry(preferred)
+    first = registry.get().version
+    broken = tmp_path / "broken.model"
+    broken.write_bytes(b"not a pickle")
+
+    with pytest.raises(Exception):
+        registry.reload(str(broken))
+    assert registry.get().version == first
+    assert str(broken) in registry.last_error
+
+
+def test_rollback_restores_previous_version(preferred):
+    registry = make_registry(preferred)
+    first = registry.get().version
+    write_model(preferred, 2)
+    registry.reload()
+
+    assert registry.rollback()["version"] == first
+    assert prediction(registry) == 1
+    with pytest.raises(LookupError):
+        registry.rollback()
+
+
+def test_watcher_reloads_new_file_at_preferred_path(preferred):
+    registry = make_registry(preferred)
+    first = registry.get().version
+    registry._poll()
+    assert registry.get().version == first
+
+    write_model(preferred, 2)
+    registry._poll()
+    assert prediction(registry) == 2
+
+
+def test_watcher_keeps_admin_reload_from_other_path(preferred, tmp_path):
+    registry = make_registry(preferred)
+    registry.get()
+    registry.reload(write_model(tmp_path / "candidate.model", 3))
+
+    registry._poll()
+    assert prediction(registry) == 3
+
+    # A newer model published at the preferred path replaces it
+    write_model(preferred, 2)
+    registry._poll()
+    assert prediction(registry) == 2
+    registry._poll()
+    assert prediction(registry) == 2
+
+
+def test_watcher_does_not_undo_rollback(preferred):
+    registry = make_registry(preferred)
+    registry.get()
+    write_model(preferred, 2)
+    registry._poll()
+    registry.rollback()
+
+    registry._poll()
+    assert prediction(registry) == 1
+
+
+def test_admin_actions_propagate_through_control_file(preferred, tmp_path):
+    worker, other = make_registry(preferred), make_registry(preferred)
+    worker.get(), other.get()
+    candidate = write_model(tmp_path / "candidate.model", 3)
+
+    worker.broadcast("reload", candidate)
+    other._poll()
+    assert prediction(other) == 3
+
+    worker.broadcast("rollback")
+    other._poll()
+    assert prediction(other) == 1
+    # Applied once: later polls do not repeat it
+    other._poll()
+    assert prediction(other) == 1
+
+
+def test_new_worker_adopts_last_admin_reload(preferred, tmp_path):
+    # Created before the admin action, like the registry a gunicorn master
+    # builds at import and a respawned worker inherits
+    respawned = make_registry(preferred)
+    worker = make_registry(preferred)
+    worker.get()
+    worker.broadcast("reload", write_model(tmp_path / "candidate.model", 3))
+
+    assert prediction(respawned) == 3
+    respawned._poll()
+    assert prediction(respawned) == 3
+
+
+def test_new_worker_does_not_replay_rollback(preferred):
+    respawned = make_registry(preferred)
+    worker = make_registry(preferred)
+    worker.get()
+    write_model(preferred, 2)
+    worker.reload()
+    worker.broadcast("rollback")
+
+    # The rolled-back file was overwritten, so the new worker cannot load the
+    # version the others serve; it must not fail trying to roll back
+    respawned.get()
+    respawned._poll()
+    assert prediction(respawned) == 2
+    assert not respawned.history
@@ -0,0 +1,113 @@
+"""
+test_prediction_cache.py
+PredictionCache: LRU eviction, TTL expiry, the version tie that drops every
+entry when the registry swaps in another model, and the shared SQLite level.
+"""
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyRegressor
+
+import prediction_cache
+from batch_api import normalize_listing
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, SqliteBackend, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache, "time", clock)
+    return clock
+
+
+def make_cache(**kwargs):
+    cache = PredictionCache(**kwargs)
+    cache.set_version("v1")
+    return cache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(maxsize=2)
+    cache.put("a", 1.0, "v1")
+    cache.put("b", 2.0, "v1")
+    assert cache.get("a") == 1.0  # a is now the most recent
+    cache.put("c", 3.0, "v1")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1.0, 3.0)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl=60)
+    cache.put("a", 1.0, "v1")
+    clock.now += 59
+    assert cache.get("a") == 1.0
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_predictions_of_another_version_are_not_cached():
+    cache = make_cache()
+    cache.put("a", 1.0, "v0")  # scored by the old model while the swap happened
+    assert cache.get("a") is None
+
+
+def test_missing_values_give_equal_keys():
+    first = cache_key(normalize_listing({"year": 2015, "km_driven": ""}))
+    second = cache_key(normalize_listing({"year": "2015", "km_driven": np.nan}))
+    assert first == second
+    assert hash(first) == hash(second)
+
+
+def test_shared_backend_serves_other_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker, other = make_cache(backend=SqliteBackend(path)), make_cache(backend=SqliteBackend(path))
+    key = cache_key(normalize_listing({"year": 2015}))
+    worker.put(key, 12.5, "v1")
+
+    assert other.get(key) == 12.5
+    assert other.shared_hits == 1
+    # A worker that swaps in another version clears the old one from the file
+    other.set_version("v2")
+    assert SqliteBackend(path).get(key, "v1", 0) is None
+
+
+def write_model(path, constant):
+    joblib.dump(DummyRegressor(strategy="constant", constant=constant).fit([[0]], [constant]), path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9 * constant))
+    return str(path)
+
+
+def test_model_reload_invalidates_cache(tmp_path):
+    cache = PredictionCache()
+    path = write_model(tmp_path / "car_price.model", 1)
+    registry = ModelRegistry([path], fast_inference=False,
+                             on_swap=lambda new: cache.set_version(new.version))
+    first = registry.get().version
+    cache.put("a", 1.0, first)
+    assert cache.get("a") == 1.0
+
+    write_model(path, 2)
+    registry.reload()
+    assert cache.version == registry.get().version != first
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+    # A result the old model finished after the swap is not cached either
+    cache.put("a", 1.0, first)
+    assert cache.get("a") is None
@@ -0,0 +1,80 @@
+"""
+test_tree_runtime.py
+Parity of the numpy tree runtime (TreeEnsemble) and the xgboost booster with
+the pickled sklearn Pipeline they replace, on training listings with blanked
+fields, explicit NaNs, missing keys and categories unseen in training.
+"""
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from batch_api import listings_to_frame, normalize_listing
+from car_features import load_training_data
+from model_artifact import TREES_FILE, load_artifact
+from tree_runtime import TreeEnsemble
+
+pytest.importorskip("xgboost")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL = os.path.join(ROOT, "model", "car_price.model")
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+DATA = os.path.join(ROOT, "data", "Cars.csv")
+
+EDGE_LISTINGS = [
+    {},
+    {"year": float("nan"), "km_driven": float("nan"), "mileage": float("nan")},
+    {"year": 2016, "fuel": "Electric", "transmission": "CVT", "owner": 7, "brand": "Tesla"},
+    {"year": 2012, "km_driven": 0, "engine": 0, "max_power": 0, "mileage": 0,
+     "fuel": "LPG", "brand": "Lamborghini"},
+    {"fuel": None, "transmission": None, "owner": None, "brand": None},
+]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    X, _ = load_training_data(DATA)
+    records = X.sample(n=1500, random_state=7).to_dict(orient="records")
+    rng = np.random.RandomState(7)
+    for record in records[:1000]:  # blanked fields
+        for key in list(record):
+            if rng.random_sample() < 0.2:
+                record[key] = None
+    for record in records[1000:1250]:  # missing keys
+        for key in rng.choice(list(record), size=3, replace=False):
+            del record[key]
+    for record in records[1250:]:  # unseen categories next to known values
+        record["brand"], record["fuel"] = "Tesla", "Electric"
+    return [normalize_listing(r) for r in records + EDGE_LISTINGS]
+
+
+@pytest.fixture(scope="module")
+def reference(rows):
+    return joblib.load(MODEL).predict(listings_to_frame(rows))
+
+
+# The pipeline's one-hot encoder warns about the unseen categories
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+@pytest.mark.parametrize("runtime", ["xgboost", "numpy"])
+def test_artifact_runtime_matches_sklearn_pipeline(runtime, rows, reference):
+    predictions = load_artifact(ARTIFACT, runtime=runtime).predict(rows)
+    np.testing.assert_allclose(predictions, reference, rtol=0, atol=1e-6)
+
+
+def test_numpy_runtime_matches_xgboost_bit_for_bit(rows):
+    numpy_runtime = load_artifact(ARTIFACT, runtime="numpy").predict(rows)
+    xgboost_runtime = load_artifact(ARTIFACT, runtime="xgboost").predict(rows)
+    np.testing.assert_array_equal(numpy_runtime, xgboost_runtime)
+
+
+def test_tree_ensemble_matches_booster_on_missing_values(rows):
+    compiled = load_artifact(ARTIFACT, runtime="xgboost")
+    matrix = np.asarray(compiled.transform(rows), dtype=np.float32)
+    assert np.isnan(matrix).any()
+    expected = compiled.booster.inplace_predict(matrix)
+
+    exported = TreeEnsemble.from_booster(compiled.booster)
+    saved = TreeEnsemble.load(os.path.join(ARTIFACT, TREES_FILE))
+    np.testing.assert_array_equal(exported.inplace_predict(matrix), expected)
+    np.testing.assert_array_equal(saved.inplace_predict(matrix), expected)
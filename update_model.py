@@ -0,0 +1,395 @@
+"""
+update_model.py
+Incremental retraining on a batch of new listings, instead of a full refit
+with a grid search over the whole CSV.
+1. The imputer fills and scaler statistics are updated with streaming
+   estimators kept in model/car_price.state.json:
+   - count, mean and M2 (Chan's parallel update) per numeric column
+   - value counts (exact) or a fine quantile histogram for the medians
+   - category counts for the most-frequent fills
+2. The thresholds of the existing trees are rewritten for the new scaling,
+   so the trees still split the raw values where they did before.
+3. Boosting continues for --rounds trees on the new rows plus a replayed
+   sample of the base data (--replay-rows; without it the new trees overfit
+   small batches).
+4. The updated model is scored against the current one on a held-out part of
+   the new batch (plus --holdout, if given). It is published to model/ only
+   if its RMSE is no worse than the current model's by more than
+   --tolerance; the serving app hot-reloads it from there.
+
+New categories (e.g. a brand the model has never seen) keep the all-zeros
+encoding they had: the one-hot layout is fixed by the trees. The prediction interval
+table and the encoder layout are carried over; run export_model.py for a full
+refit when those need to change.
+
+The state file is written by export_model.py. For models trained before it
+existed, it is rebuilt once from the training split of --base-data.
+
+Run: python update_model.py new_listings.csv [--rounds 100] [--replay-rows 2000] [--dry-run]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from car_features import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, load_training_data  # noqa: E402
+from drift import Profile, profile_path  # noqa: E402
+from model_artifact import export_artifact, is_artifact, load_artifact, replace_file  # noqa: E402
+
+DATA = os.path.join(ROOT, "data", "Cars.csv")
+MODEL = os.path.join(ROOT, "model", "car_price.model")
+ARTIFACT = os.path.join(ROOT, "model", "car_price.artifact")
+
+# Columns with at most this many distinct values keep exact value counts;
+# the rest use a histogram over this many quantile bins of the base data
+MAX_EXACT_VALUES = 512
+HISTOGRAM_BINS = 1024
+
+# Margin (in standardized units) rescaled split thresholds are moved down by
+SPLIT_MARGIN = 1e-5
+
+
+def state_path(model_path):
+    return os.path.splitext(model_path)[0] + ".state.json"
+
+
+class ColumnStats:
+    """Streaming statistics of one numeric column.
+
+    Mean and variance of the observed values use Chan's parallel update;
+    the median comes from exact value counts, or from counts over fixed
+    ``edges`` when ``edges`` is set. In that case slot 2i counts the values
+    between edges i-1 and i and slot 2i+1 the values equal to edge i, so
+    round values such as 60000 km stay exact and only medians that fall
+    between edges are interpolated.
+    """
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, missing=0, values=None, edges=None,
+                 counts=None, low=None, high=None):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.missing = missing
+        self.values = values if values is not None else {}  # exact mode: value -> count
+        self.edges = None if edges is None else np.asarray(edges, dtype=np.float64)
+        self.counts = None if counts is None else np.asarray(counts, dtype=np.int64)
+        self.low, self.high = low, high
+
+    @classmethod
+    def for_column(cls, x):
+        """Empty stats whose median layout suits the (non-missing) values x."""
+        if len(np.unique(x)) <= MAX_EXACT_VALUES:
+            return cls()
+        edges = np.unique(np.quantile(x, np.linspace(0, 1, HISTOGRAM_BINS + 1)[1:-1]))
+        return cls(edges=edges, counts=np.zeros(2 * len(edges) + 1, dtype=np.int64))
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        observed = x[~np.isnan(x)]
+        self.missing += len(x) - len(observed)
+        if not len(observed):
+            return
+        n_b, mean_b = len(observed), float(observed.mean())
+        m2_b = float(((observed - mean_b) ** 2).sum())
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+        low, high = float(observed.min()), float(observed.max())
+        self.low = low if self.low is None else min(self.low, low)
+        self.high = high if self.high is None else max(self.high, high)
+        if self.edges is None:
+            uniq, cnt = np.unique(observed, return_counts=True)
+            for v, c in zip(uniq.tolist(), cnt.tolist()):
+                self.values[v] = self.values.get(v, 0) + c
+        else:
+            i = np.searchsorted(self.edges, observed)
+            on_edge = self.edges[np.minimum(i, len(self.edges) - 1)] == observed
+            self.counts += np.bincount(2 * i + on_edge, minlength=len(self.counts))
+
+    def _value_at(self, rank):
+        seen = 0
+        for v in sorted(self.values):
+            seen += self.values[v]
+            if seen > rank:
+                return v
+        return max(self.values)
+
+    def median(self):
+        if self.edges is None:
+            # np.median semantics: average the two middle values of an even count
+            return (self._value_at((self.n - 1) // 2) + self._value_at(self.n // 2)) / 2.0
+        target = self.n / 2.0
+        cumulative = np.cumsum(self.counts)
+        slot = int(np.searchsorted(cumulative, target))
+        i = slot // 2
+        if slot % 2:
+            return float(self.edges[i])
+        before = cumulative[slot - 1] if slot else 0
+        lo = self.edges[i - 1] if i else self.low
+        hi = self.edges[i] if i < len(self.edges) else self.high
+        return float(lo + (target - before) / max(self.counts[slot], 1) * (hi - lo))
+
+    def imputed_moments(self, fill):
+        """(mean, variance) of the column once missing values are set to fill,
+        which is what the scaler after the imputer sees."""
+        total = self.n + self.missing
+        mean = (self.n * self.mean + self.missing * fill) / total
+        m2 = self.m2 + self.n * (self.mean - mean) ** 2 + self.missing * (fill - mean) ** 2
+        return mean, m2 / total
+
+    def to_dict(self):
+        out = {"n": self.n, "mean": self.mean, "m2": self.m2, "missing": self.missing,
+               "low": self.low, "high": self.high}
+        if self.edges is None:
+            out["values"] = [[v, c] for v, c in sorted(self.values.items())]
+        else:
+            out["edges"] = self.edges.tolist()
+            out["counts"] = self.counts.tolist()
+        return out
+
+    @classmethod
+    def from_dict(cls, d):
+        values = {v: c for v, c in d["values"]} if "values" in d else None
+        return cls(d["n"], d["mean"], d["m2"], d["missing"], values, d.get("edges"),
+                   d.get("counts"), d.get("low"), d.get("high"))
+
+
+class TrainingState:
+    """Streaming statistics of everything the model has been trained on."""
+
+    def __init__(self, numeric, categories, rows=0):
+        self.numeric = numeric  # column -> ColumnStats
+        self.categories = categories  # column -> {category: count}
+        self.rows = rows
+
+    @classmethod
+    def from_frame(cls, X):
+        numeric = {}
+        for col in NUMERIC_COLUMNS:
+            x = X[col].to_numpy(dtype=np.float64)
+            numeric[col] = ColumnStats.for_column(x[~np.isnan(x)])
+        state = cls(numeric, {col: {} for col in CATEGORICAL_COLUMNS})
+        state.update(X)
+        return state
+
+    def update(self, X):
+        for col, stats in self.numeric.items():
+            stats.update(X[col].to_numpy(dtype=np.float64))
+        for col, counts in self.categories.items():
+            for value, count in X[col].value_counts().items():
+                counts[value] = counts.get(value, 0) + int(count)
+        self.rows += len(X)
+
+    def most_frequent(self, col):
+        # SimpleImputer breaks ties by the smallest value
+        counts = self.categories[col]
+        return min(counts, key=lambda v: (-counts[v], v))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"rows": self.rows,
+                       "numeric": {c: s.to_dict() for c, s in self.numeric.items()},
+                       "categories": self.categories}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls({c: ColumnStats.from_dict(d) for c, d in data["numeric"].items()},
+                   data["categories"], data["rows"])
+
+
+# -- applying the statistics ----------------------------------------------------
+def numeric_steps(preprocessor):
+    """[(output column index, column, imputer, scaler)] of the numeric blocks."""
+    names = list(preprocessor.get_feature_names_out())
+    out = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "cat" or transformer == "drop":
+            continue
+        imputer, scaler = transformer.named_steps["imputer"], transformer.named_steps["scaler"]
+        for j, col in enumerate(columns):
+            out.append((names.index(f"{name}__{col}"), col, imputer, scaler, j))
+    return out
+
+
+def update_preprocessor(preprocessor, state):
+    """Set imputer fills and scaler statistics from ``state`` in place.
+
+    Returns {output index: (old mean, old scale, new mean, new scale)} for
+    the numeric features, to rewrite the tree thresholds with.
+    """
+    changes = {}
+    for index, col, imputer, scaler, j in numeric_steps(preprocessor):
+        stats = state.numeric[col]
+        fill = stats.median() if imputer.strategy == "median" else stats.mean
+        mean, var = stats.imputed_moments(fill)
+        scale = float(np.sqrt(var)) or 1.0
+        changes[index] = (float(scaler.mean_[j]), float(scaler.scale_[j]), mean, scale)
+        imputer.statistics_[j] = fill
+        scaler.mean_[j], scaler.var_[j], scaler.scale_[j] = mean, var, scale
+        scaler.n_samples_seen_ = state.rows
+    cat_imputer = preprocessor.named_transformers_["cat"].named_steps["imputer"]
+    for j, col in enumerate(CATEGORICAL_COLUMNS):
+        cat_imputer.statistics_[j] = state.most_frequent(col)
+    return changes
+
+
+def state_mismatch(preprocessor, state):
+    """Largest relative difference between the fitted numeric statistics and
+    those ``state`` gives; ~0 when the state describes the training rows."""
+    worst = 0.0
+    for _, col, imputer, scaler, j in numeric_steps(preprocessor):
+        stats = state.numeric[col]
+        fill = stats.median() if imputer.strategy == "median" else stats.mean
+        mean, var = stats.imputed_moments(fill)
+        for fitted, streamed in [(imputer.statistics_[j], fill), (scaler.mean_[j], mean),
+                                 (scaler.var_[j], var)]:
+            worst = max(worst, abs(fitted - streamed) / max(abs(fitted), 1e-12))
+    return worst
+
+
+def rescale_thresholds(booster, changes):
+    """Booster whose numeric splits are moved from the old to the new scaling.
+
+    A split x_scaled < t on standardized inputs becomes
+    x_scaled' < (t * old_scale + old_mean - new_mean) / new_scale.
+    """
+    model = json.loads(booster.save_raw("json"))
+    for tree in model["learner"]["gradient_booster"]["model"]["trees"]:
+        conditions = tree["split_conditions"]
+        for node, (feature, left) in enumerate(zip(tree["split_indices"], tree["left_children"])):
+            if left == -1 or feature not in changes:  # leaves hold their value here
+                continue
+            old_mean, old_scale, new_mean, new_scale = changes[feature]
+            t = (conditions[node] * old_scale + old_mean - new_mean) / new_scale
+            # Hist splits sit on data values, and rows equal to the threshold
+            # go right; moving it slightly down keeps them there after float32
+            # rounding of the new scaling (the gap is far below the data's steps)
+            conditions[node] = t - SPLIT_MARGIN * max(1.0, abs(t))
+    rescaled = xgb.Booster()
+    rescaled.load_model(bytearray(json.dumps(model).encode()))
+    return rescaled
+
+
+def update_pipeline(pipeline, state, X_new, y_new, rounds, X_replay=None, y_replay=None):
+    """New pipeline: updated statistics, rescaled trees, ``rounds`` more trees."""
+    updated = copy.deepcopy(pipeline)
+    preprocessor, regressor = updated[0], updated[-1]
+    state.update(X_new)
+    changes = update_preprocessor(preprocessor, state)
+    booster = rescale_thresholds(pipeline[-1].get_booster(), changes)
+
+    if X_replay is not None:
+        X_new, y_new = pd.concat([X_new, X_replay]), pd.concat([y_new, y_replay])
+    regressor.set_params(n_estimators=rounds)
+    regressor.fit(preprocessor.transform(X_new), y_new, xgb_model=booster)
+    return updated
+
+
+def rmse(pipeline, X, y):
+    return float(np.sqrt(mean_squared_error(y, pipeline.predict(X))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continue training the model on new listings")
+    parser.add_argument("new_data", help="new listings in the Cars.csv schema")
+    parser.add_argument("--model", default=MODEL, help="current pickled pipeline")
+    parser.add_argument("--artifact", default=ARTIFACT,
+                        help="serving artifact directory to update ('' to skip)")
+    parser.add_argument("--base-data", default=DATA,
+                        help="data the current model was trained on (only to rebuild a missing state)")
+    parser.add_argument("--rounds", type=int, default=100, help="trees added")
+    parser.add_argument("--replay-rows", type=int, default=2000,
+                        help="base data rows sampled into the update to limit forgetting")
+    parser.add_argument("--holdout", default=None, help="extra held-out listings (CSV)")
+    parser.add_argument("--holdout-fraction", type=float, default=0.2,
+                        help="share of the new batch held out for the publish check")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="allowed relative RMSE increase against the current model")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate, but do not publish")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    pipeline = joblib.load(args.model)
+    if os.path.exists(state_path(args.model)):
+        state = TrainingState.load(state_path(args.model))
+    else:
+        from export_model import split_train_test
+        X_base, y_base = load_training_data(args.base_data)
+        state = TrainingState.from_frame(split_train_test(X_base, y_base)[0])
+        mismatch = state_mismatch(pipeline[0], state)
+        print(f"Rebuilt training state from {state.rows} rows of {args.base_data} "
+              f"(statistics match the model to {mismatch:.1e})")
+        if mismatch > 1e-6:
+            sys.exit("The model was not trained on the training split of --base-data")
+
+    X, y = load_training_data(args.new_data)
+    X_train, X_hold, y_train, y_hold = train_test_split(
+        X, y, test_size=args.holdout_fraction, random_state=args.seed)
+    if args.holdout:
+        X_extra, y_extra = load_training_data(args.holdout)
+        X_hold, y_hold = pd.concat([X_hold, X_extra]), pd.concat([y_hold, y_extra])
+
+    X_replay = y_replay = None
+    if args.replay_rows:
+        X_base, y_base = load_training_data(args.base_data)
+        pick = np.random.RandomState(args.seed).permutation(len(X_base))[:args.replay_rows]
+        X_replay, y_replay = X_base.iloc[pick], y_base.iloc[pick]
+
+    updated = update_pipeline(pipeline, state, X_train, y_train, args.rounds, X_replay, y_replay)
+    seconds = time.perf_counter() - started
+    before, after = rmse(pipeline, X_hold, y_hold), rmse(updated, X_hold, y_hold)
+    print(f"Updated on {len(X_train)} new rows (+{args.replay_rows} replayed) in {seconds:.1f}s, "
+          f"{updated[-1].get_booster().num_boosted_rounds()} trees")
+    print(f"Held-out RMSE (log price) on {len(X_hold)} rows: current {before:.4f}, "
+          f"updated {after:.4f}; R^2 (price) updated "
+          f"{r2_score(np.exp(y_hold), np.exp(updated.predict(X_hold))):.4f}")
+
+    if after > before * (1 + args.tolerance):
+        print(f"Not published: held-out RMSE is worse by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    if args.dry_run:
+        print("Dry run: nothing published")
+        return
+
+    # Every file is written next to the one it replaces and renamed over it,
+    # so the app never reads a half-written one. The model goes last: the
+    # app's watcher reloads, and reads the drift profile, when it changes.
+
+    # The drift reference now covers the new rows too
+    profile = Profile.load(profile_path(args.model)) if os.path.exists(profile_path(args.model)) else None
+    if profile is not None:
+        new_rows = profile.empty()
+        new_rows.update(X_train.to_dict(orient="records"))
+        profile.merge(new_rows)
+        replace_file(profile_path(args.model), profile.save)
+    replace_file(state_path(args.model), state.save)
+    replace_file(args.model, lambda tmp: joblib.dump(updated, tmp))
+    print(f"Saved pipeline to {args.model}")
+    if args.artifact:
+        intervals = load_artifact(args.artifact).intervals if is_artifact(args.artifact) else None
+        os.makedirs(args.artifact, exist_ok=True)
+        if profile is not None:
+            replace_file(profile_path(args.artifact), profile.save)
+        manifest = export_artifact(updated, args.artifact, source=args.model, intervals=intervals)
+        print(f"Saved artifact {manifest['version']} to {args.artifact}")
+
+
+if __name__ == "__main__":
+    main()